@@ -1,6 +1,93 @@
 import os
-import pygame
-from PIL import Image
+from collections import OrderedDict
+
+try:
+    import pygame
+except Exception:
+    # Keep the module importable (e.g. by flappy.py) in environments without pygame
+    pygame = None
+try:
+    from PIL import Image
+except Exception:
+    # load_and_prepare falls back to the pygame loader when PIL is missing
+    Image = None
+
+
+class SpriteVariantCache:
+    """Cache of scaled and flipped sprite variants under a memory budget.
+
+    Each (name, size, flip, smooth) variant is produced once from its
+    source surface and reused until it is evicted. If the source surface
+    for a name changes (sprites were reloaded) the variant is rebuilt.
+    Least recently used variants are evicted once the summed pixel memory
+    exceeds `budget_bytes`.
+    """
+
+    def __init__(self, budget_bytes=16 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._variants = OrderedDict()  # key -> (source, surface, nbytes)
+
+    def get(self, name, source, size, flip=(False, False), smooth=True):
+        """Return `source` scaled to `size` and flipped per `flip` (x, y)."""
+        if source is None:
+            return None
+        size = (int(size[0]), int(size[1]))
+        flip = (bool(flip[0]), bool(flip[1]))
+        key = (name, size, flip, bool(smooth))
+        entry = self._variants.get(key)
+        if entry is not None and entry[0] is source:
+            self.hits += 1
+            self._variants.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        if entry is not None:
+            # stale variant built from an older source surface
+            self._drop(key)
+        if source.get_size() == size:
+            surf = source
+        elif smooth:
+            try:
+                surf = pygame.transform.smoothscale(source, size)
+            except Exception:
+                # smoothscale needs 24/32-bit surfaces
+                surf = pygame.transform.scale(source, size)
+        else:
+            surf = pygame.transform.scale(source, size)
+        if flip[0] or flip[1]:
+            surf = pygame.transform.flip(surf, flip[0], flip[1])
+
+        nbytes = surf.get_width() * surf.get_height() * surf.get_bytesize()
+        self._variants[key] = (source, surf, nbytes)
+        self.used_bytes += nbytes
+        while self.used_bytes > self.budget_bytes and len(self._variants) > 1:
+            self._drop(next(iter(self._variants)))
+        return surf
+
+    def _drop(self, key):
+        entry = self._variants.pop(key, None)
+        if entry is not None:
+            self.used_bytes -= entry[2]
+
+    def clear(self):
+        """Drop every cached variant."""
+        self._variants.clear()
+        self.used_bytes = 0
+
+    def __len__(self):
+        return len(self._variants)
+
+
+# Shared variant cache used by the hub and mini-games
+sprite_cache = SpriteVariantCache()
+
+
+def get_sprite_variant(name, source, size, flip=(False, False), smooth=True):
+    """Return a cached scaled/flipped variant of `source` (see SpriteVariantCache)."""
+    return sprite_cache.get(name, source, size, flip=flip, smooth=smooth)
 
 
 def load_background_images(game):
@@ -0,0 +1,80 @@
+"""Time sources for the game.
+
+MangoTamagotchi reads pet time through a clock passed at construction
+rather than calling time.time() / datetime.now() itself:
+
+- Clock is the real clock and the default.
+- WarpClock is a simulated clock that only moves when advanced. In the
+  game loop it advances `factor` simulated seconds per real second, and
+  headless code can jump it forward with MangoTamagotchi.advance_time(),
+  which applies the decay, random events and aging due in one step.
+  Weeks of pet life take milliseconds, for balancing and soak tests.
+
+Saved states are stamped from the game's clock, both the aging clock
+(last_updated) and the save time (saved_at), so catch-up on load always
+compares times from one clock. A pet saved in warped time therefore
+stays in warped time: reopened on the real clock it only decays once
+real time passes its stamps. UI effects always use real time.
+"""
+import time
+from datetime import datetime
+
+
+class Clock:
+    """The real clock: wall time, monotonic time and local datetimes."""
+
+    # a warped clock is advanced by the game in steps; see WarpClock
+    warped = False
+
+    def time(self):
+        """Seconds since the epoch."""
+        return time.time()
+
+    def monotonic(self):
+        """Seconds on a clock that never goes backwards (for timers)."""
+        return time.monotonic()
+
+    def now(self):
+        """Current local time as a naive datetime."""
+        return datetime.now()
+
+
+class WarpClock(Clock):
+    """A simulated clock running `factor` times faster than real time.
+
+    Simulated time starts at `start` (epoch seconds, default now) and only
+    moves through advance(). take_elapsed() reports how much simulated
+    time has passed in real time since the previous call, so the game loop
+    can advance by that much each frame.
+    """
+
+    warped = True
+
+    def __init__(self, factor=1.0, start=None):
+        self.factor = factor
+        self._time = time.time() if start is None else start
+        self._monotonic = 0.0
+        self._real = time.monotonic()
+
+    def time(self):
+        return self._time
+
+    def monotonic(self):
+        return self._monotonic
+
+    def now(self):
+        return datetime.fromtimestamp(self._time)
+
+    def advance(self, seconds):
+        """Move simulated time forward by `seconds`."""
+        if seconds < 0:
+            raise ValueError("a clock cannot go backwards")
+        self._time += seconds
+        self._monotonic += seconds
+
+    def take_elapsed(self):
+        """Simulated seconds equivalent to the real time since the last call."""
+        real = time.monotonic()
+        elapsed = (real - self._real) * self.factor
+        self._real = real
+        return elapsed
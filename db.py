@@ -1,68 +1,674 @@
+"""SQLite persistence helpers for Mango.
+
+All access goes through one long-lived connection per database file,
+opened on first use by `get_connection`. Opening a connection per call
+costs an open + fsync on every button click, which shows up as frame
+hitches on slow storage. Connections run in WAL mode with
+synchronous=NORMAL, reuse their prepared statements (the SQL strings
+below are module constants so sqlite3's statement cache hits), and are
+closed by `close_all`, registered with atexit.
+
+Connections are created with check_same_thread=False and every use is
+serialised through a per-database lock, so the StateWriter background
+thread shares them with the game loop.
+"""
+import atexit
 import os
 import sqlite3
-from datetime import datetime
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
+# schema.sql ships next to this module
+DEFAULT_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
 
-def init_database(db_path, schema_path='schema.sql'):
-    """Initialize the SQLite database with schema at db_path."""
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+# Prepared statements kept per connection by sqlite3
+STATEMENT_CACHE_SIZE = 64
 
-    with open(schema_path, 'r') as f:
-        schema = f.read()
-        cursor.executescript(schema)
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+)
 
-    conn.commit()
-    conn.close()
-
-
-def save_state(db_path, mango_state):
-    """Save Mango state dict into the database at db_path."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    cursor.execute("DELETE FROM mango_state")
-    cursor.execute(
-        """
-        INSERT INTO mango_state
-        (hunger, happiness, cleanliness, energy, health, age, last_updated)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            mango_state['hunger'],
-            mango_state['happiness'],
-            mango_state['cleanliness'],
-            mango_state['energy'],
-            mango_state['health'],
-            mango_state['age'],
-            datetime.now().isoformat(),
-        ),
+# Pet used when callers do not name one (single-pet installs)
+DEFAULT_PET_ID = 1
+
+# Stats tracked in snapshots and as per-event deltas, in column order
+STATE_FIELDS = ('hunger', 'happiness', 'cleanliness', 'energy', 'health', 'age')
+
+# A new snapshot is written once this many events follow the latest one,
+# which bounds the replay done by load_state
+SNAPSHOT_EVERY = 100
+
+_SQL_LATEST_SNAPSHOT = (
+    "SELECT id, hunger, happiness, cleanliness, energy, health, age, last_updated, "
+    "COALESCE(event_id, 0) FROM mango_state WHERE pet_id = ? ORDER BY id DESC LIMIT 1"
+)
+_SQL_REPLAY_EVENTS = (
+    "SELECT COUNT(*), SUM(hunger), SUM(happiness), SUM(cleanliness), SUM(energy), "
+    "SUM(health), SUM(age), MAX(id) FROM state_events WHERE pet_id = ? AND id > ?"
+)
+_SQL_EVENT_TIMES = "SELECT created_at, COALESCE(last_updated, created_at) FROM state_events WHERE id = ?"
+_SQL_LAST_EVENT = "SELECT MAX(id) FROM state_events WHERE pet_id = ?"
+_SQL_INSERT_EVENT = """
+    INSERT INTO state_events
+    (action, hunger, happiness, cleanliness, energy, health, age, created_at, pet_id, last_updated)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_INSERT_SNAPSHOT = """
+    INSERT INTO mango_state
+    (hunger, happiness, cleanliness, energy, health, age, last_updated, event_id, pet_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_PRUNE_SNAPSHOTS = "DELETE FROM mango_state WHERE pet_id = ? AND id < ?"
+_SQL_STATE_HISTORY = (
+    "SELECT id, action, hunger, happiness, cleanliness, energy, health, age, created_at "
+    "FROM state_events WHERE pet_id = ? ORDER BY id DESC LIMIT ?"
+)
+_SQL_STATE_HISTORY_FOR_ACTION = (
+    "SELECT id, action, hunger, happiness, cleanliness, energy, health, age, created_at "
+    "FROM state_events WHERE pet_id = ? AND action = ? ORDER BY id DESC LIMIT ?"
+)
+# Current state of every pet with an id in [?1, ?2]: latest snapshot plus
+# the summed events after it, the number of those events, the aging clock
+# and when the latest change was saved (as in _current_state)
+_SQL_STATE_CHUNK = """
+    WITH snap AS (
+        SELECT pet_id, hunger, happiness, cleanliness, energy, health, age,
+               COALESCE(event_id, 0) AS event_id, last_updated
+        FROM mango_state
+        WHERE id IN (SELECT MAX(id) FROM mango_state WHERE pet_id BETWEEN ?1 AND ?2 GROUP BY pet_id)
+    ),
+    ev AS (
+        SELECT e.pet_id, COUNT(*) AS n, SUM(e.hunger) AS hunger, SUM(e.happiness) AS happiness,
+               SUM(e.cleanliness) AS cleanliness, SUM(e.energy) AS energy,
+               SUM(e.health) AS health, SUM(e.age) AS age, MAX(e.id) AS last_id
+        FROM state_events e LEFT JOIN snap s ON s.pet_id = e.pet_id
+        WHERE e.pet_id BETWEEN ?1 AND ?2 AND e.id > COALESCE(s.event_id, 0)
+        GROUP BY e.pet_id
     )
+    SELECT p.id,
+           COALESCE(s.hunger, 0) + COALESCE(ev.hunger, 0),
+           COALESCE(s.happiness, 0) + COALESCE(ev.happiness, 0),
+           COALESCE(s.cleanliness, 0) + COALESCE(ev.cleanliness, 0),
+           COALESCE(s.energy, 0) + COALESCE(ev.energy, 0),
+           COALESCE(s.health, 0) + COALESCE(ev.health, 0),
+           COALESCE(s.age, 0) + COALESCE(ev.age, 0),
+           COALESCE(ev.n, 0),
+           COALESCE((SELECT COALESCE(last_updated, created_at) FROM state_events WHERE id = ev.last_id),
+                    s.last_updated),
+           COALESCE((SELECT created_at FROM state_events WHERE id = COALESCE(ev.last_id, s.event_id)),
+                    s.last_updated)
+    FROM pets p
+    LEFT JOIN snap s ON s.pet_id = p.id
+    LEFT JOIN ev ON ev.pet_id = p.id
+    WHERE p.id BETWEEN ?1 AND ?2 AND (s.pet_id IS NOT NULL OR ev.pet_id IS NOT NULL)
+    ORDER BY p.id
+"""
+_SQL_PET_IDS_AFTER = "SELECT id FROM pets WHERE id > ? ORDER BY id LIMIT ?"
+_SQL_INSERT_PET = "INSERT INTO pets (name) VALUES (?)"
+_SQL_LIST_PETS = "SELECT id, name FROM pets ORDER BY id"
+_SQL_INSERT_SCORE = "INSERT INTO scores (score, pet_id) VALUES (?, ?)"
+_SQL_HIGH_SCORE = "SELECT MAX(score) FROM scores"
+_SQL_PET_HIGH_SCORE = "SELECT MAX(score) FROM scores WHERE pet_id = ?"
+_SQL_TOP_SCORES = (
+    "SELECT score, played_at FROM scores WHERE pet_id = ? ORDER BY score DESC, id ASC LIMIT ?"
+)
+_SQL_SCORE_COUNTS = "SELECT score, games FROM pet_score_counts WHERE pet_id = ?"
+_SQL_ROLLUP = (
+    "SELECT best, games, total FROM pet_score_rollups WHERE pet_id = ? AND period = ? AND bucket = ?"
+)
+_SQL_INSERT_SESSION = """
+    INSERT OR IGNORE INTO scores
+    (score, played_at, session_id, duration, flaps, obstacles_passed, pet_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Columns added to tables after their first release, applied to older
+# databases when a connection is opened: table -> [(column, declaration)]
+_PET_COLUMN = ('pet_id', 'INTEGER NOT NULL DEFAULT %d REFERENCES pets(id)' % DEFAULT_PET_ID)
+_ADDED_COLUMNS = {
+    'mango_state': [
+        ('event_id', 'INTEGER'),
+        _PET_COLUMN,
+    ],
+    'state_events': [
+        _PET_COLUMN,
+        ('last_updated', 'TEXT'),
+    ],
+    'scores': [
+        ('session_id', 'TEXT'),
+        ('duration', 'REAL'),
+        ('flaps', 'INTEGER'),
+        ('obstacles_passed', 'INTEGER'),
+        _PET_COLUMN,
+    ],
+}
+
+# Fills the leaderboard rollups from scores saved before they existed
+_SQL_BACKFILL_ROLLUPS = """
+    INSERT INTO pet_score_rollups (pet_id, period, bucket, best, games, total)
+    SELECT pet_id, 'day', date(COALESCE(played_at, CURRENT_TIMESTAMP)) AS bucket,
+           MAX(score), COUNT(*), SUM(score)
+    FROM scores GROUP BY pet_id, bucket;
+    INSERT INTO pet_score_rollups (pet_id, period, bucket, best, games, total)
+    SELECT pet_id, 'week', strftime('%Y-%W', COALESCE(played_at, CURRENT_TIMESTAMP)) AS bucket,
+           MAX(score), COUNT(*), SUM(score)
+    FROM scores GROUP BY pet_id, bucket;
+    INSERT INTO pet_score_rollups (pet_id, period, bucket, best, games, total)
+    SELECT pet_id, 'all', 'all', MAX(score), COUNT(*), SUM(score)
+    FROM scores GROUP BY pet_id;
+    INSERT INTO pet_score_counts (pet_id, score, games)
+    SELECT pet_id, score, COUNT(*) FROM scores GROUP BY pet_id, score;
+"""
+
+# absolute db path -> (connection, lock)
+_connections = {}
+_registry_lock = threading.Lock()
+
 
+def _key(db_path):
+    return os.path.abspath(db_path)
+
+
+def _open(db_path):
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    for pragma in _PRAGMAS:
+        try:
+            conn.execute(pragma)
+        except sqlite3.DatabaseError:
+            # e.g. WAL unsupported on this filesystem; keep the defaults
+            pass
+    _migrate(conn)
+    return conn
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _migrate(conn, schema_path=DEFAULT_SCHEMA_PATH):
+    """Bring a database created by an older schema.sql up to date.
+
+    Adds missing columns to existing tables, then applies schema.sql
+    (every statement in it is idempotent) and backfills derived tables
+    that are new to this database.
+    """
+    tables = _tables(conn)
+    # SQLite refuses to add a REFERENCES column with a non-NULL default
+    # while foreign keys are enforced; existing rows all belong to the
+    # default pet, which schema.sql creates below
     conn.commit()
-    conn.close()
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for table, columns in _ADDED_COLUMNS.items():
+            if table not in tables:
+                continue
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(%s)" % table)}
+            for name, declaration in columns:
+                if name not in existing:
+                    conn.execute("ALTER TABLE %s ADD COLUMN %s %s" % (table, name, declaration))
+        conn.commit()
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    try:
+        with open(schema_path, 'r') as f:
+            schema = f.read()
+    except OSError:
+        # schema.sql not shipped (e.g. some web builds); nothing more to do
+        return
+    conn.executescript(schema)
+    if 'scores' in tables and 'pet_score_rollups' not in tables:
+        conn.executescript("BEGIN;" + _SQL_BACKFILL_ROLLUPS + "COMMIT;")
+
+
+def _entry(db_path):
+    key = _key(db_path)
+    with _registry_lock:
+        entry = _connections.get(key)
+        if entry is None:
+            entry = (_open(db_path), threading.RLock())
+            _connections[key] = entry
+        return entry
+
+
+def get_connection(db_path):
+    """Return the shared connection for db_path, opening it on first use."""
+    return _entry(db_path)[0]
+
+
+@contextmanager
+def transaction(db_path, immediate=False):
+    """Yield the shared connection inside a transaction.
+
+    Commits on success and rolls back on error. The per-database lock is
+    held for the duration, so callers on different threads never
+    interleave statements. With `immediate`, the write lock is taken up
+    front so reads made in the transaction cannot be changed by another
+    process before its writes commit.
+    """
+    conn, lock = _entry(db_path)
+    with lock:
+        with conn:
+            if immediate:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+
+def close_connection(db_path):
+    """Close and forget the shared connection for db_path, if open."""
+    with _registry_lock:
+        entry = _connections.pop(_key(db_path), None)
+    if entry is not None:
+        conn, lock = entry
+        with lock:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+def close_all():
+    """Close every open connection (runs at interpreter exit)."""
+    with _registry_lock:
+        keys = list(_connections)
+    for key in keys:
+        close_connection(key)
+
+
+atexit.register(close_all)
+
+
+def init_database(db_path, schema_path=DEFAULT_SCHEMA_PATH):
+    """Initialize the SQLite database with schema at db_path."""
+    if not os.path.exists(schema_path):
+        schema_path = DEFAULT_SCHEMA_PATH
+    with open(schema_path, 'r') as f:
+        schema = f.read()
+    conn, lock = _entry(db_path)
+    with lock:
+        conn.executescript(schema)
+        conn.commit()
+
+
+def _current_state(conn, pet_id=DEFAULT_PET_ID):
+    """Return (state dict, events since the latest snapshot), or (None, 0).
+
+    The state is the pet's latest snapshot with the following events'
+    deltas summed on top; a pet with events but no snapshot replays from
+    all-zero stats. Besides the stats, the dict holds 'last_updated' (the
+    aging clock) and 'saved_at' (when the latest change was saved).
+    """
+    snapshot = conn.execute(_SQL_LATEST_SNAPSHOT, (pet_id,)).fetchone()
+    if snapshot:
+        values = list(snapshot[1:7])
+        last_updated = saved_at = snapshot[7]
+        after = snapshot[8]
+    else:
+        values = [0] * len(STATE_FIELDS)
+        last_updated = saved_at = None
+        after = 0
+    replay = conn.execute(_SQL_REPLAY_EVENTS, (pet_id, after)).fetchone()
+    count = replay[0]
+    if not snapshot and not count:
+        return None, 0
+    if count:
+        values = [v + (d or 0) for v, d in zip(values, replay[1:7])]
+        saved_at, last_updated = conn.execute(_SQL_EVENT_TIMES, (replay[7],)).fetchone()
+    elif after:
+        row = conn.execute(_SQL_EVENT_TIMES, (after,)).fetchone()
+        if row:
+            saved_at = row[0]
+    state = dict(zip(STATE_FIELDS, values))
+    state['last_updated'] = last_updated
+    state['saved_at'] = saved_at
+    return state, count
+
+
+def _append_events(conn, pet_id, changes, now):
+    current, pending = _current_state(conn, pet_id)
+    previous = [current[f] for f in STATE_FIELDS] if current else [0] * len(STATE_FIELDS)
+    last_updated = current['last_updated'] if current else None
+    rows = []
+    for action, state in changes:
+        values = [int(state[f]) for f in STATE_FIELDS]
+        last_updated = state.get('last_updated') or last_updated
+        deltas = [v - p for v, p in zip(values, previous)]
+        if any(deltas):
+            rows.append((action,) + tuple(deltas) + (state.get('saved_at') or now, pet_id, last_updated))
+        previous = values
+    if rows:
+        conn.executemany(_SQL_INSERT_EVENT, rows)
+        pending += len(rows)
+    if pending >= SNAPSHOT_EVERY:
+        last_event = conn.execute(_SQL_LAST_EVENT, (pet_id,)).fetchone()[0]
+        cursor = conn.execute(_SQL_INSERT_SNAPSHOT,
+                              tuple(previous) + (last_updated or now, last_event, pet_id))
+        conn.execute(_SQL_PRUNE_SNAPSHOTS, (pet_id, cursor.lastrowid))
+    return len(rows)
+
+
+def append_state_events(db_path, changes, pet_id=DEFAULT_PET_ID):
+    """Record state changes as events in a single transaction.
+
+    `changes` is a sequence of (action, state dict) in the order they
+    happened. Each becomes one state_events row holding the change from the
+    previous state (unchanged states are skipped). A compacted snapshot is
+    written once SNAPSHOT_EVERY events follow the pet's latest one, and its
+    older snapshots are dropped. An event is stamped with the state's
+    'saved_at' (an ISO timestamp) if it has one, else the current time.
+    Returns the number of events written.
+    """
+    now = datetime.now().isoformat()
+    with transaction(db_path) as conn:
+        return _append_events(conn, pet_id, changes, now)
+
+
+def save_state(db_path, mango_state, action='save', pet_id=DEFAULT_PET_ID):
+    """Save one pet's state dict into the database at db_path."""
+    append_state_events(db_path, [(action, mango_state)], pet_id)
 
 
-def load_state(db_path):
-    """Load Mango state from database at db_path, return dict or None."""
-    if not os.path.exists(db_path):
+def load_state(db_path, pet_id=DEFAULT_PET_ID):
+    """Load one pet's state from database at db_path, return dict or None."""
+    if _key(db_path) not in _connections and not os.path.exists(db_path):
         return None
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM mango_state ORDER BY id DESC LIMIT 1")
-    result = cursor.fetchone()
-    conn.close()
-
-    if result:
-        return {
-            'hunger': result[1],
-            'happiness': result[2],
-            'cleanliness': result[3],
-            'energy': result[4],
-            'health': result[5],
-            'age': result[6],
-            'last_updated': result[7],
-        }
-    return None
+    with transaction(db_path) as conn:
+        state, _ = _current_state(conn, pet_id)
+    return state
+
+
+def save_states(db_path, changes):
+    """Save many pets in one transaction.
+
+    `changes` is an iterable of (pet_id, action, state dict). Returns the
+    number of events written.
+    """
+    by_pet = {}
+    for pet_id, action, state in changes:
+        by_pet.setdefault(pet_id, []).append((action, state))
+    now = datetime.now().isoformat()
+    written = 0
+    with transaction(db_path) as conn:
+        for pet_id, pet_changes in by_pet.items():
+            written += _append_events(conn, pet_id, pet_changes, now)
+    return written
+
+
+def load_states(db_path, pet_ids):
+    """Load many pets in one transaction: {pet_id: state dict or None}."""
+    with transaction(db_path) as conn:
+        return {pet_id: _current_state(conn, pet_id)[0] for pet_id in pet_ids}
+
+
+def read_state_chunk(conn, after_id, limit):
+    """Read the next `limit` pets after `after_id` on `conn`.
+
+    Returns (last pet id scanned or None when there are no more pets,
+    rows) where each row is (pet_id, hunger, happiness, cleanliness,
+    energy, health, age, events since snapshot, last_updated, saved_at); pets that
+    have never been saved are skipped. Pages are keyed by pet id, so
+    memory stays bounded by `limit` however many pets there are.
+    """
+    ids = conn.execute(_SQL_PET_IDS_AFTER, (after_id, limit)).fetchall()
+    if not ids:
+        return None, []
+    last_id = ids[-1][0]
+    return last_id, conn.execute(_SQL_STATE_CHUNK, (ids[0][0], last_id)).fetchall()
+
+
+def write_state_chunk(conn, action, rows, now=None):
+    """Append one `action` event per changed pet on `conn`.
+
+    `rows` are (pet_id, new values, deltas, events since snapshot,
+    last_updated, saved_at), with values and deltas in STATE_FIELDS order;
+    each event is stamped with its row's saved_at, or `now` when that is
+    None. Events are inserted with a single executemany; pets that reach
+    SNAPSHOT_EVERY events get a compacted snapshot as in save_state().
+    Returns the number of events written.
+    """
+    now = now or datetime.now().isoformat()
+    events = []
+    snapshots = []
+    for pet_id, values, deltas, pending, last_updated, saved_at in rows:
+        if not any(deltas):
+            continue
+        events.append((action,) + tuple(deltas) + (saved_at or now, pet_id, last_updated))
+        if pending + 1 >= SNAPSHOT_EVERY:
+            snapshots.append((pet_id, tuple(values), last_updated))
+    conn.executemany(_SQL_INSERT_EVENT, events)
+    for pet_id, values, last_updated in snapshots:
+        last_event = conn.execute(_SQL_LAST_EVENT, (pet_id,)).fetchone()[0]
+        cursor = conn.execute(_SQL_INSERT_SNAPSHOT, values + (last_updated or now, last_event, pet_id))
+        conn.execute(_SQL_PRUNE_SNAPSHOTS, (pet_id, cursor.lastrowid))
+    return len(events)
+
+
+def create_pet(db_path, name='Mango'):
+    """Register a new pet and return its id."""
+    with transaction(db_path) as conn:
+        return conn.execute(_SQL_INSERT_PET, (name,)).lastrowid
+
+
+def list_pets(db_path):
+    """Return (id, name) for every registered pet."""
+    with transaction(db_path) as conn:
+        return conn.execute(_SQL_LIST_PETS).fetchall()
+
+
+def state_history(db_path, action=None, limit=100, pet_id=DEFAULT_PET_ID):
+    """Return a pet's newest state events (optionally of one action), newest first.
+
+    Each event is a dict with id, action, created_at and the signed change
+    of every stat.
+    """
+    with transaction(db_path) as conn:
+        if action is None:
+            rows = conn.execute(_SQL_STATE_HISTORY, (pet_id, limit)).fetchall()
+        else:
+            rows = conn.execute(_SQL_STATE_HISTORY_FOR_ACTION, (pet_id, action, limit)).fetchall()
+    events = []
+    for row in rows:
+        event = {'id': row[0], 'action': row[1], 'created_at': row[8]}
+        event.update(zip(STATE_FIELDS, row[2:8]))
+        events.append(event)
+    return events
+
+
+def save_score(db_path, score, pet_id=DEFAULT_PET_ID):
+    """Record a Flappy Mango score for a pet."""
+    with transaction(db_path) as conn:
+        conn.execute(_SQL_INSERT_SCORE, (score, pet_id))
+
+
+def record_flappy_session(db_path, session, pet_id=DEFAULT_PET_ID):
+    """Store a finished FlappySession in a single transaction.
+
+    The session's id is the idempotency key: a session already stored is
+    ignored. Returns True if the row was inserted, False for a repeat.
+    """
+    played_at = datetime.fromtimestamp(session.ended_at, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    with transaction(db_path) as conn:
+        cursor = conn.execute(
+            _SQL_INSERT_SESSION,
+            (
+                session.score,
+                played_at,
+                session.session_id,
+                session.duration,
+                session.flaps,
+                session.obstacles_passed,
+                pet_id,
+            ),
+        )
+        return cursor.rowcount == 1
+
+
+def get_high_score(db_path, pet_id=None):
+    """Return the best recorded Flappy Mango score (0 if none).
+
+    Covers every pet unless `pet_id` is given.
+    """
+    with transaction(db_path) as conn:
+        if pet_id is None:
+            result = conn.execute(_SQL_HIGH_SCORE).fetchone()
+        else:
+            result = conn.execute(_SQL_PET_HIGH_SCORE, (pet_id,)).fetchone()
+    return result[0] if result and result[0] else 0
+
+
+def top_scores(db_path, limit, pet_id=DEFAULT_PET_ID):
+    """Return the pet's best `limit` scores as (score, played_at), best first.
+
+    Ties are listed in the order they were saved.
+    """
+    with transaction(db_path) as conn:
+        return conn.execute(_SQL_TOP_SCORES, (pet_id, limit)).fetchall()
+
+
+def score_counts(db_path, pet_id=DEFAULT_PET_ID):
+    """Return (score, games) pairs for every distinct score of the pet."""
+    with transaction(db_path) as conn:
+        return conn.execute(_SQL_SCORE_COUNTS, (pet_id,)).fetchall()
+
+
+def score_rollup(db_path, period, bucket, pet_id=DEFAULT_PET_ID):
+    """Return the pet's (best, games, total) for one rollup bucket, or None."""
+    with transaction(db_path) as conn:
+        return conn.execute(_SQL_ROLLUP, (pet_id, period, bucket)).fetchone()
+
+
+class StateWriter:
+    """Write-behind persistence for Mango's state.
+
+    `submit` copies the state with the action that changed it and returns
+    immediately; a daemon thread writes everything queued once `interval`
+    seconds have passed since the first unsaved change, so a burst of
+    mutations costs one transaction (one state_events row per action).
+    `flush` writes the queue synchronously and is used before reads, on
+    scene changes and at shutdown.
+    """
+
+    # queued changes beyond this are folded into their successor
+    MAX_PENDING = 256
+
+    def __init__(self, db_path, interval=0.5, pet_id=DEFAULT_PET_ID):
+        self.db_path = db_path
+        self.pet_id = pet_id
+        self.interval = interval
+        self.submitted = 0
+        self.written = 0
+        self._pending = None
+        self._closed = False
+        self._cond = threading.Condition()
+        # held while taking and writing a snapshot so writes land in order;
+        # re-entrant because a signal handler may flush() on the thread
+        # that is already inside _write_pending
+        self._write_lock = threading.RLock()
+        self._thread = None
+        _writers.add(self)
+
+    def submit(self, mango_state, action='save'):
+        """Queue a copy of `mango_state`, changed by `action`, to be written."""
+        snapshot = dict(mango_state)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("StateWriter is closed")
+            if self._pending is None:
+                self._pending = []
+            self._pending.append((action, snapshot))
+            if len(self._pending) > self.MAX_PENDING:
+                # the next change's event absorbs this one's delta
+                del self._pending[0]
+            self.submitted += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='mango-state-writer', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    @property
+    def dirty(self):
+        """True while submitted changes have not been written yet."""
+        return self._pending is not None
+
+    def flush(self):
+        """Write any queued changes before returning."""
+        self._write_pending()
+
+    def close(self):
+        """Flush and stop the writer thread."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+        _writers.discard(self)
+
+    def _write_pending(self):
+        with self._write_lock:
+            with self._cond:
+                changes = self._pending
+                self._pending = None
+            if not changes:
+                return
+            try:
+                append_state_events(self.db_path, changes, self.pet_id)
+                self.written += 1
+            except BaseException:
+                # requeue ahead of anything submitted meanwhile (also when
+                # a signal handler's SystemExit interrupts the write)
+                with self._cond:
+                    self._pending = changes + (self._pending or [])
+                raise
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # debounce: let further changes coalesce into this write
+                deadline = time.monotonic() + self.interval
+                while not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            try:
+                self._write_pending()
+            except Exception:
+                # retried after the next interval
+                pass
+
+
+_writers = weakref.WeakSet()
+
+
+def flush_all_writers():
+    """Flush every live StateWriter (runs at interpreter exit)."""
+    for writer in list(_writers):
+        try:
+            writer.flush()
+        except Exception:
+            pass
+
+
+# atexit runs handlers last-in first-out: flush writers before closing connections
+atexit.register(flush_all_writers)
@@ -0,0 +1,98 @@
+"""Mango's stat decay rules, in closed form.
+
+While the game runs, update_stats() applies one decay tick every
+DECAY_INTERVAL seconds. Each tick:
+
+- lowers hunger, happiness, cleanliness and energy by DECAY_PER_TICK
+  (never below 0),
+- then costs HEALTH_PENALTY health if hunger, cleanliness or energy is at
+  or below LOW_STAT,
+- and makes Mango sick once health is at or below SICK_HEALTH.
+
+Every RANDOM_EVENT_INTERVAL seconds there is a RANDOM_EVENT_CHANCE of a
+random event, split evenly between falling sick (-SICK_EVENT_HEALTH
+health, only when not sick already) and misbehaving
+(-MISBEHAVIOUR_HAPPINESS happiness); the game and fleet.py share these.
+
+Mango also ages one day every AGE_INTERVAL seconds. Because every tick
+subtracts the same amount, the state after any number of ticks can be
+computed directly, so catch_up() brings a pet that was closed for months
+up to date in constant time instead of replaying each tick.
+"""
+from datetime import datetime, timedelta
+
+DECAY_INTERVAL = 30         # seconds per decay tick
+DECAY_PER_TICK = 1
+DECAYING_STATS = ('hunger', 'happiness', 'cleanliness', 'energy')
+# health suffers on every tick where one of these is at or below LOW_STAT
+PENALTY_STATS = ('hunger', 'cleanliness', 'energy')
+LOW_STAT = 10
+HEALTH_PENALTY = 3
+SICK_HEALTH = 30
+AGE_INTERVAL = 24 * 3600    # seconds per point of age
+
+RANDOM_EVENT_INTERVAL = 120  # seconds between random event rolls
+RANDOM_EVENT_CHANCE = 0.3
+SICK_EVENT_HEALTH = 20
+MISBEHAVIOUR_HAPPINESS = 10
+
+
+def apply_decay(state, ticks=1):
+    """Return a copy of `state` after `ticks` decay ticks."""
+    state = dict(state)
+    if ticks <= 0:
+        return state
+    # a penalty stat is at or below LOW_STAT from tick ceil((v - LOW_STAT) / step)
+    # onwards, and stays there; the first tick to check is tick 1
+    lowest = min(state[stat] for stat in PENALTY_STATS)
+    first_low = max(1, -(-(lowest - LOW_STAT) // DECAY_PER_TICK))
+    penalised = max(0, ticks - first_low + 1)
+    for stat in DECAYING_STATS:
+        state[stat] = max(0, state[stat] - DECAY_PER_TICK * ticks)
+    state['health'] = max(0, state['health'] - HEALTH_PENALTY * penalised)
+    return state
+
+
+def _parse(timestamp):
+    if isinstance(timestamp, datetime):
+        return timestamp
+    try:
+        return datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+
+
+def catch_up(state, saved_at=None, now=None):
+    """Bring a loaded state up to `now` (default: the current local time).
+
+    Decay runs from `saved_at` (when the state was last saved) and aging
+    from state['last_updated'] (when Mango last aged). Weather and random
+    events are left out: they are not known for the time the game was
+    closed.
+
+    Returns (state, sick, leftover) where `state` is a new dict, `sick` is
+    True if Mango fell sick during the gap and `leftover` is the seconds
+    since the last whole decay tick, for the running game's tick timer.
+    """
+    now = now or datetime.now()
+    state = dict(state)
+    sick = False
+    leftover = 0.0
+
+    saved = _parse(saved_at)
+    if saved is not None:
+        elapsed = max(0.0, (now - saved).total_seconds())
+        ticks = int(elapsed // DECAY_INTERVAL)
+        leftover = elapsed - ticks * DECAY_INTERVAL
+        if ticks:
+            state = apply_decay(state, ticks)
+            sick = state['health'] <= SICK_HEALTH
+
+    aged = _parse(state.get('last_updated'))
+    if aged is not None:
+        days = int(max(0.0, (now - aged).total_seconds()) // AGE_INTERVAL)
+        if days:
+            state['age'] += days
+            # keep the partial day so the next birthday is not delayed
+            state['last_updated'] = (aged + timedelta(seconds=days * AGE_INTERVAL)).isoformat()
+    return state, sick, leftover
@@ -0,0 +1,103 @@
+"""Values derived from Mango's stats, recomputed only when they change.
+
+The hub used to work out Mango's mood, the sprite to show and whether
+health is low enough to make Mango sick on every frame, although none of
+them can change unless a stat (or the sickness flag) does. DerivedState
+caches them under a key of (state object, PetState.version, is_sick):
+refresh() is a single tuple comparison on idle frames and only recomputes
+after a change.
+
+When a refresh does change something, subscribers are called with the
+DerivedState and the set of names that changed:
+
+- 'stats': any stat or age (the stat bars need redrawing)
+- 'mood': the value of get_mango_mood()
+- 'sprite': the hub sprite key
+- 'low_health': health is at or below decay.SICK_HEALTH
+"""
+from decay import SICK_HEALTH
+
+# moods with their own hub sprite; every other mood shows 'idle'
+HUB_SPRITE_MOODS = ('happy', 'sad', 'tired', 'dirty')
+
+
+def mood_for(state, is_sick=False):
+    """Mango's mood for a PetState."""
+    if is_sick:
+        return "sick"
+    elif state.cleanliness < 30:
+        return "dirty"
+    elif state.energy < 20:
+        return "tired"
+    elif state.happiness > 70:
+        return "happy"
+    elif state.happiness < 30:
+        return "sad"
+    else:
+        return "neutral"
+
+
+def sprite_for(mood):
+    """Hub sprite key for a mood."""
+    return mood if mood in HUB_SPRITE_MOODS else 'idle'
+
+
+class DerivedState:
+    """Memoised mood, hub sprite and low-health flag of a game's pet."""
+
+    def __init__(self, game):
+        self.game = game
+        self.mood = None
+        self.sprite = None
+        self.low_health = False
+        self._state = None
+        self._version = None
+        self._sick = None
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """Call `callback(derived, changed)` after each refresh that changes something."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        try:
+            self._listeners.remove(callback)
+        except ValueError:
+            pass
+
+    def invalidate(self):
+        """Force the next refresh() to recompute and notify."""
+        self._state = None
+
+    def refresh(self):
+        """Recompute if the stats or sickness changed; return the changed names."""
+        game = self.game
+        state = game.mango_state
+        version = state.version
+        sick = game.is_sick
+        if state is self._state and version == self._version and sick == self._sick:
+            return frozenset()
+
+        changed = {'stats'} if (state is not self._state or version != self._version) else set()
+        self._state, self._version, self._sick = state, version, sick
+
+        mood = mood_for(state, sick)
+        if mood != self.mood:
+            self.mood = mood
+            changed.add('mood')
+        sprite = sprite_for(mood)
+        if sprite != self.sprite:
+            self.sprite = sprite
+            changed.add('sprite')
+        low_health = state.health <= SICK_HEALTH
+        if low_health != self.low_health:
+            self.low_health = low_health
+            changed.add('low_health')
+
+        changed = frozenset(changed)
+        if changed:
+            for callback in list(self._listeners):
+                callback(self, changed)
+        return changed
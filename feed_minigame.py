@@ -12,6 +12,8 @@ try:
 except Exception:
     pygame = None
 
+from ui_helpers import render_text
+
 try:
     import project as _project
 except Exception:
@@ -361,11 +363,11 @@ def play_feed_minigame(game, feed_state, exit_state):
                 pygame.draw.rect(game.screen, (255, 255, 255), (bar_x, bar_y, bar_w, bar_h), 1)
                 # textual count
                 # use black text for better readability on the progress bar
-                txt = game.font.render(f"Seeds: {caught}/{target}", True, (0,0,0))
+                txt = render_text(game.font, f"Seeds: {caught}/{target}", True, (0,0,0))
                 game.screen.blit(txt, (bar_x + bar_w + 8, bar_y - 1))
             except Exception:
                 try:
-                    txt = game.font.render(f"Seeds caught: {caught}/{target}", True, (255,255,255))
+                    txt = render_text(game.font, f"Seeds caught: {caught}/{target}", True, (255,255,255))
                     game.screen.blit(txt, (20, 20))
                 except Exception:
                     pass
@@ -385,11 +387,11 @@ def play_feed_minigame(game, feed_state, exit_state):
             try:
                 game.mango_state['hunger'] = 100
                 try:
-                    game.save_state()
+                    game.save_state('feed_minigame')
                 except Exception:
                     pass
                 try:
-                    game.hud_messages.append(("Mango is full!", time.time() + 2.0))
+                    game.show_message("Mango is full!", 2.0)
                 except Exception:
                     pass
             except Exception:
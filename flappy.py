@@ -15,6 +15,10 @@ try:
 except Exception:
     pygame = None
 
+from assets import get_sprite_variant
+from flappy_sim import FlappySim, FlappySession
+from ui_helpers import render_text
+
 # Try to import project for constants; if unavailable at import-time we fall back
 # to resolving it at runtime inside the function. This keeps the module import
 # safe in test/analysis environments that may not have the full runtime ready.
@@ -23,6 +27,122 @@ try:
 except Exception:
     _project = None
 
+# Fixed simulation step: gameplay constants (gravity, scroll speed, spawn
+# interval) are tuned per 1/60 s step, independent of the render rate.
+SIM_STEP = 1.0 / 60.0
+# Longest frame time fed into the accumulator (e.g. after a window drag)
+MAX_FRAME_TIME = 0.25
+# Cap on catch-up steps per rendered frame: enough to cover MAX_FRAME_TIME,
+# so the game keeps real time down to 1 / MAX_FRAME_TIME (4) FPS. Only
+# longer stalls are dropped, and those cannot spiral.
+MAX_STEPS_PER_FRAME = math.ceil(MAX_FRAME_TIME / SIM_STEP)
+
+
+def fixed_steps(accumulator, frame_dt):
+    """Split a frame's elapsed time into whole SIM_STEPs.
+
+    Returns (steps to simulate, accumulator left over). `frame_dt` is
+    clamped to MAX_FRAME_TIME; the leftover is what interpolation uses.
+    """
+    accumulator += min(frame_dt, MAX_FRAME_TIME)
+    steps = min(int(accumulator // SIM_STEP), MAX_STEPS_PER_FRAME)
+    accumulator -= steps * SIM_STEP
+    if steps == MAX_STEPS_PER_FRAME:
+        # too far behind: drop the backlog rather than spiralling
+        accumulator = min(accumulator, SIM_STEP)
+    return steps, accumulator
+
+
+class ObstacleRenderer:
+    """Draw Flappy obstacles from pre-rendered pieces.
+
+    Tree columns are rendered once per height bucket (rounded up to
+    BUCKET pixels) and cropped to the exact height when blitted, so the
+    end facing the gap always matches. Textured columns live only in the
+    shared sprite variant cache, so its budget can evict them; the plain
+    fallback columns are kept here and dropped when the screen height
+    changes. The crow heads are rendered once as small sprites. Drawing
+    an obstacle is then two fills for the shadows and four blits.
+    """
+
+    COLUMN_WIDTH = 70
+    BUCKET = 16
+    HEAD_SIZE = 26
+    WOOD_BROWN = (101, 67, 33)
+
+    def __init__(self, tree_texture=None, black=(20, 20, 20), white=(255, 255, 255)):
+        self.tree_texture = tree_texture
+        self._black = black
+        self._white = white
+        self._columns = {}  # (bucket_height, flipped) -> plain surface
+        self._screen_height = None
+        self._head_top = self._render_head(top=True)
+        self._head_bottom = self._render_head(top=False)
+
+    def _render_head(self, top):
+        """Pre-render one crow head (body, beak and eye) centred on the sprite."""
+        size = self.HEAD_SIZE
+        c = size // 2
+        surf = pygame.Surface((size, size), pygame.SRCALPHA)
+        d = -1 if top else 1  # beak and eye point away from the column
+        pygame.draw.circle(surf, self._black, (c, c), 12)
+        beak_points = [(c, c + 5 * d), (c - 5, c + 12 * d), (c + 5, c + 12 * d)]
+        pygame.draw.polygon(surf, (255, 140, 0), beak_points)
+        pygame.draw.circle(surf, self._white, (c - 3, c + 2 * d), 3)
+        pygame.draw.circle(surf, self._black, (c - 3, c + 2 * d), 2)
+        return surf
+
+    def _column(self, height, flipped):
+        """Return the column surface for the bucket that covers `height`."""
+        bucket_h = -(-height // self.BUCKET) * self.BUCKET
+        if self.tree_texture is not None:
+            return get_sprite_variant('tree', self.tree_texture, (self.COLUMN_WIDTH, bucket_h), flip=(False, flipped))
+        key = (bucket_h, flipped)
+        surf = self._columns.get(key)
+        if surf is None:
+            surf = pygame.Surface((self.COLUMN_WIDTH, bucket_h), pygame.SRCALPHA)
+            pygame.draw.rect(surf, self.WOOD_BROWN, surf.get_rect(), border_radius=12)
+            self._columns[key] = surf
+        return surf
+
+    def draw(self, surface, x, gap_y, gap, screen_height):
+        """Draw one obstacle whose gap is centred on `gap_y`."""
+        if screen_height != self._screen_height:
+            # resized: the old height buckets will not be drawn again
+            self._columns.clear()
+            self._screen_height = screen_height
+        w = self.COLUMN_WIDTH
+        half_gap = gap // 2
+        gap_top = gap_y - half_gap
+        gap_bottom = gap_y + half_gap
+
+        # Drop shadows (opaque on the logical screen, as before)
+        shadow_offset = 3
+        surface.fill((0, 0, 0), (x + shadow_offset, shadow_offset, w, gap_top))
+        surface.fill((0, 0, 0), (x + shadow_offset, gap_bottom + shadow_offset, w, screen_height - gap_bottom))
+
+        top_h = max(8, gap_top)
+        bottom_h = max(8, screen_height - gap_bottom)
+        col = self._column(top_h, False)
+        # show the bottom end of the top column so it meets the gap
+        surface.blit(col, (x, 0), (0, col.get_height() - top_h, w, top_h))
+        col = self._column(bottom_h, True)
+        surface.blit(col, (x, gap_bottom), (0, 0, w, bottom_h))
+
+        c = self.HEAD_SIZE // 2
+        surface.blit(self._head_top, (x + 35 - c, gap_top - 15 - c))
+        surface.blit(self._head_bottom, (x + 35 - c, gap_bottom + 15 - c))
+
+
+def _get_obstacle_renderer(game):
+    """Return the game's obstacle renderer, rebuilding it if the tree texture changed."""
+    tree = getattr(game, 'tree_texture', None)
+    renderer = getattr(game, '_obstacle_renderer', None)
+    if renderer is None or renderer.tree_texture is not tree:
+        renderer = ObstacleRenderer(tree, black=_project.BLACK, white=_project.WHITE)
+        game._obstacle_renderer = renderer
+    return renderer
+
 
 def play_flappy_mango(game, flappy_state, exit_state):
     """Run the Flappy Mango mini-game using the provided game instance.
@@ -70,21 +190,25 @@ def play_flappy_mango(game, flappy_state, exit_state):
     SCREEN_HEIGHT = getattr(_project, 'SCREEN_HEIGHT', game.screen.get_height())
     FPS = getattr(_project, 'FPS', 60)
 
-    # Flappy Mango game variables
-    mango_x = 150
-    mango_y = SCREEN_HEIGHT // 2
-    mango_velocity = 0
-    gravity = 0.75
-    jump_strength = -13
-
-    crows = []
-    crow_spawn_timer = 0
-    crow_spawn_interval = 150
+    # Flappy Mango game variables; the rules themselves live in FlappySim
+    # (shares the global `random` stream so seeding random still works)
+    sim = FlappySim(SCREEN_WIDTH, SCREEN_HEIGHT, rng=random)
+    mango_x = sim.bird_x
 
     score = 0
     game_over = False
     game_started = False
     last_score_update = 0
+    # leaderboard standing of the finished run, shown on the game-over panel
+    result_rank = None
+    today_best = None
+
+    # Fixed-timestep simulation: physics advances in SIM_STEP increments
+    # regardless of how fast frames are rendered, and drawing interpolates
+    # between the last two simulated states.
+    render_fps = getattr(game, 'render_fps', FPS)
+    accumulator = 0.0
+    last_frame_time = time.perf_counter()
 
     # Start flappy background music and exercise SFX path (safe, non-fatal)
     try:
@@ -207,7 +331,7 @@ def play_flappy_mango(game, flappy_state, exit_state):
                     if not game_started:
                         game_started = True
                     if not game_over:
-                        mango_velocity = jump_strength
+                        sim.flap()
                         try:
                             if getattr(game, '_force_short_flap_in_flappy', False):
                                 try:
@@ -268,11 +392,10 @@ def play_flappy_mango(game, flappy_state, exit_state):
                         game._play_sfx('button')
                     except Exception:
                         pass
-                    mango_x = 150
-                    mango_y = SCREEN_HEIGHT // 2
-                    mango_velocity = 0
-                    crows = []
+                    sim.reset()
                     score = 0
+                    result_rank = None
+                    today_best = None
                     game_over = False
                     game_started = False
                     last_score_update = 0
@@ -283,47 +406,40 @@ def play_flappy_mango(game, flappy_state, exit_state):
                     except Exception:
                         pass
 
+        now = time.perf_counter()
+        frame_dt = now - last_frame_time
+        last_frame_time = now
         if not game_over and game_started:
-            mango_velocity += gravity
-            mango_y += mango_velocity
-
-            crow_spawn_timer += 1
-            if crow_spawn_timer >= crow_spawn_interval:
-                crows.append({
-                    'x': SCREEN_WIDTH,
-                    'y': random.randint(150, SCREEN_HEIGHT - 250),
-                    'gap': 220,
-                    'scored': False
-                })
-                crow_spawn_timer = 0
-
-            for crow in crows[:]:
-                crow['x'] -= 3
-                if crow['x'] < -50:
-                    crows.remove(crow)
-                if not crow['scored'] and crow['x'] + 50 < mango_x:
-                    score += 1
-                    crow['scored'] = True
-                    last_score_update = time.time()
-
-            mango_rect = pygame.Rect(mango_x - 15, mango_y - 15, 30, 30)
-            for crow in crows:
-                top_rect = pygame.Rect(crow['x'], 0, 70, crow['y'] - crow['gap'] // 2)
-                bottom_rect = pygame.Rect(crow['x'], crow['y'] + crow['gap'] // 2, 70, SCREEN_HEIGHT - crow['y'] - crow['gap'] // 2)
-                if mango_rect.colliderect(top_rect) or mango_rect.colliderect(bottom_rect):
-                    game_over = True
-                    try:
-                        game._play_sfx('thump')
-                    except Exception:
-                        pass
-                    break
-
-            if mango_y >= SCREEN_HEIGHT - 60 or mango_y <= -150:
+            steps, accumulator = fixed_steps(accumulator, frame_dt)
+        else:
+            steps, accumulator = 0, 0.0
+
+        for _ in range(steps):
+            if game_over:
+                break
+            if sim.step():
+                score = sim.score
+                last_score_update = time.time()
+            if sim.game_over:
                 game_over = True
                 try:
                     game._play_sfx('thump')
                 except Exception:
                     pass
+                # the run's result is stored (and rewarded) once, here
+                try:
+                    game.record_flappy_session(FlappySession.from_sim(sim))
+                    board = game.get_leaderboard()
+                    if board is not None:
+                        result_rank = board.rank(sim.score)
+                        today_best = board.best('day')
+                except Exception:
+                    pass
+
+        # Interpolation factor between the previous and current sim state
+        alpha = accumulator / SIM_STEP if (game_started and not game_over) else 1.0
+        draw_y = sim.interpolated_bird_y(alpha)
+        crow_offset = sim.obstacle_offset(alpha)
 
         # Draw background and UI elements via game helpers
         try:
@@ -350,14 +466,14 @@ def play_flappy_mango(game, flappy_state, exit_state):
                     nch = 'N/A'
                 lines = [f"mixer_init: {init}", f"channels: {nch}", f"master: {game.master_volume:.2f}", f"music: {game.music_volume:.2f}", f"sfx: {game.sfx_volume:.2f}"]
                 for i, ln in enumerate(lines):
-                    txt = game.tiny_font.render(ln, True, _project.WHITE)
+                    txt = render_text(game.tiny_font, ln, True, _project.WHITE)
                     game.screen.blit(txt, (ox + 8, oy + 8 + i * 18))
                 try:
                     if os.path.exists('audio_debug.log'):
                         with open('audio_debug.log', 'r') as _lf:
                             tail = _lf.read().splitlines()[-4:]
                         for j, ln in enumerate(tail):
-                            txt = game.tiny_font.render(ln[-60:], True, (200, 200, 200))
+                            txt = render_text(game.tiny_font, ln[-60:], True, (200, 200, 200))
                             game.screen.blit(txt, (ox + 8, oy + 8 + (5 + j) * 16))
                 except Exception:
                     pass
@@ -374,44 +490,19 @@ def play_flappy_mango(game, flappy_state, exit_state):
         except Exception:
             pass
 
-        for crow in crows:
+        try:
+            obstacle_renderer = _get_obstacle_renderer(game)
+        except Exception:
+            obstacle_renderer = None
+        for crow in sim.obstacles:
+            crow_x = sim.screen_x(crow)
             try:
-                shadow_offset = 3
-                pygame.draw.rect(game.screen, (0, 0, 0, 100), (crow['x'] + shadow_offset, shadow_offset, 70, crow['y'] - crow['gap'] // 2))
-                pygame.draw.rect(game.screen, (0, 0, 0, 100), (crow['x'] + shadow_offset, crow['y'] + crow['gap'] // 2 + shadow_offset, 70, SCREEN_HEIGHT - crow['y'] - crow['gap'] // 2))
-                top_h = max(8, crow['y'] - crow['gap'] // 2)
-                bottom_h = max(8, SCREEN_HEIGHT - crow['y'] - crow['gap'] // 2)
-                if getattr(game, 'tree_texture', None):
-                    tex_top = pygame.transform.smoothscale(game.tree_texture, (70, top_h))
-                    game.screen.blit(tex_top, (crow['x'], 0))
-                    tex_bot = pygame.transform.smoothscale(game.tree_texture, (70, bottom_h))
-                    try:
-                        tex_bot = pygame.transform.flip(tex_bot, False, True)
-                    except Exception:
-                        pass
-                    game.screen.blit(tex_bot, (crow['x'], crow['y'] + crow['gap'] // 2))
-                else:
-                    WOOD_BROWN = (101, 67, 33)
-                    crow_top_rect = pygame.Rect(crow['x'], 0, 70, top_h)
-                    pygame.draw.rect(game.screen, WOOD_BROWN, crow_top_rect, border_radius=12)
-                    crow_bottom_rect = pygame.Rect(crow['x'], crow['y'] + crow['gap'] // 2, 70, bottom_h)
-                    pygame.draw.rect(game.screen, WOOD_BROWN, crow_bottom_rect, border_radius=12)
-                head_y_top = crow['y'] - crow['gap'] // 2 - 15
-                head_y_bottom = crow['y'] + crow['gap'] // 2 + 15
-                pygame.draw.circle(game.screen, _project.BLACK, (crow['x'] + 35, head_y_top), 12)
-                beak_points = [(crow['x'] + 35, head_y_top - 5), (crow['x'] + 30, head_y_top - 12), (crow['x'] + 40, head_y_top - 12)]
-                pygame.draw.polygon(game.screen, (255, 140, 0), beak_points)
-                pygame.draw.circle(game.screen, _project.WHITE, (crow['x'] + 32, head_y_top - 2), 3)
-                pygame.draw.circle(game.screen, _project.BLACK, (crow['x'] + 32, head_y_top - 2), 2)
-                pygame.draw.circle(game.screen, _project.BLACK, (crow['x'] + 35, head_y_bottom), 12)
-                beak_points = [(crow['x'] + 35, head_y_bottom + 5), (crow['x'] + 30, head_y_bottom + 12), (crow['x'] + 40, head_y_bottom + 12)]
-                pygame.draw.polygon(game.screen, (255, 140, 0), beak_points)
-                pygame.draw.circle(game.screen, _project.WHITE, (crow['x'] + 32, head_y_bottom + 2), 3)
-                pygame.draw.circle(game.screen, _project.BLACK, (crow['x'] + 32, head_y_bottom + 2), 2)
+                draw_x = int(round(crow_x + crow_offset))
+                obstacle_renderer.draw(game.screen, draw_x, crow.y, crow.gap, SCREEN_HEIGHT)
             except Exception:
-                crow_top_rect = pygame.Rect(crow['x'], 0, 70, 10)
+                crow_top_rect = pygame.Rect(crow_x, 0, 70, 10)
                 pygame.draw.rect(game.screen, _project.BLACK, crow_top_rect, border_radius=12)
-                crow_bottom_rect = pygame.Rect(crow['x'], crow['y'] + crow['gap'] // 2, 70, 10)
+                crow_bottom_rect = pygame.Rect(crow_x, crow.y + crow.gap // 2, 70, 10)
                 pygame.draw.rect(game.screen, _project.BLACK, crow_bottom_rect, border_radius=12)
 
         mango_wing_offset = int(3 * math.sin(game.animation_time * 4)) if not game_over else 0
@@ -419,7 +510,7 @@ def play_flappy_mango(game, flappy_state, exit_state):
         try:
             shadow_surf = pygame.Surface((60, 30), pygame.SRCALPHA)
             pygame.draw.ellipse(shadow_surf, (0, 0, 0, 40), shadow_surf.get_rect())
-            shadow_rect = shadow_surf.get_rect(center=(int(mango_x + 4), int(mango_y + 14)))
+            shadow_rect = shadow_surf.get_rect(center=(int(mango_x + 4), int(draw_y + 14)))
             game.screen.blit(shadow_surf, shadow_rect)
         except Exception:
             pass
@@ -427,32 +518,32 @@ def play_flappy_mango(game, flappy_state, exit_state):
         if hasattr(game, 'mango_sprites') and game.mango_sprites.get('flying'):
             sprite1 = game.mango_sprites.get('flying')
             sprite2 = game.mango_sprites.get('flying2')
-            flappy_sprite1 = pygame.transform.scale(sprite1, (90, 90)) if sprite1 else None
-            flappy_sprite2 = pygame.transform.scale(sprite2, (90, 90)) if sprite2 else None
+            flappy_sprite1 = get_sprite_variant('flying', sprite1, (90, 90), smooth=False)
+            flappy_sprite2 = get_sprite_variant('flying2', sprite2, (90, 90), smooth=False)
             use_alt = False
             if hasattr(game, '_flap_start') and flappy_sprite2:
                 if time.time() - getattr(game, '_flap_start', 0) < getattr(game, '_flap_duration', 0.5):
                     use_alt = True
             try:
                 if use_alt and flappy_sprite2:
-                    sprite_rect = flappy_sprite2.get_rect(center=(int(mango_x), int(mango_y)))
+                    sprite_rect = flappy_sprite2.get_rect(center=(int(mango_x), int(draw_y)))
                     game.screen.blit(flappy_sprite2, sprite_rect)
                 else:
-                    sprite_rect = flappy_sprite1.get_rect(center=(int(mango_x), int(mango_y)))
+                    sprite_rect = flappy_sprite1.get_rect(center=(int(mango_x), int(draw_y)))
                     game.screen.blit(flappy_sprite1, sprite_rect)
             except Exception:
                 try:
-                    sprite_rect = flappy_sprite1.get_rect(center=(int(mango_x), int(mango_y)))
+                    sprite_rect = flappy_sprite1.get_rect(center=(int(mango_x), int(draw_y)))
                     game.screen.blit(flappy_sprite1, sprite_rect)
                 except Exception:
                     pass
         else:
-            pygame.draw.circle(game.screen, _project.ORANGE, (int(mango_x), int(mango_y)), 18)
-            pygame.draw.ellipse(game.screen, (255, 140, 0), (mango_x - 20, mango_y - 5 + mango_wing_offset, 15, 10))
-            pygame.draw.ellipse(game.screen, (255, 140, 0), (mango_x + 5, mango_y - 5 + mango_wing_offset, 15, 10))
-            pygame.draw.circle(game.screen, _project.BLACK, (int(mango_x - 6), int(mango_y - 5)), 2)
-            pygame.draw.circle(game.screen, _project.BLACK, (int(mango_x + 6), int(mango_y - 5)), 2)
-            beak_points = [(mango_x, mango_y + 3), (mango_x - 2, mango_y + 7), (mango_x + 2, mango_y + 7)]
+            pygame.draw.circle(game.screen, _project.ORANGE, (int(mango_x), int(draw_y)), 18)
+            pygame.draw.ellipse(game.screen, (255, 140, 0), (mango_x - 20, draw_y - 5 + mango_wing_offset, 15, 10))
+            pygame.draw.ellipse(game.screen, (255, 140, 0), (mango_x + 5, draw_y - 5 + mango_wing_offset, 15, 10))
+            pygame.draw.circle(game.screen, _project.BLACK, (int(mango_x - 6), int(draw_y - 5)), 2)
+            pygame.draw.circle(game.screen, _project.BLACK, (int(mango_x + 6), int(draw_y - 5)), 2)
+            beak_points = [(mango_x, draw_y + 3), (mango_x - 2, draw_y + 7), (mango_x + 2, draw_y + 7)]
             pygame.draw.polygon(game.screen, _project.ORANGE, beak_points)
 
         # UI panels, score and game-over drawing
@@ -460,9 +551,9 @@ def play_flappy_mango(game, flappy_state, exit_state):
             score_panel = pygame.Rect(SCREEN_WIDTH - 220, 20, 200, 80)
             pygame.draw.rect(game.screen, _project.SILVER, score_panel, border_radius=15)
             pygame.draw.rect(game.screen, _project.GOLD, score_panel, 3, border_radius=15)
-            score_text = game.large_font.render(f"Score: {score}", True, _project.BLACK)
+            score_text = render_text(game.large_font, f"Score: {score}", True, _project.BLACK)
             game.screen.blit(score_text, (SCREEN_WIDTH - 205, 35))
-            high_score_text = game.small_font.render(f"Best: {game.high_score}", True, _project.DARK_GRAY)
+            high_score_text = render_text(game.small_font, f"Best: {game.high_score}", True, _project.DARK_GRAY)
             game.screen.blit(high_score_text, (SCREEN_WIDTH - 205, 65))
         except Exception:
             pass
@@ -472,20 +563,20 @@ def play_flappy_mango(game, flappy_state, exit_state):
                 start_panel = pygame.Rect(SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT // 2 - 100, 400, 200)
                 pygame.draw.rect(game.screen, _project.WHITE, start_panel, border_radius=20)
                 pygame.draw.rect(game.screen, _project.GOLD, start_panel, 4, border_radius=20)
-                start_text = game.title_font.render("Flappy Mango", True, _project.BLACK)
+                start_text = render_text(game.title_font, "Flappy Mango", True, _project.BLACK)
                 start_rect = start_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
                 game.screen.blit(start_text, start_rect)
-                instruction_text = game.font.render("Press SPACE to start!", True, _project.BLACK)
+                instruction_text = render_text(game.font, "Press SPACE to start!", True, _project.BLACK)
                 inst_rect = instruction_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 10))
                 game.screen.blit(instruction_text, inst_rect)
-                esc_text = game.small_font.render("ESC to return to hub", True, _project.DARK_GRAY)
+                esc_text = render_text(game.small_font, "ESC to return to hub", True, _project.DARK_GRAY)
                 esc_rect = esc_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
                 game.screen.blit(esc_text, esc_rect)
             except Exception:
                 pass
         elif not game_over:
             try:
-                instruction_text = game.small_font.render("SPACE to flap | ESC to quit", True, _project.WHITE)
+                instruction_text = render_text(game.small_font, "SPACE to flap | ESC to quit", True, _project.WHITE)
                 game.screen.blit(instruction_text, (20, SCREEN_HEIGHT - 40))
             except Exception:
                 pass
@@ -494,23 +585,22 @@ def play_flappy_mango(game, flappy_state, exit_state):
                 game_over_panel = pygame.Rect(SCREEN_WIDTH // 2 - 250, SCREEN_HEIGHT // 2 - 150, 500, 300)
                 pygame.draw.rect(game.screen, _project.WHITE, game_over_panel, border_radius=20)
                 pygame.draw.rect(game.screen, _project.RED, game_over_panel, 4, border_radius=20)
-                game_over_text = game.title_font.render("Game Over!", True, _project.RED)
+                game_over_text = render_text(game.title_font, "Game Over!", True, _project.RED)
                 go_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 80))
                 game.screen.blit(game_over_text, go_rect)
-                final_score_text = game.large_font.render(f"Final Score: {score}", True, _project.BLACK)
+                final_score_text = render_text(game.large_font, f"Final Score: {score}", True, _project.BLACK)
                 fs_rect = final_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30))
                 game.screen.blit(final_score_text, fs_rect)
-                restart_text = game.font.render("Press R to restart", True, _project.BLACK)
+                restart_text = render_text(game.font, "Press R to restart", True, _project.BLACK)
                 restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
                 game.screen.blit(restart_text, restart_rect)
-                esc_text = game.font.render("ESC to return to hub", True, _project.BLACK)
+                esc_text = render_text(game.font, "ESC to return to hub", True, _project.BLACK)
                 esc_rect = esc_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60))
                 game.screen.blit(esc_text, esc_rect)
-                if score > 0:
-                    game.save_score(score)
-                    happiness_bonus = min(25, score * 2)
-                    game.mango_state['happiness'] = min(100, game.mango_state['happiness'] + happiness_bonus)
-                    game.save_state()
+                if result_rank is not None:
+                    rank_text = render_text(game.small_font, f"Rank #{result_rank}  |  Today's best: {today_best}", True, _project.DARK_GRAY)
+                    rank_rect = rank_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 105))
+                    game.screen.blit(rank_text, rank_rect)
             except Exception:
                 pass
 
@@ -523,7 +613,7 @@ def play_flappy_mango(game, flappy_state, exit_state):
             except Exception:
                 pass
         try:
-            game.clock.tick(FPS)
+            game.clock.tick(render_fps)
         except Exception:
             try:
                 game.clock.tick(getattr(_project, 'FPS', 60))
@@ -0,0 +1,161 @@
+"""Vectorised Flappy Mango simulator for many parallel runs.
+
+BatchFlappySim advances N independent runs of the FlappySim rules at once
+with NumPy arrays, for difficulty tuning and autopilot evaluation over
+large numbers of runs. Every run is stepped in lock-step, so obstacles
+spawn at the same steps and share their x positions; only the gap centre
+differs per run. Finished runs stay frozen while the rest keep going.
+
+NumPy is optional for the game itself: importing this module never fails,
+but constructing a BatchFlappySim without NumPy raises RuntimeError.
+"""
+try:
+    import numpy as np
+except Exception:
+    # The game and the scalar FlappySim run without numpy
+    np = None
+
+from flappy_sim import (
+    GRAVITY, JUMP_STRENGTH, SCROLL_SPEED, SPAWN_INTERVAL, GAP,
+    SCREEN_WIDTH, SCREEN_HEIGHT, BIRD_X, BIRD_HALF, COLUMN_WIDTH,
+    RETIRE_X, SCORE_OFFSET, GAP_MIN_Y, GAP_BOTTOM_MARGIN, FLOOR_MARGIN, CEILING_Y,
+)
+
+NUMPY_AVAILABLE = np is not None
+
+
+class BatchFlappySim:
+    """N Flappy Mango runs stepped together with array operations.
+
+    `gravity`, `jump_strength` and `gap` may be scalars or length-N arrays
+    (one value per run) so a parameter sweep fits in a single batch.
+    `scroll_speed` and `spawn_interval` must be scalars because obstacle x
+    positions are shared by all runs. `rng` is a numpy Generator (or any
+    object with a compatible ``integers(low, high, size)``).
+
+    Per-run state is exposed as arrays: bird_y, velocity, alive, score,
+    flaps and steps_alive.
+    """
+
+    def __init__(self, n, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, seed=None, rng=None,
+                 gravity=GRAVITY, jump_strength=JUMP_STRENGTH, scroll_speed=SCROLL_SPEED,
+                 spawn_interval=SPAWN_INTERVAL, gap=GAP):
+        if np is None:
+            raise RuntimeError("BatchFlappySim requires numpy")
+        self.n = int(n)
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.gravity = self._per_run(gravity, np.float64)
+        self.jump_strength = self._per_run(jump_strength, np.float64)
+        self.half_gap = self._per_run(gap, np.int64) // 2
+        self.scroll_speed = scroll_speed
+        self.spawn_interval = spawn_interval
+        self.bird_x = BIRD_X
+        self.reset()
+
+    def _per_run(self, value, dtype):
+        arr = np.asarray(value, dtype=dtype)
+        if arr.ndim and arr.shape != (self.n,):
+            raise ValueError("per-run parameters must be scalars or have shape (%d,)" % self.n)
+        return arr
+
+    def reset(self):
+        """Start all N runs afresh."""
+        n = self.n
+        self.bird_y = np.full(n, self.height // 2, dtype=np.float64)
+        self.velocity = np.zeros(n, dtype=np.float64)
+        self.alive = np.ones(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.flaps = np.zeros(n, dtype=np.int64)
+        self.steps_alive = np.zeros(n, dtype=np.int64)
+        # obstacles ordered by x (oldest first); gap centres are per run
+        self.obstacle_x = []
+        self.obstacle_y = []
+        self.obstacle_scored = []
+        self.spawn_timer = 0
+        self.steps = 0
+
+    def step(self, flap=None):
+        """Advance every live run by one step.
+
+        `flap` is a boolean array (or scalar) of runs flapping this step.
+        Returns the number of runs that crashed during the step.
+        """
+        alive = self.alive
+        if flap is not None:
+            flapping = np.asarray(flap, dtype=bool) & alive
+            self.velocity = np.where(flapping, self.jump_strength, self.velocity)
+            self.flaps += flapping
+        self.steps += 1
+        self.steps_alive += alive
+
+        # frozen runs add exactly zero so their state is untouched
+        self.velocity += self.gravity * alive
+        self.bird_y += self.velocity * alive
+
+        self.spawn_timer += 1
+        if self.spawn_timer >= self.spawn_interval:
+            low = GAP_MIN_Y
+            high = self.height - GAP_BOTTOM_MARGIN
+            self.obstacle_x.append(self.width)
+            self.obstacle_y.append(self.rng.integers(low, high + 1, size=self.n))
+            self.obstacle_scored.append(False)
+            self.spawn_timer = 0
+
+        xs = self.obstacle_x
+        for i in range(len(xs)):
+            xs[i] -= self.scroll_speed
+            if not self.obstacle_scored[i] and xs[i] + SCORE_OFFSET < self.bird_x:
+                self.obstacle_scored[i] = True
+                self.score += alive
+        while xs and xs[0] < RETIRE_X:
+            xs.pop(0)
+            self.obstacle_y.pop(0)
+            self.obstacle_scored.pop(0)
+
+        crashed = (self.bird_y >= self.height - FLOOR_MARGIN) | (self.bird_y <= CEILING_Y)
+        crashed |= self.collides()
+        crashed &= alive
+        self.alive = alive & ~crashed
+        return int(crashed.sum())
+
+    def collides(self):
+        """Boolean array: does each run's bird overlap an obstacle column?
+
+        Uses the same integer-truncated boxes as FlappySim.collides().
+        """
+        left = int(self.bird_x - BIRD_HALF)
+        right = left + 2 * BIRD_HALF
+        top = (self.bird_y - BIRD_HALF).astype(np.int64)
+        bottom = top + 2 * BIRD_HALF
+        hit = np.zeros(self.n, dtype=bool)
+        for x, gy in zip(self.obstacle_x, self.obstacle_y):
+            if not (left < x + COLUMN_WIDTH and x < right):
+                continue
+            gap_top = gy - self.half_gap
+            gap_bottom = gy + self.half_gap
+            hit |= (gap_top > 0) & (top < gap_top) & (bottom > 0)
+            hit |= (gap_bottom < self.height) & (top < self.height) & (gap_bottom < bottom)
+        return hit
+
+    def upcoming_obstacle(self):
+        """Return (x, gap_y array) of the nearest obstacle not yet passed.
+
+        Returns (None, None) when no obstacle is ahead. Handy for autopilots.
+        """
+        left = self.bird_x - BIRD_HALF
+        for x, gy in zip(self.obstacle_x, self.obstacle_y):
+            if x + COLUMN_WIDTH > left:
+                return x, gy
+        return None, None
+
+    def run(self, policy=None, max_steps=100000):
+        """Step until every run has crashed or `max_steps` is reached.
+
+        `policy(sim)` returns the flap array for the next step; None means
+        never flap. Returns the final score array.
+        """
+        while self.steps < max_steps and self.alive.any():
+            self.step(policy(self) if policy is not None else None)
+        return self.score
@@ -0,0 +1,244 @@
+"""Headless Flappy Mango rules.
+
+FlappySim holds the complete rules of the Flappy mini-game (physics,
+obstacle spawning, scoring and collision) with no dependency on pygame or
+a display. flappy.py drives one instance from its fixed-timestep loop and
+only adds input, audio and drawing on top; the same engine can be stepped
+directly for server-side score verification, autopilot experiments and
+fast unit tests.
+
+One call to FlappySim.step() is one 1/60 s simulation step. A finished
+run is summarised by FlappySession, which the game records exactly once.
+"""
+import random
+import time
+import uuid
+from collections import deque
+
+# Length of one simulation step in seconds
+STEP_SECONDS = 1.0 / 60.0
+
+# Gameplay constants (per simulation step)
+GRAVITY = 0.75
+JUMP_STRENGTH = -13
+SCROLL_SPEED = 3
+SPAWN_INTERVAL = 150
+GAP = 220
+
+# Geometry
+SCREEN_WIDTH = 1000
+SCREEN_HEIGHT = 700
+BIRD_X = 150
+BIRD_HALF = 15          # collision box is 30x30 centred on the bird
+COLUMN_WIDTH = 70
+RETIRE_X = -50          # obstacles left of this are dropped
+SCORE_OFFSET = 50       # an obstacle scores once x + 50 is behind the bird
+GAP_MIN_Y = 150         # gap centre is drawn from [150, height - 250]
+GAP_BOTTOM_MARGIN = 250
+FLOOR_MARGIN = 60       # bird crashes at y >= height - 60
+CEILING_Y = -150        # ... or at y <= -150
+
+
+class Obstacle:
+    """One column pair. `world_x` is fixed at spawn; see FlappySim.screen_x()."""
+
+    __slots__ = ('world_x', 'y', 'gap', 'scored')
+
+    def __init__(self, world_x, y, gap):
+        self.world_x = world_x
+        self.y = y
+        self.gap = gap
+        self.scored = False
+
+
+class FlappySim:
+    """Deterministic, display-free Flappy Mango engine.
+
+    Obstacles live in a deque ordered by x, oldest (leftmost) first. They
+    keep the world x they spawned at and the whole field scrolls through
+    `scroll_x`, so a step never touches every obstacle: retirement pops
+    from the left, scoring advances a cursor, and collision only tests the
+    columns overlapping the bird's x-range. Pass `seed` (or an explicit
+    `rng`) for reproducible runs.
+    """
+
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, seed=None, rng=None,
+                 gravity=GRAVITY, jump_strength=JUMP_STRENGTH, scroll_speed=SCROLL_SPEED,
+                 spawn_interval=SPAWN_INTERVAL, gap=GAP):
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.gravity = gravity
+        self.jump_strength = jump_strength
+        self.scroll_speed = scroll_speed
+        self.spawn_interval = spawn_interval
+        self.gap = gap
+        self.bird_x = BIRD_X
+        self.reset()
+
+    def reset(self):
+        """Start a new run with the bird centred and no obstacles."""
+        self.bird_y = self.height // 2
+        self.prev_bird_y = self.bird_y
+        self.velocity = 0
+        self.obstacles = deque()
+        self.scroll_x = 0
+        self._next_to_score = 0   # index of the first unscored obstacle
+        self._first_ahead = 0     # index of the first obstacle not fully behind the bird
+        self.spawn_timer = 0
+        self.score = 0
+        self.obstacles_passed = 0
+        self.steps = 0
+        self.flaps = 0
+        self.game_over = False
+
+    def flap(self):
+        """Apply a flap immediately (ignored once the run is over)."""
+        if self.game_over:
+            return
+        self.velocity = self.jump_strength
+        self.flaps += 1
+
+    def step(self, flap=False):
+        """Advance the simulation by one fixed step.
+
+        Returns the number of points scored during this step. Check
+        `game_over` afterwards to detect a crash.
+        """
+        if self.game_over:
+            return 0
+        if flap:
+            self.flap()
+        self.steps += 1
+
+        self.prev_bird_y = self.bird_y
+        self.velocity += self.gravity
+        self.bird_y += self.velocity
+
+        self.spawn_timer += 1
+        if self.spawn_timer >= self.spawn_interval:
+            self.add_obstacle(self.width, self.rng.randint(GAP_MIN_Y, self.height - GAP_BOTTOM_MARGIN))
+            self.spawn_timer = 0
+
+        self.scroll_x += self.scroll_speed
+        obstacles = self.obstacles
+        scored = 0
+        retire_before = RETIRE_X + self.scroll_x
+        while obstacles and obstacles[0].world_x < retire_before:
+            ob = obstacles.popleft()
+            if self._next_to_score:
+                self._next_to_score -= 1
+            else:
+                # scrolled straight past the scoring line this step
+                ob.scored = True
+                scored += 1
+            if self._first_ahead:
+                self._first_ahead -= 1
+
+        score_before = self.bird_x - SCORE_OFFSET + self.scroll_x
+        i = self._next_to_score
+        while i < len(obstacles) and obstacles[i].world_x < score_before:
+            obstacles[i].scored = True
+            scored += 1
+            i += 1
+        self._next_to_score = i
+        # one point per obstacle cleared
+        self.obstacles_passed += scored
+        self.score += scored
+
+        if self.collides() or self.bird_y >= self.height - FLOOR_MARGIN or self.bird_y <= CEILING_Y:
+            self.game_over = True
+        return scored
+
+    def add_obstacle(self, x, y, gap=None):
+        """Append an obstacle at screen x `x` with its gap centred on `y`.
+
+        Obstacles must be added in increasing x order (spawning always adds
+        at the right edge), which the cursors and broadphase rely on.
+        """
+        ob = Obstacle(x + self.scroll_x, y, self.gap if gap is None else gap)
+        self.obstacles.append(ob)
+        return ob
+
+    def screen_x(self, ob):
+        """Current screen x of obstacle `ob`."""
+        return ob.world_x - self.scroll_x
+
+    def collides(self):
+        """Return True if the bird's box overlaps any obstacle column.
+
+        Mirrors pygame.Rect.colliderect on integer-truncated rects so results
+        match the original per-frame Rect tests exactly. Only obstacles in
+        the bird's x-range are tested.
+        """
+        left = int(self.bird_x - BIRD_HALF)
+        top = int(self.bird_y - BIRD_HALF)
+        right = left + 2 * BIRD_HALF
+        bottom = top + 2 * BIRD_HALF
+        obstacles = self.obstacles
+        count = len(obstacles)
+        # columns whose right edge is at or behind the bird can never hit again
+        behind = left - COLUMN_WIDTH + self.scroll_x
+        i = self._first_ahead
+        while i < count and obstacles[i].world_x <= behind:
+            i += 1
+        self._first_ahead = i
+        ahead = right + self.scroll_x
+        while i < count:
+            ob = obstacles[i]
+            i += 1
+            if ob.world_x >= ahead:
+                break
+            half_gap = ob.gap // 2
+            gap_top = ob.y - half_gap
+            gap_bottom = ob.y + half_gap
+            # top column spans [0, gap_top), bottom column [gap_bottom, height)
+            if gap_top > 0 and top < gap_top and 0 < bottom:
+                return True
+            if gap_bottom < self.height and top < self.height and gap_bottom < bottom:
+                return True
+        return False
+
+    def interpolated_bird_y(self, alpha):
+        """Bird y between the previous and current step (0 <= alpha <= 1)."""
+        return self.prev_bird_y + (self.bird_y - self.prev_bird_y) * alpha
+
+    def obstacle_offset(self, alpha):
+        """Horizontal offset to draw obstacles between the last two steps.
+
+        Every obstacle moves scroll_speed per step (including one spawned
+        this step), so the previous x is always x + scroll_speed.
+        """
+        return self.scroll_speed * (1.0 - alpha)
+
+
+class FlappySession:
+    """Result of one finished Flappy run.
+
+    `session_id` is a random UUID minted when the session is created and is
+    used as an idempotency key: recording the same session twice stores it
+    once. `duration` is simulated play time in seconds.
+    """
+
+    def __init__(self, score, duration, flaps, obstacles_passed, session_id=None, ended_at=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.score = int(score)
+        self.duration = float(duration)
+        self.flaps = int(flaps)
+        self.obstacles_passed = int(obstacles_passed)
+        self.ended_at = ended_at if ended_at is not None else time.time()
+
+    @classmethod
+    def from_sim(cls, sim, session_id=None):
+        """Summarise the run `sim` has just finished."""
+        return cls(
+            score=sim.score,
+            duration=sim.steps * STEP_SECONDS,
+            flaps=sim.flaps,
+            obstacles_passed=sim.obstacles_passed,
+            session_id=session_id,
+        )
+
+    def __repr__(self):
+        return ('FlappySession(%s, score=%d, duration=%.2f, flaps=%d, obstacles_passed=%d)'
+                % (self.session_id, self.score, self.duration, self.flaps, self.obstacles_passed))
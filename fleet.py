@@ -0,0 +1,159 @@
+"""Batch stat ticks for every pet in a multi-pet database.
+
+tick_fleet() applies the rules the running game applies to one pet in
+MangoTamagotchi.update_stats() and check_random_events() to all pets at
+once: decay, the health penalty for low stats, sickness, and the random
+sick/misbehaviour events. Pets are streamed in pages of `chunk_size` by
+pet id; each page is read, updated with NumPy array operations and
+written back with one executemany inside a single transaction, so memory
+stays bounded however many pets the database holds.
+
+Run it from the command line to tick a database and report the rate:
+
+    python fleet.py db/mango.db --ticks 1 --chunk-size 5000
+
+NumPy is optional for the game itself: importing this module never fails,
+but tick_fleet() raises RuntimeError without NumPy.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except Exception:
+    # The game runs without numpy; only the batch job needs it
+    np = None
+
+import db
+from decay import (
+    DECAY_INTERVAL, DECAY_PER_TICK, DECAYING_STATS, PENALTY_STATS,
+    LOW_STAT, HEALTH_PENALTY, SICK_HEALTH,
+    RANDOM_EVENT_INTERVAL, RANDOM_EVENT_CHANCE, SICK_EVENT_HEALTH, MISBEHAVIOUR_HAPPINESS,
+)
+
+NUMPY_AVAILABLE = np is not None
+
+DEFAULT_CHUNK_SIZE = 5000
+
+_COLUMN = {field: i for i, field in enumerate(db.STATE_FIELDS)}
+
+
+def tick_values(values, ticks=1, rng=None, weather_mood=0, random_events=True):
+    """Apply `ticks` decay ticks to an (n, 6) array of stats in STATE_FIELDS order.
+
+    Returns (new values, newly sick mask). Decay and the health penalty
+    are computed in closed form as in decay.apply_decay(). `weather_mood`
+    is the current weather effect; only negative values apply, once per
+    tick, as in update_stats(). With `random_events`, each pet rolls the
+    random events it would have had during the ticks using `rng` (a numpy
+    Generator).
+    """
+    values = np.array(values, dtype=np.int64, copy=True)
+    if ticks <= 0 or not len(values):
+        return values, np.zeros(len(values), dtype=bool)
+    health = values[:, _COLUMN['health']]
+    was_sick = health <= SICK_HEALTH
+
+    # first tick at which a penalty stat is at or below LOW_STAT
+    lowest = values[:, [_COLUMN[stat] for stat in PENALTY_STATS]].min(axis=1)
+    first_low = np.maximum(1, -((LOW_STAT - lowest) // DECAY_PER_TICK))
+    penalised = np.maximum(0, ticks - first_low + 1)
+    for stat in DECAYING_STATS:
+        column = _COLUMN[stat]
+        values[:, column] = np.maximum(0, values[:, column] - DECAY_PER_TICK * ticks)
+    health[:] = np.maximum(0, health - HEALTH_PENALTY * penalised)
+
+    happiness = values[:, _COLUMN['happiness']]
+    if weather_mood < 0:
+        happiness[:] = np.maximum(0, happiness + weather_mood * ticks)
+
+    if random_events:
+        rng = rng if rng is not None else np.random.default_rng()
+        # one check per RANDOM_EVENT_INTERVAL; spread over the ticks so any
+        # tick count gets the same expected number of events
+        chance = RANDOM_EVENT_CHANCE * DECAY_INTERVAL / RANDOM_EVENT_INTERVAL
+        events = rng.binomial(ticks, chance, size=len(values))
+        sick_events = rng.binomial(events, 0.5)
+        misbehaviour = events - sick_events
+        falls_sick = (sick_events > 0) & (health > SICK_HEALTH)
+        health[:] = np.where(falls_sick, np.maximum(0, health - SICK_EVENT_HEALTH), health)
+        happiness[:] = np.maximum(0, happiness - MISBEHAVIOUR_HAPPINESS * misbehaviour)
+
+    return values, (health <= SICK_HEALTH) & ~was_sick
+
+
+def _saved_after_ticks(saved_at, ticks, now):
+    """When a state saved at `saved_at` has had `ticks` decay ticks applied.
+
+    Never later than `now`: a pet saved recently has its ticks applied
+    ahead of time, and a future stamp would stall its next catch-up.
+    """
+    try:
+        saved = datetime.fromisoformat(saved_at)
+    except (TypeError, ValueError):
+        return now
+    stamped = saved + timedelta(seconds=ticks * DECAY_INTERVAL)
+    return min(stamped, datetime.fromisoformat(now)).isoformat()
+
+
+def tick_fleet(db_path, ticks=1, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, rng=None,
+               weather_mood=0, random_events=True, action='fleet_tick'):
+    """Tick every saved pet in `db_path` by `ticks` decay ticks.
+
+    Changed pets get one `action` event each, saved `ticks` decay
+    intervals after the pet's previous save, so decay.catch_up() later
+    applies only the time the job did not cover. Returns a dict with the
+    number of pets scanned, pets changed, pets that fell sick, elapsed
+    seconds and pets_per_second.
+    """
+    if np is None:
+        raise RuntimeError("tick_fleet requires numpy")
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    started = time.perf_counter()
+    pets = changed = sick = 0
+    after_id = 0
+    while True:
+        with db.transaction(db_path, immediate=True) as conn:
+            after_id, rows = db.read_state_chunk(conn, after_id, chunk_size)
+            if after_id is None:
+                break
+            if not rows:
+                continue
+            old = np.array([row[1:7] for row in rows], dtype=np.int64)
+            new, fell_sick = tick_values(old, ticks, rng, weather_mood, random_events)
+            deltas = (new - old).tolist()
+            now = datetime.now().isoformat()
+            changed += db.write_state_chunk(conn, action, [
+                (row[0], values, delta, row[7], row[8], _saved_after_ticks(row[9], ticks, now))
+                for row, values, delta in zip(rows, new.tolist(), deltas)
+            ], now)
+        pets += len(rows)
+        sick += int(fell_sick.sum())
+    seconds = time.perf_counter() - started
+    return {
+        'pets': pets,
+        'changed': changed,
+        'sick': sick,
+        'seconds': seconds,
+        'pets_per_second': pets / seconds if seconds > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply stat ticks to every pet in a database.")
+    parser.add_argument('db_path', nargs='?', default='db/mango.db')
+    parser.add_argument('--ticks', type=int, default=1, help="decay ticks (30 s each) to apply")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-random-events', action='store_true')
+    args = parser.parse_args(argv)
+    db.init_database(args.db_path)
+    report = tick_fleet(args.db_path, ticks=args.ticks, chunk_size=args.chunk_size,
+                        seed=args.seed, random_events=not args.no_random_events)
+    print("%(pets)d pets (%(changed)d changed, %(sick)d fell sick) in %(seconds).2f s: "
+          "%(pets_per_second).0f pets/s" % report)
+
+
+if __name__ == '__main__':
+    main()
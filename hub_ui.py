@@ -2,52 +2,71 @@
 
 This module exposes three functions that operate on a MangoTamagotchi
 instance: draw_home_screen(game), handle_click(game, pos), draw_game_over_screen(game).
-They mirror the behavior previously defined as methods on MangoTamagotchi.
+They mirror the behavior previously defined as methods on MangoTamagotchi. on_derived_change is
+the game.derived listener that invalidates the hub's caches.
+
+The parts of the hub that never change between frames are pre-rendered into
+a cached static layer (game._hub_static_layer) which is rebuilt only when the
+background, night mode or screen size changes. The sprite frames and the
+stat bars are cached as well and rebuilt from game.derived change events,
+so on idle frames the hub only blits.
 """
-import time
 import os
 import random
 import pygame
 import math
 from datetime import datetime
 
-def draw_home_screen(game):
-    # Import project module for constants (done at runtime to avoid cycles)
-    try:
-        import project as _project
-    except Exception:
-        _project = None
-
-    # Draw background (image or gradient) and ensure music
+from assets import get_sprite_variant
+from ui_helpers import render_text
+
+def _hub_static_key(game):
+    """Inputs that invalidate the cached static hub layer.
+
+    Holds the background surface itself rather than its id(), so a
+    replaced background never matches the old layer through a reused id.
+    """
+    return (
+        getattr(game, 'hub_background', None),
+        bool(getattr(game, 'is_night', False)),
+        game.screen.get_size(),
+    )
+
+
+def _blit_hub_static_layer(game, _project, cage_x, cage_y, cage_width, cage_height, screen_w):
+    """Blit the cached static layer, redrawing it first if its inputs changed."""
+    key = _hub_static_key(game)
+    layer = getattr(game, '_hub_static_layer', None)
+    old = getattr(game, '_hub_static_layer_key', None)
+    if layer is None or old is None or old[0] is not key[0] or old[1:] != key[1:]:
+        _draw_hub_static_layer(game, _project, cage_x, cage_y, cage_width, cage_height, screen_w)
+        game._hub_static_layer = game.screen.copy()
+        game._hub_static_layer_key = key
+    else:
+        game.screen.blit(layer, (0, 0))
+
+
+def _draw_hub_static_layer(game, _project, cage_x, cage_y, cage_width, cage_height, screen_w):
+    """Draw every hub element that does not change between frames.
+
+    Covers the background (image plus overlay, or gradient), the title,
+    the cage shadow/frame/interior, the stats panel chrome and labels, the
+    fullscreen icon and the audio button. Dynamic elements are drawn on top
+    by draw_home_screen each frame.
+    """
     try:
         game.draw_hub_background()
     except Exception:
         pass
-    try:
-        game._play_music('home')
-    except Exception:
-        pass
-
-    # Update animations
-    game.animation_time += 0.1
-    game.pulse_animation = math.sin(game.animation_time) * 0.1 + 1.0
 
     # Title
     try:
-        title_text = game.title_font.render("Mango: The Virtual Lovebird", True, _project.WHITE if _project else (255,255,255))
+        title_text = render_text(game.title_font, "Mango: The Virtual Lovebird", True, _project.WHITE if _project else (255,255,255))
         title_rect = title_text.get_rect(center=(getattr(_project, 'SCREEN_WIDTH', game.screen.get_width()) // 2, 40))
         game.screen.blit(title_text, title_rect)
     except Exception:
         pass
 
-    # Core cage geometry
-    cage_width = 280
-    cage_height = 280
-    gap = 20
-    screen_w = getattr(game, 'SCREEN_WIDTH', game.screen.get_width())
-    cage_x = max(20, (screen_w - cage_width) // 2)
-    cage_y = 120
-
     # Draw cage shadow, frame and interior
     try:
         shadow = pygame.Surface((cage_width, cage_height), pygame.SRCALPHA)
@@ -87,25 +106,199 @@ def draw_home_screen(game):
         except Exception:
             pass
 
-    # Mango sprite - ensure uniform hub size and simple animation
-    mood = game.get_mango_mood()
+    # Fullscreen toggle icon (smaller, top-right corner)
+    try:
+        fs_rect = game._fullscreen_button_rect
+        pygame.draw.rect(game.screen, (30, 30, 30), fs_rect, border_radius=6)
+        pygame.draw.rect(game.screen, (255,255,255), fs_rect, 1, border_radius=6)
+        try:
+            # small inward-corner marks to indicate fullscreen
+            pygame.draw.line(game.screen, (255,255,255), (fs_rect.left+4, fs_rect.top+8), (fs_rect.left+4, fs_rect.top+4))
+            pygame.draw.line(game.screen, (255,255,255), (fs_rect.left+4, fs_rect.top+4), (fs_rect.left+8, fs_rect.top+4))
+            pygame.draw.line(game.screen, (255,255,255), (fs_rect.right-4, fs_rect.bottom-8), (fs_rect.right-4, fs_rect.bottom-4))
+            pygame.draw.line(game.screen, (255,255,255), (fs_rect.right-4, fs_rect.bottom-4), (fs_rect.right-8, fs_rect.bottom-4))
+        except Exception:
+            pass
+    except Exception:
+        pass
+
+    # Stats panel chrome, title and labels (the bars are drawn per frame)
+    try:
+        stats_rect = game._stats_panel_rect
+        panel_x, panel_y, panel_w, panel_h = stats_rect.x, stats_rect.y, stats_rect.width, stats_rect.height
+        s = pygame.Surface((panel_w, panel_h), pygame.SRCALPHA)
+        s.fill((0, 0, 0, 160))
+        game.screen.blit(s, (panel_x, panel_y))
+        pygame.draw.rect(game.screen, getattr(game, 'GOLD', (255,215,0)), pygame.Rect(panel_x-3, panel_y-3, panel_w+6, panel_h+6), 3, border_radius=8)
+        pygame.draw.rect(game.screen, getattr(game, 'SILVER', (192,192,192)), stats_rect, 2, border_radius=6)
+
+        prev_clip = game.screen.get_clip()
+        game.screen.set_clip(stats_rect)
+        try:
+            try:
+                title = render_text(game.small_font, 'Mango Stats', True, (255,255,255))
+                game.screen.blit(title, (panel_x + (panel_w - title.get_width()) // 2, panel_y + 6))
+            except Exception:
+                pass
+            for label, y, bar_h in _stats_rows(game, stats_rect):
+                try:
+                    lbl = render_text(game.small_font, label, True, (255,255,255))
+                    game.screen.blit(lbl, (panel_x + 12, y + (bar_h - lbl.get_height()) // 2))
+                except Exception:
+                    pass
+        finally:
+            game.screen.set_clip(prev_clip)
+    except Exception:
+        pass
+
+    # Compact audio settings button (top-left); the dropdown is drawn per frame
+    try:
+        btn_rect = game._audio_dropdown_btn_rect
+        pygame.draw.rect(game.screen, (30, 30, 30), btn_rect, border_radius=8)
+        pygame.draw.rect(game.screen, (255,255,255), btn_rect, 2, border_radius=8)
+        btn_label = render_text(game.small_font, "Audio", True, (255,255,255))
+        game.screen.blit(btn_label, (btn_rect.x + 12, btn_rect.y + 7))
+    except Exception:
+        pass
+
+
+_STAT_LABELS = ('Hunger', 'Happiness', 'Cleanliness', 'Energy', 'Health')
+
+
+def _stats_rows(game, stats_rect):
+    """Return (label, y, bar_height) for each stat row inside the stats panel."""
+    spacing = 12
+    title_h = game.small_font.size('Mango Stats')[1]
+    y = stats_rect.y + 8 + title_h
+    n = len(_STAT_LABELS)
+    bar_h = max(12, (stats_rect.height - (y - stats_rect.y) - spacing * n) // n)
+    rows = []
+    for label in _STAT_LABELS:
+        rows.append((label, y, bar_h))
+        y += bar_h + spacing
+    return rows
+
+
+def _draw_stat_bars(game, stats_rect, _dmpb=None, surface=None, origin=(0, 0)):
+    """Draw the five stat bars inside the stats panel.
+
+    Bars go on `surface` (default game.screen), whose top-left corner is
+    at `origin` on the screen.
+    """
+    surface = game.screen if surface is None else surface
+    ox, oy = origin
+    bar_w = stats_rect.width - 160
+    bx = stats_rect.x + 120 - ox
+    if not _dmpb:
+        from ui_helpers import draw_modern_progress_bar as _dmpb
+    colors = {
+        'Hunger': (255,152,0),
+        'Happiness': (76,175,80),
+        'Cleanliness': (33,150,243),
+        'Energy': (255,193,7),
+        'Health': (244,67,54),
+    }
+    prev_clip = surface.get_clip()
+    surface.set_clip(stats_rect.move(-ox, -oy))
+    try:
+        for label, y, bar_h in _stats_rows(game, stats_rect):
+            try:
+                val = getattr(game.mango_state, label.lower(), 0)
+                _dmpb(game, bx, y - oy, bar_w, bar_h, val, 100, colors[label], surface=surface)
+            except Exception:
+                pass
+    finally:
+        surface.set_clip(prev_clip)
+
+
+def on_derived_change(derived, changed):
+    """DerivedState listener (subscribed by the game): drop stale hub caches."""
+    game = derived.game
+    if 'sprite' in changed:
+        game._hub_frames = None
+    if 'stats' in changed:
+        game._hub_stats_layer = None
+
+
+def _hub_frames(game, sprite_mood):
+    """(key, surface) frames for the hub sprite: the mood and its '2' variant."""
+    frames = getattr(game, '_hub_frames', None)
+    if frames is None:
+        frames = []
+        base = game.mango_sprites.get(sprite_mood)
+        if base:
+            frames.append((sprite_mood, base))
+        # allow alternate frame like 'flying2' or mood+'2'
+        alt = game.mango_sprites.get(sprite_mood + '2')
+        if alt:
+            frames.append((sprite_mood + '2', alt))
+        game._hub_frames = frames
+    return frames
+
+
+def draw_home_screen(game):
+    # Import project module for constants (done at runtime to avoid cycles)
+    try:
+        import project as _project
+    except Exception:
+        _project = None
+
+    # Core cage geometry
+    cage_width = 280
+    cage_height = 280
+    gap = 20
+    screen_w = getattr(game, 'SCREEN_WIDTH', game.screen.get_width())
+    cage_x = max(20, (screen_w - cage_width) // 2)
+    cage_y = 120
+
+    # Fixed rects shared by the static layer and click handling
+    fs_w, fs_h = 28, 22
+    game._fullscreen_button_rect = pygame.Rect(screen_w - fs_w - 10, 10, fs_w, fs_h)
+    game._audio_dropdown_btn_rect = pygame.Rect(12, 8, 100, 28)
+    if not getattr(game, '_stats_panel_rect', None):
+        stats_w = min(screen_w - 80, 720)
+        stats_h = 160
+        stats_x = cage_x + (cage_width - stats_w) // 2
+        stats_y = cage_y + cage_height + 28  # moved 10px higher than previous baseline
+        game._stats_panel_rect = pygame.Rect(stats_x, stats_y, stats_w, stats_h)
+
+    # Static layer: rebuilt only when background, night mode or size change,
+    # otherwise a single blit replaces the background and chrome redraw.
+    try:
+        _blit_hub_static_layer(game, _project, cage_x, cage_y, cage_width, cage_height, screen_w)
+    except Exception:
+        _draw_hub_static_layer(game, _project, cage_x, cage_y, cage_width, cage_height, screen_w)
+
+    try:
+        game._play_music('home')
+    except Exception:
+        pass
+
+    # Update animations
+    game.animation_time += 0.1
+    game.pulse_animation = math.sin(game.animation_time) * 0.1 + 1.0
+
+    # Mango sprite - ensure uniform hub size and simple animation. Mood and
+    # sprite come from game.derived, recomputed only when the stats change;
+    # its events drop the cached frames and stat bars.
+    derived = getattr(game, 'derived', None)
+    if derived is not None:
+        derived.refresh()
+        sprite_mood = derived.sprite
+    else:
+        from derived import sprite_for
+        sprite_mood = sprite_for(game.get_mango_mood())
     mango_x = cage_x + cage_width // 2
     mango_y = cage_y + cage_height // 2
-    sprite_mood = mood if mood in ['happy', 'sad', 'tired', 'dirty'] else 'idle'
 
     HUB_SPRITE_SIZE = (140, 140)
     drawn = False
     try:
         if hasattr(game, 'mango_sprites'):
-            # build frame list: look for mood and mood2 variants
-            frames = []
-            base = game.mango_sprites.get(sprite_mood)
-            if base:
-                frames.append(base)
-            # allow alternate frame like 'flying2' or mood+'2'
-            alt = game.mango_sprites.get(sprite_mood + '2')
-            if alt:
-                frames.append(alt)
+            # frame list: the mood and mood2 variants, cached per sprite
+            if derived is None:
+                game._hub_frames = None
+            frames = _hub_frames(game, sprite_mood)
 
             if frames:
                 # pick frame based on animation_time; if single frame, use subtle bob/pulse
@@ -113,10 +306,10 @@ def draw_home_screen(game):
                     idx = int(game.animation_time * 3) % len(frames)
                 except Exception:
                     idx = 0
-                frame = frames[idx]
+                frame_key, frame = frames[idx]
                 try:
-                    # scale to uniform hub size
-                    scaled = pygame.transform.smoothscale(frame, HUB_SPRITE_SIZE)
+                    # scale to uniform hub size (cached per sprite variant)
+                    scaled = get_sprite_variant(frame_key, frame, HUB_SPRITE_SIZE)
                     # if single frame, apply a small vertical bob for life
                     if len(frames) == 1:
                         bob = int(math.sin(game.animation_time * 2.0) * 6)
@@ -205,83 +398,20 @@ def draw_home_screen(game):
         except Exception:
             pass
 
-    # Fullscreen toggle button (smaller, top-right corner)
+    # Stat bars (panel chrome and labels live in the static layer). The
+    # bars are drawn once onto a transparent layer the size of the panel
+    # and reused until a 'stats' event or a panel move.
     try:
-        fs_w, fs_h = 28, 22
-        fs_x = screen_w - fs_w - 10
-        fs_y = 10
-        fs_rect = pygame.Rect(fs_x, fs_y, fs_w, fs_h)
-        game._fullscreen_button_rect = fs_rect
-        # Draw compact icon/button
-        pygame.draw.rect(game.screen, (30, 30, 30), fs_rect, border_radius=6)
-        pygame.draw.rect(game.screen, (255,255,255), fs_rect, 1, border_radius=6)
-        try:
-            # small inward-corner marks to indicate fullscreen
-            pygame.draw.line(game.screen, (255,255,255), (fs_rect.left+4, fs_rect.top+8), (fs_rect.left+4, fs_rect.top+4))
-            pygame.draw.line(game.screen, (255,255,255), (fs_rect.left+4, fs_rect.top+4), (fs_rect.left+8, fs_rect.top+4))
-            pygame.draw.line(game.screen, (255,255,255), (fs_rect.right-4, fs_rect.bottom-8), (fs_rect.right-4, fs_rect.bottom-4))
-            pygame.draw.line(game.screen, (255,255,255), (fs_rect.right-4, fs_rect.bottom-4), (fs_rect.right-8, fs_rect.bottom-4))
-        except Exception:
-            pass
-    except Exception:
-        pass
-
-    # Stats panel: centered below cage and moved slightly higher (10px)
-    try:
-        stats_rect = getattr(game, '_stats_panel_rect', None)
-        if not stats_rect:
-            stats_w = min(screen_w - 80, 720)
-            stats_h = 160
-            stats_x = cage_x + (cage_width - stats_w) // 2
-            stats_y = cage_y + cage_height + 28  # moved 10px higher than previous baseline
-            stats_rect = pygame.Rect(stats_x, stats_y, stats_w, stats_h)
-            game._stats_panel_rect = stats_rect
-
-        panel_x, panel_y, panel_w, panel_h = stats_rect.x, stats_rect.y, stats_rect.width, stats_rect.height
-        s = pygame.Surface((panel_w, panel_h), pygame.SRCALPHA)
-        s.fill((0, 0, 0, 160))
-        game.screen.blit(s, (panel_x, panel_y))
-        pygame.draw.rect(game.screen, getattr(game, 'GOLD', (255,215,0)), pygame.Rect(panel_x-3, panel_y-3, panel_w+6, panel_h+6), 3, border_radius=8)
-        pygame.draw.rect(game.screen, getattr(game, 'SILVER', (192,192,192)), stats_rect, 2, border_radius=6)
-
-        prev_clip = game.screen.get_clip()
-        game.screen.set_clip(stats_rect)
-        try:
-            try:
-                title = game.small_font.render('Mango Stats', True, (255,255,255))
-                game.screen.blit(title, (panel_x + (panel_w - title.get_width()) // 2, panel_y + 6))
-            except Exception:
-                pass
-
-            stat_items = [
-                ('Hunger', game.mango_state.get('hunger', 0), (255,152,0)),
-                ('Happiness', game.mango_state.get('happiness', 0), (76,175,80)),
-                ('Cleanliness', game.mango_state.get('cleanliness', 0), (33,150,243)),
-                ('Energy', game.mango_state.get('energy', 0), (255,193,7)),
-                ('Health', game.mango_state.get('health', 0), (244,67,54)),
-            ]
-
-            spacing = 12
-            y = panel_y + 8 + title.get_height()
-            bar_h = max(12, (panel_h - (y - panel_y) - spacing * len(stat_items)) // (len(stat_items)))
-            bar_w = panel_w - 160
-            if not _dmpb:
-                from ui_helpers import draw_modern_progress_bar as _dmpb
-
-            for label, val, color in stat_items:
-                try:
-                    lbl = game.small_font.render(label, True, (255,255,255))
-                    game.screen.blit(lbl, (panel_x + 12, y + (bar_h - lbl.get_height()) // 2))
-                except Exception:
-                    pass
-                try:
-                    bx = panel_x + 120
-                    _dmpb(game, bx, y, bar_w, bar_h, val, 100, color)
-                except Exception:
-                    pass
-                y += bar_h + spacing
-        finally:
-            game.screen.set_clip(prev_clip)
+        stats_rect = game._stats_panel_rect
+        if derived is None:
+            _draw_stat_bars(game, stats_rect, _dmpb)
+        else:
+            cached = getattr(game, '_hub_stats_layer', None)
+            if cached is None or cached[0] != stats_rect:
+                layer = pygame.Surface(stats_rect.size, pygame.SRCALPHA)
+                _draw_stat_bars(game, stats_rect, _dmpb, layer, stats_rect.topleft)
+                cached = game._hub_stats_layer = (pygame.Rect(stats_rect), layer)
+            game.screen.blit(cached[1], stats_rect.topleft)
     except Exception:
         pass
 
@@ -289,11 +419,16 @@ def draw_home_screen(game):
     try:
         fl = getattr(game, '_flappy_button_rect', None)
         if fl:
-            hs_text = game.font.render(f"High Score: {game.high_score}", True, (255,255,255))
+            hs_text = render_text(game.font, f"High Score: {game.high_score}", True, (255,255,255))
             hs_x = fl.centerx - hs_text.get_width() // 2
             # lower the High Score slightly so it sits comfortably under the button
             hs_y = fl.bottom + 6
             game.screen.blit(hs_text, (hs_x, hs_y))
+            # today's best from the leaderboard rollups (cached, no query)
+            board = game.get_leaderboard() if hasattr(game, 'get_leaderboard') else None
+            if board is not None:
+                today_text = render_text(game.small_font, f"Today: {board.best('day')}", True, (255,255,255))
+                game.screen.blit(today_text, (fl.centerx - today_text.get_width() // 2, hs_y + hs_text.get_height() + 2))
     except Exception:
         pass
 
@@ -308,7 +443,7 @@ def draw_home_screen(game):
             fact_rect = pygame.Rect(fact_x, status_y, fact_w, fact_h)
             pygame.draw.rect(game.screen, getattr(game, 'GOLD', (255,215,0)), fact_rect, border_radius=20)
             pygame.draw.rect(game.screen, (255,255,255), fact_rect, 2, border_radius=20)
-            fact_text = game.tiny_font.render(bird_fact, True, (0,0,0))
+            fact_text = render_text(game.tiny_font, bird_fact, True, (0,0,0))
             game.screen.blit(fact_text, fact_text.get_rect(center=fact_rect.center))
     except Exception:
         pass
@@ -317,37 +452,35 @@ def draw_home_screen(game):
     # Use a cooldown so we don't spam sounds; fallback to direct sound playback
     # if the audio wrapper raises.
     try:
-        now = time.time()
-        if not hasattr(game, '_last_chirp_time'):
-            game._last_chirp_time = 0.0
-        # only consider chirping if at least 6 seconds passed since last chirp
-        if now - game._last_chirp_time > 6.0:
+        # chirping pauses for 6 real seconds after each chirp; a ui_scheduler
+        # timer re-arms it, so idle frames do no clock reads here
+        if getattr(game, '_chirp_ready', True):
             # ~2% chance per frame after cooldown — low and pleasant
             if random.random() < 0.02:
+                chirped = False
                 try:
                     game._play_sfx('chirp')
-                    game._last_chirp_time = now
+                    chirped = True
                 except Exception:
                     # fallback: direct channel play if available
                     try:
                         if 'chirp' in getattr(game, 'sounds', {}):
                             game.sounds['chirp'].play()
-                            game._last_chirp_time = now
+                            chirped = True
                     except Exception:
                         pass
+                if chirped:
+                    game._chirp_ready = False
+                    game.ui_scheduler.call_later(6.0, setattr, game, '_chirp_ready', True,
+                                                 name='chirp_cooldown')
     except Exception:
         pass
 
     # Compact audio settings dropdown (top-left)
     try:
-        btn_w, btn_h = 100, 28
-        btn_x, btn_y = 12, 8
-        btn_rect = pygame.Rect(btn_x, btn_y, btn_w, btn_h)
-        game._audio_dropdown_btn_rect = btn_rect
-        pygame.draw.rect(game.screen, (30, 30, 30), btn_rect, border_radius=8)
-        pygame.draw.rect(game.screen, (255,255,255), btn_rect, 2, border_radius=8)
-        btn_label = game.small_font.render("Audio", True, (255,255,255))
-        game.screen.blit(btn_label, (btn_x + 12, btn_y + 7))
+        # the button itself is part of the static layer
+        btn_rect = game._audio_dropdown_btn_rect
+        btn_x, btn_y, btn_w, btn_h = btn_rect.x, btn_rect.y, btn_rect.width, btn_rect.height
 
         if getattr(game, '_audio_dropdown_open', False):
             dd_w = btn_w + 40
@@ -374,7 +507,7 @@ def draw_home_screen(game):
                 tx = sx + fw
                 tr_thumb = pygame.Rect(tx - 5, sy + 2, 10, 14)
                 pygame.draw.rect(game.screen, (255,255,255), tr_thumb, border_radius=4)
-                lbl = game.tiny_font.render(key[0].upper() + key[1:], True, (255,255,255))
+                lbl = render_text(game.tiny_font, key[0].upper() + key[1:], True, (255,255,255))
                 game.screen.blit(lbl, (sx, sy - 10))
                 game._audio_sliders[key]['rect'] = pygame.Rect(sx, sy, sw, 24)
 
@@ -442,7 +575,7 @@ def handle_click(game, pos):
                                     pass
                                 # short feedback
                                 try:
-                                    game.hud_messages.append((f"{text} successful", time.time() + 1.5))
+                                    game.show_message(f"{text} successful", 1.5)
                                 except Exception:
                                     pass
                         except Exception:
@@ -503,7 +636,7 @@ def draw_game_over_screen(game):
         panel_rect = pygame.Rect(game.screen.get_width() // 2 - 300, game.screen.get_height() // 2 - 200, 600, 400)
         pygame.draw.rect(game.screen, (0,0,0,100), pygame.Rect(panel_rect.x + 5, panel_rect.y + 5, panel_rect.width, panel_rect.height), border_radius=25)
         pygame.draw.rect(game.screen, (255,255,255), panel_rect, border_radius=25)
-        game_over_text = game.title_font.render("Mango has flown away!", True, (244,67,54))
+        game_over_text = render_text(game.title_font, "Mango has flown away!", True, (244,67,54))
         go_rect = game_over_text.get_rect(center=(panel_rect.centerx, panel_rect.y + 60))
         game.screen.blit(game_over_text, go_rect)
     except Exception:
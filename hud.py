@@ -0,0 +1,152 @@
+"""On-screen notifications (toasts) and the screen flash.
+
+HUD replaces the old hud_messages list, which was appended to but never
+pruned or drawn. It keeps at most `maxlen` toasts, so the oldest is dropped
+when a new one arrives, and every toast expires on a monotonic clock.
+Each toast renders its surface once and reuses it until it expires.
+
+HUD.draw() paints the toasts and the flash over a surface. The game calls
+it from present(), so the hub and every mini-game show them.
+
+For old callers, HUD.append() also accepts a plain string or a
+(text, expiry timestamp) tuple.
+"""
+import math
+import time
+from collections import deque
+
+try:
+    import pygame
+except Exception:
+    pygame = None
+
+MAX_MESSAGES = 5
+DEFAULT_SECONDS = 2.0
+
+# toast layout, in logical screen pixels
+TOAST_TOP = 80
+TOAST_GAP = 6
+TOAST_PADDING = (14, 6)
+TOAST_BACKGROUND = (0, 0, 0, 170)
+TOAST_TEXT = (255, 255, 255)
+# peak alpha of the white screen flash
+FLASH_ALPHA = 120
+
+
+class Toast:
+    """One message, its expiry time and its cached surface."""
+
+    __slots__ = ('text', 'expires', 'surface')
+
+    def __init__(self, text, expires):
+        self.text = text
+        self.expires = expires
+        self.surface = None
+
+    def __repr__(self):
+        return 'Toast(%r, expires=%.3f)' % (self.text, self.expires)
+
+
+class HUD:
+    """Bounded queue of expiring toasts plus a fading screen flash."""
+
+    def __init__(self, maxlen=MAX_MESSAGES, clock=time.monotonic):
+        self.clock = clock
+        self._toasts = deque(maxlen=maxlen)
+        # earliest expiry in the queue, so expire() is O(1) until then
+        self._next_expiry = math.inf
+        self._flash_start = 0.0
+        self._flash_until = 0.0
+        self._flash_surface = None
+
+    def __len__(self):
+        return len(self._toasts)
+
+    def __iter__(self):
+        return iter(self._toasts)
+
+    @property
+    def maxlen(self):
+        return self._toasts.maxlen
+
+    def post(self, text, seconds=DEFAULT_SECONDS):
+        """Show `text` for `seconds`; returns the Toast."""
+        toast = Toast(str(text), self.clock() + seconds)
+        self._toasts.append(toast)
+        self._next_expiry = min(self._next_expiry, toast.expires)
+        return toast
+
+    def append(self, message):
+        """post() for old callers: text, or (text, expiry as a time.time() timestamp)."""
+        if isinstance(message, tuple):
+            text, expires_at = message
+            return self.post(text, max(0.0, expires_at - time.time()))
+        return self.post(message)
+
+    def discard(self, toast):
+        """Remove `toast` if it is still shown."""
+        try:
+            self._toasts.remove(toast)
+        except ValueError:
+            return
+        if toast.expires <= self._next_expiry:
+            self._next_expiry = min((t.expires for t in self._toasts), default=math.inf)
+
+    def clear(self):
+        self._toasts.clear()
+        self._next_expiry = math.inf
+
+    def expire(self, now=None):
+        """Drop expired toasts; returns how many were dropped."""
+        now = self.clock() if now is None else now
+        if now < self._next_expiry:
+            return 0
+        before = len(self._toasts)
+        live = [toast for toast in self._toasts if toast.expires > now]
+        self._toasts = deque(live, maxlen=self._toasts.maxlen)
+        self._next_expiry = min((toast.expires for toast in live), default=math.inf)
+        return before - len(live)
+
+    def flash(self, seconds=0.25):
+        """Flash the screen white, fading out over `seconds`."""
+        self._flash_start = self.clock()
+        self._flash_until = self._flash_start + seconds
+
+    def flashing(self, now=None):
+        now = self.clock() if now is None else now
+        return now < self._flash_until
+
+    def _render(self, toast, font):
+        from ui_helpers import render_text
+        text = render_text(font, toast.text, True, TOAST_TEXT)
+        pad_x, pad_y = TOAST_PADDING
+        width, height = text.get_width() + 2 * pad_x, text.get_height() + 2 * pad_y
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        pygame.draw.rect(surface, TOAST_BACKGROUND, surface.get_rect(), border_radius=height // 2)
+        surface.blit(text, (pad_x, pad_y))
+        toast.surface = surface
+        return surface
+
+    def draw(self, surface, font, now=None):
+        """Draw the flash and the live toasts over `surface`."""
+        if pygame is None:
+            return
+        now = self.clock() if now is None else now
+        self.expire(now)
+
+        if now < self._flash_until:
+            size = surface.get_size()
+            overlay = self._flash_surface
+            if overlay is None or overlay.get_size() != size:
+                overlay = self._flash_surface = pygame.Surface(size)
+                overlay.fill((255, 255, 255))
+            left = (self._flash_until - now) / (self._flash_until - self._flash_start)
+            overlay.set_alpha(int(FLASH_ALPHA * left))
+            surface.blit(overlay, (0, 0))
+
+        y = TOAST_TOP
+        centre_x = surface.get_width() // 2
+        for toast in self._toasts:
+            rendered = toast.surface or self._render(toast, font)
+            surface.blit(rendered, (centre_x - rendered.get_width() // 2, y))
+            y += rendered.get_height() + TOAST_GAP
@@ -0,0 +1,153 @@
+"""Flappy Mango leaderboard.
+
+The database keeps the heavy lifting incremental: an index on
+scores(pet_id, score), and the per-pet pet_score_rollups /
+pet_score_counts tables maintained by a trigger on every insert (see
+schema.sql). A Leaderboard covers one pet: it loads those once and then
+mirrors each new score in memory, so the hub and Flappy panels can read
+bests and ranks every frame without touching SQLite. The same queries are
+answered by every store.StateStore, so other backends work too:
+
+- best()/games() for the 'day', 'week' and 'all' windows are O(1),
+- rank() is O(log n) through a Fenwick tree over score values,
+- top() returns a cached top-N list; equal scores keep the order they
+  were stored in.
+"""
+import bisect
+import itertools
+from datetime import datetime, timezone
+
+import store as _store
+
+WINDOWS = ('day', 'week', 'all')
+
+
+def window_buckets(when=None):
+    """Return the rollup bucket of each window for a UTC datetime (default now)."""
+    when = when or datetime.now(timezone.utc)
+    return {
+        'day': when.strftime('%Y-%m-%d'),
+        'week': when.strftime('%Y-%W'),
+        'all': 'all',
+    }
+
+
+class FenwickTree:
+    """Counts per non-negative integer key with O(log n) prefix sums."""
+
+    def __init__(self, size=64):
+        self._tree = [0] * (size + 1)
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def _grow(self, key):
+        size = len(self)
+        while size <= key:
+            size *= 2
+        counts = [self.count_at(i) for i in range(len(self))]
+        self._tree = [0] * (size + 1)
+        for i, n in enumerate(counts):
+            if n:
+                self.add(i, n)
+
+    def add(self, key, delta=1):
+        if key >= len(self):
+            self._grow(key)
+        i = key + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, key):
+        """Total count of keys <= `key`."""
+        i = min(key + 1, len(self._tree) - 1)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def count_at(self, key):
+        return self.prefix(key) - (self.prefix(key - 1) if key > 0 else 0)
+
+    def total(self):
+        return self.prefix(len(self) - 1)
+
+
+class Leaderboard:
+    """In-memory view of one pet's score leaderboard.
+
+    `source` is a StateStore or the path of a SQLite database. Call
+    `record()` after each of the pet's scores is stored so the cached view
+    stays in step with the database triggers; `refresh()` reloads it from
+    disk.
+    """
+
+    def __init__(self, source, top_n=10, pet_id=_store.DEFAULT_PET_ID):
+        if isinstance(source, _store.StateStore):
+            self.store = source
+        else:
+            self.store = _store.SQLiteStore(source)
+        self.db_path = self.store.path
+        self.pet_id = pet_id
+        self.top_n = top_n
+        self.refresh()
+
+    def refresh(self):
+        """Reload counts, top-N and the current window rollups."""
+        self._counts = FenwickTree()
+        for score, games in self.store.score_counts(self.pet_id):
+            self._counts.add(max(0, score), games)
+        # (-score, order stored, played_at): ascending, so bisect keeps it
+        # best-first with ties in the order they were stored
+        top = self.store.top_scores(self.top_n, self.pet_id)
+        self._top = [(-score, i, played_at or '') for i, (score, played_at) in enumerate(top)]
+        self._order = itertools.count(len(self._top))
+        self._buckets = window_buckets()
+        self._windows = {}
+        for window in WINDOWS:
+            row = self.store.score_rollup(window, self._buckets[window], self.pet_id)
+            self._windows[window] = list(row) if row else [0, 0, 0]
+
+    def _roll_windows(self):
+        # a new day or week started since the last read: start it empty
+        buckets = window_buckets()
+        if buckets != self._buckets:
+            for window in WINDOWS:
+                if buckets[window] != self._buckets[window]:
+                    self._windows[window] = [0, 0, 0]
+            self._buckets = buckets
+
+    def record(self, score, played_at=None):
+        """Mirror a score that has just been stored in the database."""
+        self._roll_windows()
+        self._counts.add(max(0, score))
+        for window in WINDOWS:
+            stats = self._windows[window]
+            stats[0] = max(stats[0], score)
+            stats[1] += 1
+            stats[2] += score
+        if played_at is None:
+            played_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        bisect.insort_right(self._top, (-score, next(self._order), played_at))
+        del self._top[self.top_n:]
+
+    def best(self, window='all'):
+        """Best score in `window` ('day', 'week' or 'all'); 0 if none."""
+        self._roll_windows()
+        return self._windows[window][0]
+
+    def games(self, window='all'):
+        """Number of games recorded in `window`."""
+        self._roll_windows()
+        return self._windows[window][1]
+
+    def rank(self, score):
+        """1-based all-time rank `score` would have (ties share a rank)."""
+        return 1 + self._counts.total() - self._counts.prefix(max(0, score))
+
+    def top(self, n=None):
+        """Best scores as (score, played_at), best first."""
+        n = self.top_n if n is None else min(n, self.top_n)
+        return [(-neg, played_at) for neg, _, played_at in self._top[:n]]
@@ -0,0 +1,190 @@
+"""Mango's stats as a compact value type.
+
+PetState holds the five 0-100 stats, age and the aging clock
+(last_updated) in __slots__, so a pet costs a fraction of a dict's memory
+and stats read as plain attributes (``state.hunger``). Stats are clamped
+to 0-100 and age to >= 0 on every write, and every write that changes a
+value bumps `version`, so derived values (mood, sprite; see derived.py)
+can be recomputed only when the stats actually changed.
+
+For the code that still treats the state as a dict, PetState is also a
+mutable mapping over the same fields: ``state['hunger']``, ``.get()``,
+``.update()``, ``dict(state)`` and comparison with dicts all work.
+Assigning a plain dict to MangoTamagotchi.mango_state converts it.
+
+Bulk conversion: to_rows/from_rows use tuples in db.STATE_FIELDS order,
+to_array/from_array use an (n, 6) NumPy array (NumPy optional), and
+to_snapshots/from_snapshots use concatenated snapshot.py records (one
+state: PetState.to_snapshot/from_snapshot).
+"""
+from collections.abc import MutableMapping
+from operator import attrgetter
+
+try:
+    import numpy as np
+except Exception:
+    # only the array conversions need numpy
+    np = None
+
+import snapshot
+
+STATS = ('hunger', 'happiness', 'cleanliness', 'energy', 'health')
+# stats plus age, in the column order of db.STATE_FIELDS and fleet arrays
+NUMERIC_FIELDS = STATS + ('age',)
+FIELDS = NUMERIC_FIELDS + ('last_updated',)
+
+# A new Mango's stats
+DEFAULT_STATS = {
+    'hunger': 80,
+    'happiness': 70,
+    'cleanliness': 60,
+    'energy': 90,
+    'health': 100,
+    'age': 0,
+}
+
+_FIELD_SET = frozenset(FIELDS)
+
+
+def _stat_property(name):
+    slot = '_' + name
+
+    def set_stat(self, value):
+        value = min(100, max(0, int(value)))
+        if value != getattr(self, slot, None):
+            setattr(self, slot, value)
+            self.version += 1
+
+    return property(attrgetter(slot), set_stat, doc="%s, clamped to 0-100" % name)
+
+
+def _set_age(self, value):
+    value = max(0, int(value))
+    if value != getattr(self, '_age', None):
+        self._age = value
+        self.version += 1
+
+
+class PetState(MutableMapping):
+    """One pet's stats, age and aging clock.
+
+    `version` counts changes to the stats and age; last_updated is not
+    counted.
+    """
+
+    __slots__ = tuple('_' + name for name in NUMERIC_FIELDS) + ('last_updated', 'version')
+
+    hunger = _stat_property('hunger')
+    happiness = _stat_property('happiness')
+    cleanliness = _stat_property('cleanliness')
+    energy = _stat_property('energy')
+    health = _stat_property('health')
+    age = property(attrgetter('_age'), _set_age, doc="age, never negative")
+
+    def __init__(self, hunger=0, happiness=0, cleanliness=0, energy=0, health=0, age=0,
+                 last_updated=None):
+        self.version = 0
+        self.hunger = hunger
+        self.happiness = happiness
+        self.cleanliness = cleanliness
+        self.energy = energy
+        self.health = health
+        self.age = age
+        self.last_updated = last_updated
+
+    @classmethod
+    def default(cls, last_updated=None):
+        """A new Mango born at `last_updated` (an ISO timestamp)."""
+        return cls(last_updated=last_updated, **DEFAULT_STATS)
+
+    @classmethod
+    def from_dict(cls, mapping):
+        """Build from a state dict; unknown keys (e.g. 'saved_at') are ignored."""
+        return cls(**{name: mapping[name] for name in FIELDS if name in mapping})
+
+    def copy(self):
+        return PetState(self._hunger, self._happiness, self._cleanliness, self._energy,
+                        self._health, self._age, self.last_updated)
+
+    # Mapping view
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("PetState fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return 'PetState(%s)' % ', '.join('%s=%r' % (name, getattr(self, name)) for name in FIELDS)
+
+    # Rows and snapshots
+
+    def to_row(self):
+        """(hunger, happiness, cleanliness, energy, health, age)."""
+        return (self._hunger, self._happiness, self._cleanliness, self._energy,
+                self._health, self._age)
+
+    @classmethod
+    def from_row(cls, row, last_updated=None):
+        return cls(*row[:6], last_updated=last_updated)
+
+    def to_snapshot(self, pet_id=snapshot.DEFAULT_PET_ID, saved_at=None):
+        """Pack into a snapshot.py record."""
+        return snapshot.pack_state(self, pet_id, saved_at)
+
+    @classmethod
+    def from_snapshot(cls, data, offset=0):
+        """Decode a snapshot.py record into (pet_id, PetState)."""
+        pet_id, state = snapshot.unpack_state(data, offset)
+        return pet_id, cls.from_dict(state)
+
+
+def to_rows(states):
+    """List of to_row() tuples for an iterable of states."""
+    return [state.to_row() for state in states]
+
+
+def from_rows(rows, last_updated=None):
+    """PetStates from (hunger, ..., age) rows."""
+    return [PetState.from_row(row, last_updated) for row in rows]
+
+
+def to_array(states):
+    """(n, 6) int64 array of NUMERIC_FIELDS for a sequence of states."""
+    if np is None:
+        raise RuntimeError("to_array requires numpy")
+    return np.array(to_rows(states), dtype=np.int64).reshape(-1, len(NUMERIC_FIELDS))
+
+
+def from_array(values, last_updated=None):
+    """PetStates from an (n, 6) array; values are clamped like any write."""
+    if np is None:
+        raise RuntimeError("from_array requires numpy")
+    values = np.asarray(values)
+    clamped = values.copy()
+    clamped[:, :len(STATS)] = np.clip(values[:, :len(STATS)], 0, 100)
+    clamped[:, len(STATS)] = np.maximum(values[:, len(STATS)], 0)
+    return from_rows(clamped.tolist(), last_updated)
+
+
+def to_snapshots(states, saved_at=None):
+    """Pack (pet_id, state) pairs into concatenated snapshot records."""
+    return snapshot.pack_states(states, saved_at)
+
+
+def from_snapshots(data):
+    """Decode concatenated snapshot records into (pet_id, PetState) pairs."""
+    return [(pet_id, PetState.from_dict(state)) for pet_id, state in snapshot.unpack_states(data)]
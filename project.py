@@ -5,9 +5,7 @@ Enhanced with real-world APIs and beautiful UI.
 """
 
 import pygame
-import sqlite3
 import random
-import time
 import requests
 import json
 from datetime import datetime, timedelta
@@ -18,6 +16,10 @@ import math
 import wave
 import struct
 
+from decay import (
+    RANDOM_EVENT_INTERVAL, RANDOM_EVENT_CHANCE, SICK_EVENT_HEALTH, MISBEHAVIOUR_HAPPINESS,
+)
+
 # Pre-initialize the mixer for more reliable audio behavior on different platforms
 # Use common settings: 44100 Hz, 16-bit signed, stereo, small buffer
 try:
@@ -86,7 +88,7 @@ except Exception:
             return 0
 
 class MangoTamagotchi:
-    def __init__(self):
+    def __init__(self, db_path="db/mango.db", pet_id=1, store=None, time_source=None):
         # Create the real display surface and a fixed-size logical surface
         self._display_screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Mango: The Virtual Lovebird v2.0")
@@ -96,6 +98,8 @@ class MangoTamagotchi:
         # Fullscreen tracking: starts windowed, can be toggled at runtime
         self.fullscreen = False
         self._windowed_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+        # Preallocated destination for scaled presentation (see _scaled_logical_frame)
+        self._present_target = None
         
         # Modern fonts
         try:
@@ -112,7 +116,17 @@ class MangoTamagotchi:
             self.tiny_font = pygame.font.SysFont('Arial', 16)
         
         self.state = GameState.TAMAGOTCHI_HUB
-        self.db_path = "db/mango.db"
+        # which pet in the database this game shows (see the pets table)
+        self.pet_id = pet_id
+        # Write-behind state saving: bursts of changes within this many
+        # seconds are coalesced into a single database write
+        self.state_save_interval = 0.5
+        self._state_writer = None
+        self._leaderboard = None
+        # Storage backend: a StateStore, or the name of one ('sqlite',
+        # 'memory', 'snapshot'; default depends on the platform)
+        from store import StateStore, open_store
+        self.store = store if isinstance(store, StateStore) else open_store(db_path, store)
         
         # Initialize API handler
         self.api_handler = APIHandler()
@@ -130,51 +144,65 @@ class MangoTamagotchi:
         # SFX visual indicator (last played SFX event)
         self._last_sfx_event = None
         
+        # Pet time: a clock.Clock (real time) or clock.WarpClock (simulated)
+        from clock import Clock
+        self.time_source = time_source or Clock()
+
         # Game variables
-        self.last_stat_update = time.time()
-        self.last_random_event = time.time()
+        self.last_stat_update = self.time_source.time()
+        self.last_random_event = self.time_source.time()
         self.is_sick = False
         self.misbehavior_count = 0
-        self.high_score = self.get_high_score()
+
+        # Timed pet work (decay, random events, aging, day/night) runs from
+        # one scheduler on the pet clock, ticked once per frame. UI timers
+        # (e.g. the chirp cooldown) use ui_scheduler, which stays on real
+        # time when the pet clock is warped.
+        from scheduler import Scheduler
+        self.scheduler = Scheduler(clock=self.time_source.monotonic)
+        self.ui_scheduler = Scheduler()
+
+        # Mood, hub sprite and the low-health flag, recomputed only when
+        # mango_state or is_sick changes
+        from derived import DerivedState
+        from hub_ui import on_derived_change
+        self.derived = DerivedState(self)
+        # the hub drops its cached sprite frames and stat bars on changes
+        self.derived.subscribe(on_derived_change)
+        self._decay_timer = None
+        self._random_event_timer = None
+        self._aging_timer = None
         
         # Day/night cycle
-        self.current_hour = datetime.now().hour
-        self.is_night = self.current_hour < 6 or self.current_hour > 18
+        self._update_day_night()
+        # Gradient backgrounds cached per (is_night) for the current logical size
+        self._gradient_cache = None
 
         # Initialize database and load or create Mango's state
         try:
             self.init_database()
         except Exception:
             pass
+        try:
+            self.high_score = self.get_high_score()
+        except Exception:
+            self.high_score = 0
 
+        from pet_state import PetState
         try:
-            self.mango_state = self.load_state()
-            if not self.mango_state:
+            loaded = self.load_state()
+            if loaded:
+                self.mango_state = loaded
+            else:
                 # create default state
-                self.mango_state = {
-                    'hunger': 80,
-                    'happiness': 70,
-                    'cleanliness': 60,
-                    'energy': 90,
-                    'health': 100,
-                    'age': 0,
-                    'last_updated': datetime.now().isoformat()
-                }
+                self.mango_state = PetState.default(self.time_source.now().isoformat())
                 try:
-                    self.save_state()
+                    self.save_state('init')
                 except Exception:
                     pass
         except Exception:
             # ensure attribute exists even on failure
-            self.mango_state = {
-                'hunger': 80,
-                'happiness': 70,
-                'cleanliness': 60,
-                'energy': 90,
-                'health': 100,
-                'age': 0,
-                'last_updated': datetime.now().isoformat()
-            }
+            self.mango_state = PetState.default(self.time_source.now().isoformat())
 
         # Load background images and sprites
         try:
@@ -201,119 +229,186 @@ class MangoTamagotchi:
             # fallback: keep old loader present but empty
             self.sounds = {}
 
-        # HUD messages and screen flash timer
-        self.hud_messages = []  # list of (text, expiry_timestamp)
-        self.flash_until = 0.0
+        # HUD toasts and screen flash, drawn over every frame by present()
+        from hud import HUD
+        self.hud_messages = HUD()
+
+        self._start_decay_timer()
+        self._start_random_event_timer()
+        self._schedule_aging()
         
-    def init_database(self):
-        """Initialize the SQLite database with schema."""
-        try:
-            # Delegate to db helper for clarity
-            from db import init_database as _init_db
-            _init_db(self.db_path, schema_path='schema.sql')
-        except Exception:
-            # fallback to original inline behavior if helper unavailable
+    @property
+    def mango_state(self):
+        """Mango's stats as a PetState (also usable as a dict)."""
+        return self._pet_state
+
+    @mango_state.setter
+    def mango_state(self, state):
+        # plain dicts from older callers are converted
+        from pet_state import PetState
+        self._pet_state = state if isinstance(state, PetState) else PetState.from_dict(state)
+
+    @property
+    def db_path(self):
+        """Path of the current store's database."""
+        return self.store.path
+
+    @db_path.setter
+    def db_path(self, path):
+        # switch to another database with the same kind of backend
+        from store import open_store
+        self.set_store(open_store(path, self.store.backend))
+
+    def set_store(self, store):
+        """Use `store` for everything saved or loaded from now on."""
+        writer = self._state_writer
+        if writer is not None:
+            # finish writing to the old store first
             try:
-                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                with open('schema.sql', 'r') as f:
-                    schema = f.read()
-                    cursor.executescript(schema)
-                conn.commit()
-                conn.close()
+                writer.close()
             except Exception:
                 pass
-    
-    def save_state(self):
-        """Save Mango's current state to database."""
+            self._state_writer = None
+        self._leaderboard = None
+        self.store = store
+
+    def init_database(self):
+        """Prepare the storage backend (creates the SQLite schema)."""
         try:
-            from db import save_state as _save_state
-            _save_state(self.db_path, self.mango_state)
+            self.store.init()
         except Exception:
+            pass
+    
+    def _get_state_writer(self):
+        """Return the store's background state writer, or None to save synchronously."""
+        writer = self._state_writer
+        if writer is not None and writer.pet_id != self.pet_id:
+            # pet switched: finish writing the old one first
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM mango_state")
-                cursor.execute(
-                    """
-                    INSERT INTO mango_state 
-                    (hunger, happiness, cleanliness, energy, health, age, last_updated)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        self.mango_state['hunger'],
-                        self.mango_state['happiness'],
-                        self.mango_state['cleanliness'],
-                        self.mango_state['energy'],
-                        self.mango_state['health'],
-                        self.mango_state['age'],
-                        datetime.now().isoformat(),
-                    ),
-                )
-                conn.commit()
-                conn.close()
+                writer.close()
             except Exception:
                 pass
+            writer = None
+        if writer is None:
+            writer = self.store.writer(self.pet_id, self.state_save_interval)
+            self._state_writer = writer
+        return writer
+
+    def save_state(self, action='update'):
+        """Queue Mango's current state to be saved.
+
+        `action` names what changed the state (feed, decay, medicine, ...)
+        and is recorded in the state history. The write happens on a
+        background thread so bursts are batched into one transaction; use
+        flush_state() when the data must be on disk now.
+        """
+        try:
+            writer = self._get_state_writer()
+            if writer is not None:
+                writer.submit(self._stamped(self.mango_state), action)
+                return
+        except Exception:
+            pass
+        self._save_state_now(action)
+
+    def _stamped(self, state):
+        """`state` as a dict with 'saved_at' taken from the pet clock.
+
+        last_updated (aging) is read from the same clock, so catch-up
+        never mixes warped and real time.
+        """
+        state = dict(state)
+        state['saved_at'] = self.time_source.now().isoformat()
+        return state
+
+    def flush_state(self):
+        """Write any queued state to the database before returning."""
+        writer = self._state_writer
+        if writer is None:
+            return
+        try:
+            writer.flush()
+        except Exception:
+            self._save_state_now()
+
+    def _save_state_now(self, action='update'):
+        """Save Mango's current state to the store synchronously."""
+        try:
+            self.store.save_state(self._stamped(self.mango_state), action, self.pet_id)
+        except Exception:
+            pass
     
     def load_state(self):
-        """Load Mango's state from database."""
+        """Load Mango's state from the store.
+
+        Decay and aging missed while the game was closed are applied (see
+        decay.catch_up) and saved as an 'offline' change.
+        """
+        # make sure queued writes are visible to the read
+        self.flush_state()
         try:
-            from db import load_state as _load_state
-            return _load_state(self.db_path)
+            state = self.store.load_state(self.pet_id)
         except Exception:
+            return None
+        if state:
+            state = self._catch_up(state)
+        return state
+
+    def _catch_up(self, state):
+        """Apply the time since `state` was saved; returns the updated state."""
+        from decay import catch_up
+        saved_at = state.pop('saved_at', None)
+        try:
+            caught_up, sick, leftover = catch_up(state, saved_at, self.time_source.now())
+        except Exception:
+            return state
+        if sick:
+            self.is_sick = True
+        # the partial tick still counts towards the next in-game decay
+        self.last_stat_update = self.time_source.time() - leftover
+        if caught_up != state:
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM mango_state ORDER BY id DESC LIMIT 1")
-                result = cursor.fetchone()
-                conn.close()
-                if result:
-                    return {
-                        'hunger': result[1],
-                        'happiness': result[2],
-                        'cleanliness': result[3],
-                        'energy': result[4],
-                        'health': result[5],
-                        'age': result[6],
-                        'last_updated': result[7]
-                    }
+                self.store.save_state(self._stamped(caught_up), 'offline', self.pet_id)
             except Exception:
                 pass
-        return None
+        return caught_up
     
     def feed_mango(self):
         """Feed Mango to increase hunger."""
-        if self.mango_state['hunger'] < 100:
-            self.mango_state['hunger'] = min(100, self.mango_state['hunger'] + 25)
-            self.mango_state['happiness'] = min(100, self.mango_state['happiness'] + 5)
-            self.save_state()
+        state = self.mango_state
+        if state.hunger < 100:
+            # PetState clamps every stat to 0-100
+            state.hunger += 25
+            state.happiness += 5
+            self.save_state('feed')
             return True
         return False
     
     def bathe_mango(self):
         """Bathe Mango to increase cleanliness."""
-        if self.mango_state['cleanliness'] < 100:
-            self.mango_state['cleanliness'] = min(100, self.mango_state['cleanliness'] + 30)
-            self.mango_state['happiness'] = min(100, self.mango_state['happiness'] + 10)
-            self.save_state()
+        state = self.mango_state
+        if state.cleanliness < 100:
+            state.cleanliness += 30
+            state.happiness += 10
+            self.save_state('bathe')
             return True
         return False
     
     def play_with_mango(self):
         """Play with Mango to increase happiness."""
-        if self.mango_state['energy'] > 10:
-            self.mango_state['happiness'] = min(100, self.mango_state['happiness'] + 20)
-            self.mango_state['energy'] = max(0, self.mango_state['energy'] - 15)
-            self.save_state()
+        state = self.mango_state
+        if state.energy > 10:
+            state.happiness += 20
+            state.energy -= 15
+            self.save_state('play')
             return True
         return False
     
     def rest_mango(self):
         """Let Mango rest to restore energy."""
-        if self.mango_state['energy'] < 100:
-            self.mango_state['energy'] = min(100, self.mango_state['energy'] + 30)
-            self.save_state()
+        if self.mango_state.energy < 100:
+            self.mango_state.energy += 30
+            self.save_state('rest')
             return True
         return False
     
@@ -321,14 +416,15 @@ class MangoTamagotchi:
         """Give medicine to heal Mango."""
         # Give medicine and fully restore health to 100
         # Medicine can now be given regardless of sickness state
-        self.mango_state['health'] = 100
+        self.mango_state.health = 100
         self.is_sick = False
 
         for k in ('hunger', 'cleanliness', 'energy'):
             if self.mango_state[k] < 25:
                 self.mango_state[k] = 25
 
-        self.last_stat_update = time.time()
+        self.last_stat_update = self.time_source.time()
+        self._start_decay_timer()
 
         # Play medicine sound if available (non-fatal)
         try:
@@ -345,24 +441,24 @@ class MangoTamagotchi:
             pass
 
         # HUD message and soft flash for feedback
-        self.hud_messages.append(("Medicine used!", time.time() + 2.0))
-        self.flash_until = time.time() + 0.25
+        self.show_message("Medicine used!", 2.0)
+        self.hud_messages.flash(0.25)
 
-        self.save_state()
+        self.save_state('medicine')
         return True
 
     def discipline(self):
         """Discipline Mango to reduce misbehavior."""
         if self.misbehavior_count > 0:
             self.misbehavior_count = max(0, self.misbehavior_count - 1)
-            self.mango_state['happiness'] = max(0, self.mango_state['happiness'] - 5)
-            self.save_state()
+            self.mango_state.happiness -= 5
+            self.save_state('discipline')
             return True
         return False
     
     def age_mango(self):
         """Age Mango based on time passed."""
-        current_time = datetime.now()
+        current_time = self.time_source.now()
         last_updated = datetime.fromisoformat(self.mango_state['last_updated'])
         hours_passed = (current_time - last_updated).total_seconds() / 3600
         
@@ -370,43 +466,126 @@ class MangoTamagotchi:
         if hours_passed >= 24:
             self.mango_state['age'] += 1
             self.mango_state['last_updated'] = current_time.isoformat()
-            self.save_state()
+            self.save_state('age')
+
+    def _schedule_aging(self):
+        """(Re)arm the one-shot timer for Mango's next birthday."""
+        self.scheduler.cancel(self._aging_timer)
+        try:
+            last_updated = datetime.fromisoformat(self.mango_state['last_updated'])
+            delay = (last_updated + timedelta(hours=24) - self.time_source.now()).total_seconds()
+        except Exception:
+            delay = 3600
+        # overdue birthdays are handled on the next second rather than this frame
+        self._aging_timer = self.scheduler.call_later(max(1.0, delay), self._aging_tick, name='aging')
+
+    def _aging_tick(self):
+        self.age_mango()
+        self._schedule_aging()
+
+    def _update_day_night(self):
+        """Refresh the day/night flag and arm the check for the next hour."""
+        now = self.time_source.now()
+        self.current_hour = now.hour
+        self.is_night = self.current_hour < 6 or self.current_hour > 18
+        next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        self.scheduler.call_later((next_hour - now).total_seconds() + 0.5,
+                                  self._update_day_night, name='day_night')
+
+    def advance_time(self, seconds):
+        """Move a WarpClock forward by `seconds` in one jump.
+
+        Decay and aging over the interval are applied in closed form
+        (decay.catch_up, so weather is left out), the random event rolls
+        due are made, and the timers are re-armed from the new time. A
+        simulated week costs about as much as a minute.
+        Raises TypeError if the game runs on the real clock.
+        """
+        from decay import catch_up
+        clock = self.time_source
+        if not clock.warped:
+            raise TypeError("advance_time() needs a WarpClock time source, not %s"
+                            % type(clock).__name__)
+        clock.advance(seconds)
+        now = clock.time()
+
+        state = dict(self.mango_state)
+        last_tick = datetime.fromtimestamp(self.last_stat_update).isoformat()
+        caught_up, sick, leftover = catch_up(state, last_tick, clock.now())
+        self.last_stat_update = now - leftover
+        if sick:
+            self.is_sick = True
+        if caught_up != state:
+            self.mango_state.update(caught_up)
+            self.save_state('decay')
+
+        rolls = int((now - self.last_random_event) // RANDOM_EVENT_INTERVAL)
+        for _ in range(rolls):
+            self._random_event_tick()
+        if rolls:
+            # keep the partial interval towards the next roll
+            self.last_random_event = now - (now - self.last_random_event) % RANDOM_EVENT_INTERVAL
+
+        self._start_decay_timer()
+        self._start_random_event_timer()
+        self._schedule_aging()
+        self.scheduler.tick()
+
+    def show_message(self, text, seconds=2.0):
+        """Show `text` in the HUD for `seconds` of real time."""
+        # expired by HUD.draw() in present(), on the HUD's monotonic clock
+        self.hud_messages.post(text, seconds)
     
     def update_stats(self):
-        """Update Mango's stats over time."""
-        current_time = time.time()
-        time_diff = current_time - self.last_stat_update
+        """Update Mango's stats if a decay tick is due.
+
+        The game loop runs decay from a scheduler timer instead; this keeps
+        the time check for direct callers.
+        """
+        time_diff = self.time_source.time() - self.last_stat_update
         
         # Update stats every 30 seconds (tests use ~35s) for quicker decay in game/testing
-        if time_diff >= 30:
-            # Natural decay (much slower)
-            self.mango_state['hunger'] = max(0, self.mango_state['hunger'] - 1)
-            self.mango_state['happiness'] = max(0, self.mango_state['happiness'] - 1)
-            self.mango_state['cleanliness'] = max(0, self.mango_state['cleanliness'] - 1)
-            self.mango_state['energy'] = max(0, self.mango_state['energy'] - 1)
-            
-            # Weather effects on mood (apply only negative effects here so
-            # natural decay always results in same-or-lower happiness; positive
-            # weather bonuses are omitted to keep auto-decay deterministic.)
-            weather_mood = self.api_handler.get_weather_mood_effect() or 0
-            if weather_mood < 0:
-                self.mango_state['happiness'] = max(0, min(100,
-                    self.mango_state['happiness'] + weather_mood))
-            
-            # Health decreases if other stats are too low
-            if (self.mango_state['hunger'] <= 10 or 
-                self.mango_state['cleanliness'] <= 10 or 
-                self.mango_state['energy'] <= 10):
-                self.mango_state['health'] = max(0, self.mango_state['health'] - 3)
-            # 👉 New: if health gets critically low, Mango becomes sick
-            if self.mango_state['health'] <= 30 and not self.is_sick:
-                self.is_sick = True
-            
-            # Check for random events
+        from decay import DECAY_INTERVAL
+        if time_diff >= DECAY_INTERVAL:
+            self._decay_tick()
+            # Check for random events (saved as their own change)
             self.check_random_events()
-            
-            self.last_stat_update = current_time
-            self.save_state()
+
+    def _start_decay_timer(self):
+        """(Re)start the decay timer, keeping the time since the last tick."""
+        from decay import DECAY_INTERVAL
+        self.scheduler.cancel(self._decay_timer)
+        first = max(0.0, DECAY_INTERVAL - (self.time_source.time() - self.last_stat_update))
+        self._decay_timer = self.scheduler.call_every(
+            DECAY_INTERVAL, self._decay_tick, first=first, name='decay')
+
+    def _start_random_event_timer(self):
+        """(Re)start the random event timer, keeping the time since the last roll."""
+        self.scheduler.cancel(self._random_event_timer)
+        first = max(0.0, RANDOM_EVENT_INTERVAL - (self.time_source.time() - self.last_random_event))
+        self._random_event_timer = self.scheduler.call_every(
+            RANDOM_EVENT_INTERVAL, self._random_event_tick, first=first, name='random_events')
+
+    def _decay_tick(self):
+        """Apply one decay tick to Mango's stats."""
+        from decay import SICK_HEALTH, apply_decay
+        # Natural decay (much slower), plus the health penalty when
+        # hunger, cleanliness or energy is too low; see decay.py
+        self.mango_state.update(apply_decay(self.mango_state))
+        
+        # Weather effects on mood (apply only negative effects here so
+        # natural decay always results in same-or-lower happiness; positive
+        # weather bonuses are omitted to keep auto-decay deterministic.)
+        weather_mood = self.api_handler.get_weather_mood_effect() or 0
+        if weather_mood < 0:
+            self.mango_state.happiness += weather_mood
+        
+        # 👉 New: if health gets critically low, Mango becomes sick
+        if self.mango_state.health <= SICK_HEALTH and not self.is_sick:
+            self.is_sick = True
+        
+        self.save_state('decay')
+        self.last_stat_update = self.time_source.time()
 
     def _apply_volume_settings(self):
         """Apply current master/music/sfx volume settings to mixer and loaded sounds."""
@@ -631,14 +810,37 @@ class MangoTamagotchi:
     
     
     def draw_gradient_background(self):
-        """Draw a beautiful gradient background."""
+        """Draw a beautiful gradient background.
+
+        Each day/night gradient is built once per logical resolution and
+        blitted in a single call afterwards.
+        """
         if self.is_night:
             start_color = NIGHT_START
             end_color = NIGHT_END
         else:
             start_color = GRADIENT_START
             end_color = GRADIENT_END
-        
+
+        try:
+            size = self.screen.get_size()
+            cache = getattr(self, '_gradient_cache', None)
+            if cache is None or cache.get('size') != size:
+                # logical size changed: drop both cached gradients
+                cache = {'size': size}
+                self._gradient_cache = cache
+            surf = cache.get(self.is_night)
+            if surf is None:
+                from ui_helpers import build_gradient_surface as _bgs
+                surf = _bgs(size, start_color, end_color)
+                cache[self.is_night] = surf
+            if surf is not None:
+                self.screen.blit(surf, (0, 0))
+                return
+        except Exception:
+            pass
+
+        # Fallback: draw the gradient line by line
         for y in range(SCREEN_HEIGHT):
             ratio = y / SCREEN_HEIGHT
             r = int(start_color[0] + (end_color[0] - start_color[0]) * ratio)
@@ -689,7 +891,8 @@ class MangoTamagotchi:
             except Exception:
                 pass
             try:
-                text_surface = self.small_font.render(text, True, text_color)
+                from ui_helpers import render_text
+                text_surface = render_text(self.small_font, text, True, text_color)
                 text_rect = text_surface.get_rect(center=rect.center)
                 self.screen.blit(text_surface, text_rect)
             except Exception:
@@ -715,79 +918,102 @@ class MangoTamagotchi:
     
     def check_random_events(self):
         """Check for random events like sickness or misbehavior."""
-        current_time = time.time()
-        time_diff = current_time - self.last_random_event
+        time_diff = self.time_source.time() - self.last_random_event
         
         # Random events every 2 minutes
-        if time_diff >= 120:
-            if random.random() < 0.3:  # 30% chance
-                event = random.choice(['sick', 'misbehavior'])
-                if event == 'sick' and not self.is_sick:
-                    self.is_sick = True
-                    self.mango_state['health'] = max(0, self.mango_state['health'] - 20)
-                elif event == 'misbehavior':
-                    self.misbehavior_count += 1
-                    self.mango_state['happiness'] = max(0, self.mango_state['happiness'] - 10)
-            
-            self.last_random_event = current_time
+        if time_diff >= RANDOM_EVENT_INTERVAL:
+            self._random_event_tick()
+
+    def _random_event_tick(self):
+        """Roll for a random event (scheduled every RANDOM_EVENT_INTERVAL)."""
+        if random.random() < RANDOM_EVENT_CHANCE:
+            event = random.choice(['sick', 'misbehavior'])
+            if event == 'sick' and not self.is_sick:
+                self.is_sick = True
+                self.mango_state.health -= SICK_EVENT_HEALTH
+                self.save_state('random_event')
+            elif event == 'misbehavior':
+                self.misbehavior_count += 1
+                self.mango_state.happiness -= MISBEHAVIOUR_HAPPINESS
+                self.save_state('random_event')
+        
+        self.last_random_event = self.time_source.time()
     
     def get_mango_mood(self):
         """Determine Mango's current mood based on stats."""
-        if self.is_sick:
-            return "sick"
-        elif self.mango_state['cleanliness'] < 30:
-            return "dirty"
-        elif self.mango_state['energy'] < 20:
-            return "tired"
-        elif self.mango_state['happiness'] > 70:
-            return "happy"
-        elif self.mango_state['happiness'] < 30:
-            return "sad"
-        else:
-            return "neutral"
+        # cached by DerivedState until a stat or is_sick changes
+        self.derived.refresh()
+        return self.derived.mood
     
     def is_game_over(self):
         """Check if game is over (health = 0)."""
-        return self.mango_state['health'] <= 0
+        return self.mango_state.health <= 0
     
     def restart_game(self):
         """Restart the game with a new Mango."""
-        self.mango_state = {
-            'hunger': 80,
-            'happiness': 70,
-            'cleanliness': 60,
-            'energy': 90,
-            'health': 100,
-            'age': 0,
-            'last_updated': datetime.now().isoformat()
-        }
+        from pet_state import PetState
+        self.mango_state = PetState.default(self.time_source.now().isoformat())
         self.is_sick = False
         self.misbehavior_count = 0
-        self.save_state()
+        self.save_state('restart')
+        self._schedule_aging()
     
     def save_score(self, score):
         """Save Flappy Mango score to database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("INSERT INTO scores (score) VALUES (?)", (score,))
-        conn.commit()
-        conn.close()
+        # bind the leaderboard before inserting so it counts this score once
+        board = self.get_leaderboard()
+        self.store.save_score(score, self.pet_id)
         
         # Update high score
         if score > self.high_score:
             self.high_score = score
+        if board is not None:
+            board.record(score)
     
+    def get_leaderboard(self):
+        """Return the cached Leaderboard of the current store and pet (or None)."""
+        board = self._leaderboard
+        if board is None or board.store is not self.store or board.pet_id != self.pet_id:
+            try:
+                from leaderboard import Leaderboard
+                board = Leaderboard(self.store, pet_id=self.pet_id)
+            except Exception:
+                return None
+            self._leaderboard = board
+            self.high_score = board.best('all')
+        return board
+
+    def record_flappy_session(self, session):
+        """Record a finished Flappy run and apply its rewards, exactly once.
+
+        The session id is an idempotency key, so recording the same session
+        again changes nothing. Runs that scored nothing are not stored, as
+        before sessions existed, so they never count towards the
+        leaderboard. Returns True if the session was recorded.
+        """
+        if session.score <= 0:
+            return False
+        board = self.get_leaderboard()
+        try:
+            is_new = self.store.record_flappy_session(session, self.pet_id)
+        except Exception:
+            # keep the rewards even if the score row could not be written
+            is_new = True
+        if not is_new:
+            return False
+
+        if session.score > self.high_score:
+            self.high_score = session.score
+        if board is not None:
+            board.record(session.score)
+        happiness_bonus = min(25, session.score * 2)
+        self.mango_state.happiness += happiness_bonus
+        self.save_state('flappy')
+        return True
+
     def get_high_score(self):
-        """Get the highest score from database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT MAX(score) FROM scores")
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result[0] if result[0] else 0
+        """Get this pet's highest score from the store."""
+        return self.store.get_high_score(self.pet_id)
     
     def play_flappy_mango(self):
         """Delegate to the Flappy mini-game implementation in flappy.py.
@@ -799,12 +1025,39 @@ class MangoTamagotchi:
         # they are easier to diagnose during development rather than silently
         # falling back to legacy behavior.
         from flappy import play_flappy_mango as _play
-        return _play(self, GameState.FLAPPY_MANGO, GameState.TAMAGOTCHI_HUB)
+        # scene changes are a natural checkpoint for queued state
+        self.flush_state()
+        try:
+            return _play(self, GameState.FLAPPY_MANGO, GameState.TAMAGOTCHI_HUB)
+        finally:
+            self.flush_state()
 
     def play_feed_minigame(self):
         """Delegate to feed_minigame.play_feed_minigame."""
         from feed_minigame import play_feed_minigame as _play
-        return _play(self, GameState.TAMAGOTCHI_HUB, GameState.TAMAGOTCHI_HUB)
+        self.flush_state()
+        try:
+            return _play(self, GameState.TAMAGOTCHI_HUB, GameState.TAMAGOTCHI_HUB)
+        finally:
+            self.flush_state()
+
+    def _install_signal_handlers(self):
+        """Flush queued state when the process is asked to terminate."""
+        import signal
+
+        def _on_signal(signum, frame):
+            self.flush_state()
+            raise SystemExit(128 + signum)
+
+        for name in ('SIGTERM', 'SIGHUP'):
+            sig = getattr(signal, name, None)
+            if sig is None:
+                continue
+            try:
+                signal.signal(sig, _on_signal)
+            except (ValueError, OSError):
+                # not on the main thread, or unsupported on this platform
+                pass
     
     def draw_home_screen(self):
         # Delegate fully to the hub_ui module which owns hub rendering.
@@ -819,6 +1072,7 @@ class MangoTamagotchi:
     def run(self):
         """Main game loop."""
         running = True
+        self._install_signal_handlers()
         
         while running:
             # Compute logical mouse position from display coords for scaled rendering
@@ -952,20 +1206,18 @@ class MangoTamagotchi:
                     if event.key == pygame.K_ESCAPE:
                         running = False
             
-            # Update game state
-            self.update_stats()
-            self.age_mango()
+            # Run due timers: decay, random events, aging, day/night, then UI
+            if self.time_source.warped:
+                self.advance_time(self.time_source.take_elapsed())
+            else:
+                self.scheduler.tick()
+            self.ui_scheduler.tick()
             
-            # Force sickness if health is low (real-time check)
-            if self.mango_state['health'] <= 30 and not self.is_sick:
+            # Force sickness if health is low (recomputed only when stats change)
+            self.derived.refresh()
+            if self.derived.low_health and not self.is_sick:
                 self.is_sick = True
             
-            # Update day/night cycle
-            current_hour = datetime.now().hour
-            if current_hour != self.current_hour:
-                self.current_hour = current_hour
-                self.is_night = current_hour < 6 or current_hour > 18
-            
             # Check game over
             if self.is_game_over():
                 self.state = GameState.GAME_OVER
@@ -977,25 +1229,19 @@ class MangoTamagotchi:
                 self.draw_game_over_screen()
             
             # Scale logical `self.screen` to the actual display and flip.
-            try:
-                disp = getattr(self, '_display_screen', None)
-                if disp is not None:
-                    # Smooth scale for nicer visuals when stretching
-                    try:
-                        scaled = pygame.transform.smoothscale(self.screen, disp.get_size())
-                    except Exception:
-                        scaled = pygame.transform.scale(self.screen, disp.get_size())
-                    disp.blit(scaled, (0, 0))
-                    pygame.display.flip()
-                else:
-                    pygame.display.flip()
-            except Exception:
-                try:
-                    pygame.display.flip()
-                except Exception:
-                    pass
+            self.present()
             self.clock.tick(FPS)
         
+        # Write queued state and release the database before shutting down
+        try:
+            if self._state_writer is not None:
+                self._state_writer.close()
+        except Exception:
+            self._save_state_now()
+        try:
+            self.store.close()
+        except Exception:
+            pass
         pygame.quit()
         sys.exit()
     
@@ -1026,18 +1272,14 @@ class MangoTamagotchi:
 
             # Fade out to black
             try:
+                overlay = pygame.Surface(start_size, pygame.SRCALPHA)
                 for i in range(steps):
                     alpha = int(255 * (i + 1) / float(steps))
                     try:
                         if disp is not None:
                             # draw current logical screen scaled to current display
-                            try:
-                                scaled = pygame.transform.smoothscale(self.screen, disp.get_size())
-                            except Exception:
-                                scaled = pygame.transform.scale(self.screen, disp.get_size())
-                            disp.blit(scaled, (0, 0))
+                            disp.blit(self._scaled_logical_frame(disp.get_size()), (0, 0))
                         # overlay
-                        overlay = pygame.Surface(start_size, pygame.SRCALPHA)
                         overlay.fill((0, 0, 0, alpha))
                         if disp is not None:
                             try:
@@ -1087,16 +1329,12 @@ class MangoTamagotchi:
             except Exception:
                 end_size = start_size
             try:
+                overlay = pygame.Surface(end_size, pygame.SRCALPHA)
                 for i in range(steps):
                     alpha = int(255 * (1.0 - (i + 1) / float(steps)))
                     try:
                         if disp is not None:
-                            try:
-                                scaled = pygame.transform.smoothscale(self.screen, disp.get_size())
-                            except Exception:
-                                scaled = pygame.transform.scale(self.screen, disp.get_size())
-                            disp.blit(scaled, (0, 0))
-                        overlay = pygame.Surface(end_size, pygame.SRCALPHA)
+                            disp.blit(self._scaled_logical_frame(disp.get_size()), (0, 0))
                         overlay.fill((0, 0, 0, alpha))
                         if disp is not None:
                             try:
@@ -1138,26 +1376,21 @@ class MangoTamagotchi:
             # Render the current logical screen once to the display, then overlay
             try:
                 if disp is not None:
-                    try:
-                        scaled = pygame.transform.smoothscale(self.screen, disp.get_size())
-                    except Exception:
-                        scaled = pygame.transform.scale(self.screen, disp.get_size())
-                    disp.blit(scaled, (0, 0))
+                    disp.blit(self._scaled_logical_frame(disp.get_size()), (0, 0))
                 else:
                     # attempt to update display from logical surface as best-effort
                     try:
-                        scaled = pygame.transform.smoothscale(self.screen, size)
-                        pygame.display.get_surface().blit(scaled, (0, 0))
+                        pygame.display.get_surface().blit(self._scaled_logical_frame(size), (0, 0))
                     except Exception:
                         pass
                 pygame.display.flip()
             except Exception:
                 pass
 
+            overlay = pygame.Surface(size, pygame.SRCALPHA)
             for i in range(steps):
                 alpha = int(255 * (i + 1) / float(steps))
                 try:
-                    overlay = pygame.Surface(size, pygame.SRCALPHA)
                     overlay.fill((0, 0, 0, alpha))
                     if disp is not None:
                         try:
@@ -1203,19 +1436,11 @@ class MangoTamagotchi:
 
             # Pre-render scaled content once
             try:
-                if disp is not None:
-                    try:
-                        scaled = pygame.transform.smoothscale(self.screen, disp.get_size())
-                    except Exception:
-                        scaled = pygame.transform.scale(self.screen, disp.get_size())
-                else:
-                    try:
-                        scaled = pygame.transform.smoothscale(self.screen, size)
-                    except Exception:
-                        scaled = None
+                scaled = self._scaled_logical_frame(disp.get_size() if disp is not None else size)
             except Exception:
                 scaled = None
 
+            overlay = pygame.Surface(size, pygame.SRCALPHA)
             for i in range(steps):
                 alpha = int(255 * (1.0 - (i + 1) / float(steps)))
                 try:
@@ -1226,7 +1451,6 @@ class MangoTamagotchi:
                             pygame.display.get_surface().blit(scaled, (0, 0))
                         except Exception:
                             pass
-                    overlay = pygame.Surface(size, pygame.SRCALPHA)
                     overlay.fill((0, 0, 0, alpha))
                     if disp is not None:
                         try:
@@ -1248,20 +1472,48 @@ class MangoTamagotchi:
         except Exception:
             pass
 
+    def _scaled_logical_frame(self, size):
+        """Return the logical screen as a surface of the given display size.
+
+        Equal sizes return `self.screen` itself so callers blit it directly.
+        Otherwise the frame is scaled into a destination surface that is
+        allocated once per display size: integer multiples of the logical
+        size use a nearest-neighbour scale, anything else a smoothscale.
+        """
+        size = tuple(size)
+        src_w, src_h = self.screen.get_size()
+        if size == (src_w, src_h):
+            return self.screen
+        target = getattr(self, '_present_target', None)
+        if target is None or target.get_size() != size:
+            # match the logical surface's format so smoothscale can write into it
+            target = pygame.Surface(size, 0, self.screen)
+            self._present_target = target
+        factor = size[0] // src_w if src_w else 0
+        if factor >= 1 and size == (src_w * factor, src_h * factor):
+            pygame.transform.scale(self.screen, size, target)
+        else:
+            try:
+                pygame.transform.smoothscale(self.screen, size, target)
+            except Exception:
+                pygame.transform.scale(self.screen, size, target)
+        return target
+
     def present(self):
         """Scale the logical surface to the display and flip the buffer.
 
         Mini-games should call this instead of pygame.display.flip() so
         presentation is consistent whether windowed or fullscreen.
+        HUD toasts and the screen flash are drawn over the frame here.
         """
+        try:
+            self.hud_messages.draw(self.screen, self.small_font)
+        except Exception:
+            pass
         try:
             disp = getattr(self, '_display_screen', None)
             if disp is not None:
-                try:
-                    scaled = pygame.transform.smoothscale(self.screen, disp.get_size())
-                except Exception:
-                    scaled = pygame.transform.scale(self.screen, disp.get_size())
-                disp.blit(scaled, (0, 0))
+                disp.blit(self._scaled_logical_frame(disp.get_size()), (0, 0))
                 pygame.display.flip()
                 return
         except Exception:
@@ -0,0 +1,128 @@
+"""Timers for the game loop.
+
+Scheduler keeps every pending timer in one min-heap ordered by due time.
+The game calls tick() once per frame: it reads the clock once and runs
+only the timers that are due, so periodic work (stat decay, random
+events, aging, the day/night check, ...) costs nothing on
+frames where nothing is due, instead of every poller reading the clock
+and comparing timestamps itself.
+
+Times are seconds on the scheduler's clock (time.monotonic by default).
+Pass a different `clock` to drive it from a fake or warped clock in tests.
+"""
+import heapq
+import itertools
+import time
+
+
+class Timer:
+    """Handle for a scheduled callback; pass it to Scheduler.cancel()."""
+
+    __slots__ = ('due', 'interval', 'callback', 'args', 'name', 'cancelled')
+
+    def __init__(self, due, interval, callback, args, name):
+        self.due = due
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.name = name
+        self.cancelled = False
+
+    @property
+    def recurring(self):
+        return self.interval is not None
+
+    def __repr__(self):
+        return 'Timer(%s, due=%.3f, interval=%r)' % (self.name or self.callback, self.due, self.interval)
+
+
+class Scheduler:
+    """Min-heap of one-shot and recurring timers.
+
+    Cancelled timers are dropped lazily when they reach the top of the
+    heap, so cancel() is O(1). A recurring timer that fell more than one
+    interval behind (e.g. while a mini-game ran its own loop) fires once
+    and is rescheduled one interval from now rather than firing in a
+    burst.
+    """
+
+    # rebuild the heap once this many cancelled timers are buried in it
+    COMPACT_AFTER = 64
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.now = clock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._cancelled = 0
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def _push(self, timer):
+        heapq.heappush(self._heap, (timer.due, next(self._seq), timer))
+        return timer
+
+    def call_at(self, due, callback, *args, name=None):
+        """Run `callback(*args)` once when the clock reaches `due`."""
+        return self._push(Timer(due, None, callback, args, name))
+
+    def call_later(self, delay, callback, *args, name=None):
+        """Run `callback(*args)` once, `delay` seconds from now."""
+        return self.call_at(self.clock() + delay, callback, *args, name=name)
+
+    def call_every(self, interval, callback, *args, first=None, name=None):
+        """Run `callback(*args)` every `interval` seconds.
+
+        The first call is `first` seconds from now (default: one interval).
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        delay = interval if first is None else first
+        return self._push(Timer(self.clock() + delay, interval, callback, args, name))
+
+    def cancel(self, timer):
+        """Stop `timer` from firing again. Cancelling twice is harmless."""
+        if timer is None or timer.cancelled:
+            return
+        timer.cancelled = True
+        self._cancelled += 1
+        if self._cancelled >= self.COMPACT_AFTER and self._cancelled * 2 >= len(self._heap):
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def next_due(self):
+        """Clock time of the next live timer, or None."""
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+        return heap[0][0] if heap else None
+
+    def tick(self, now=None):
+        """Run every timer due at `now` (default: read the clock once).
+
+        Returns the number of callbacks run. Timers scheduled by a callback
+        for a time already reached run in the same tick.
+        """
+        now = self.clock() if now is None else now
+        self.now = now
+        heap = self._heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            _, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            if timer.recurring:
+                timer.due += timer.interval
+                if timer.due <= now:
+                    timer.due = now + timer.interval
+                self._push(timer)
+            else:
+                # a finished one-shot timer; cancel() on it is now a no-op
+                timer.cancelled = True
+            timer.callback(*timer.args)
+            fired += 1
+        return fired
@@ -1,4 +1,16 @@
--- Tracks Mango's state
+-- Pet registry: every state row, event and score belongs to one pet.
+-- Pet 1 is the default pet used by single-pet installs.
+CREATE TABLE IF NOT EXISTS pets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL DEFAULT 'Mango',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT OR IGNORE INTO pets (id, name) VALUES (1, 'Mango');
+
+-- Snapshots of each pet's state. Each row folds in every state_events row up
+-- to and including event_id; the current state is the latest snapshot plus
+-- the events after it.
 CREATE TABLE IF NOT EXISTS mango_state (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     hunger INTEGER NOT NULL CHECK(hunger BETWEEN 0 AND 100),
@@ -7,12 +19,106 @@ CREATE TABLE IF NOT EXISTS mango_state (
     energy INTEGER NOT NULL CHECK(energy BETWEEN 0 AND 100),
     health INTEGER NOT NULL CHECK(health BETWEEN 0 AND 100),
     age INTEGER NOT NULL DEFAULT 0,
-    last_updated TEXT DEFAULT CURRENT_TIMESTAMP
+    last_updated TEXT DEFAULT CURRENT_TIMESTAMP,
+    event_id INTEGER,
+    pet_id INTEGER NOT NULL DEFAULT 1 REFERENCES pets(id)
+);
+
+-- Append-only history of stat changes: one row per change with the
+-- action that caused it (feed, bathe, decay, medicine, random_event, ...)
+-- and the signed change of each stat. created_at is when the event was saved;
+-- last_updated carries the state's aging clock (when Mango last aged),
+-- NULL for events saved before it was tracked.
+CREATE TABLE IF NOT EXISTS state_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action TEXT NOT NULL,
+    hunger INTEGER NOT NULL DEFAULT 0,
+    happiness INTEGER NOT NULL DEFAULT 0,
+    cleanliness INTEGER NOT NULL DEFAULT 0,
+    energy INTEGER NOT NULL DEFAULT 0,
+    health INTEGER NOT NULL DEFAULT 0,
+    age INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    pet_id INTEGER NOT NULL DEFAULT 1 REFERENCES pets(id),
+    last_updated TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_state_events_created_at ON state_events(created_at);
+
+-- A pet's newest events of one action (db.state_history); replaces the
+-- pre-multi-pet (action, created_at) index
+DROP INDEX IF EXISTS idx_state_events_action;
+CREATE INDEX IF NOT EXISTS idx_state_events_pet_action ON state_events(pet_id, action, id);
+
+-- Latest snapshot per pet, and a covering index for replaying a pet's
+-- events after it without touching the table
+CREATE INDEX IF NOT EXISTS idx_mango_state_pet ON mango_state(pet_id, id);
+CREATE INDEX IF NOT EXISTS idx_state_events_pet ON state_events(
+    pet_id, id, hunger, happiness, cleanliness, energy, health, age
 );
 
--- Scores from Flappy Mango
+-- Scores from Flappy Mango. session_id is the idempotency key of the run
+-- (NULL for rows saved before sessions existed).
 CREATE TABLE IF NOT EXISTS scores (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     score INTEGER NOT NULL,
-    played_at TEXT DEFAULT CURRENT_TIMESTAMP
+    played_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    session_id TEXT,
+    duration REAL,
+    flaps INTEGER,
+    obstacles_passed INTEGER,
+    pet_id INTEGER NOT NULL DEFAULT 1 REFERENCES pets(id)
 );
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scores_session_id ON scores(session_id);
+
+CREATE INDEX IF NOT EXISTS idx_scores_score ON scores(score);
+CREATE INDEX IF NOT EXISTS idx_scores_played_at ON scores(played_at);
+CREATE INDEX IF NOT EXISTS idx_scores_pet_score ON scores(pet_id, score);
+
+-- Leaderboard rollups per pet, maintained by trg_scores_pet_rollup on
+-- every insert. period is 'day' (bucket YYYY-MM-DD), 'week' (bucket
+-- YYYY-WW, weeks start on Monday) or 'all' (bucket 'all'); played_at is UTC.
+-- They replace the pre-multi-pet rollups, which mixed every pet's scores.
+DROP TRIGGER IF EXISTS trg_scores_rollup;
+DROP TABLE IF EXISTS score_rollups;
+DROP TABLE IF EXISTS score_counts;
+
+CREATE TABLE IF NOT EXISTS pet_score_rollups (
+    pet_id INTEGER NOT NULL,
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    best INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (pet_id, period, bucket)
+) WITHOUT ROWID;
+
+-- Number of games per pet and distinct score, used for rank queries
+CREATE TABLE IF NOT EXISTS pet_score_counts (
+    pet_id INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (pet_id, score)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_scores_pet_rollup AFTER INSERT ON scores
+BEGIN
+    INSERT INTO pet_score_rollups (pet_id, period, bucket, best, games, total)
+    VALUES (NEW.pet_id, 'day', date(COALESCE(NEW.played_at, CURRENT_TIMESTAMP)), NEW.score, 1, NEW.score)
+    ON CONFLICT (pet_id, period, bucket) DO UPDATE
+    SET best = MAX(best, excluded.best), games = games + 1, total = total + excluded.total;
+
+    INSERT INTO pet_score_rollups (pet_id, period, bucket, best, games, total)
+    VALUES (NEW.pet_id, 'week', strftime('%Y-%W', COALESCE(NEW.played_at, CURRENT_TIMESTAMP)), NEW.score, 1, NEW.score)
+    ON CONFLICT (pet_id, period, bucket) DO UPDATE
+    SET best = MAX(best, excluded.best), games = games + 1, total = total + excluded.total;
+
+    INSERT INTO pet_score_rollups (pet_id, period, bucket, best, games, total)
+    VALUES (NEW.pet_id, 'all', 'all', NEW.score, 1, NEW.score)
+    ON CONFLICT (pet_id, period, bucket) DO UPDATE
+    SET best = MAX(best, excluded.best), games = games + 1, total = total + excluded.total;
+
+    INSERT INTO pet_score_counts (pet_id, score, games) VALUES (NEW.pet_id, NEW.score, 1)
+    ON CONFLICT (pet_id, score) DO UPDATE SET games = games + 1;
+END;
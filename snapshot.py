@@ -0,0 +1,334 @@
+"""Compact binary snapshots of pet state.
+
+A snapshot is one fixed-size, little-endian record per pet:
+
+    offset  size  field
+    0       4     magic b'MNGO'
+    4       1     format version (FORMAT_VERSION)
+    5       1     reserved, 0
+    6       4     pet id (uint32)
+    10      5     hunger, happiness, cleanliness, energy, health (uint8 each)
+    15      1     reserved, 0
+    16      4     age (uint32)
+    20      8     last_updated, POSIX seconds (float64, NaN if unknown)
+    28      8     saved_at, POSIX seconds (float64, NaN if unknown)
+    36      4     CRC-32 of bytes 0-35
+
+Records are RECORD_SIZE (40) bytes and can be concatenated, so thousands
+of states ship as one bytes object (pack_states/unpack_states). A file of
+records is the snapshot "database": save_state/load_state and
+save_states/load_states take the same arguments as their db.py
+counterparts. In the pygbag (emscripten) build the records are kept in
+the browser's localStorage instead of a file when it is available.
+
+Unlike db.py, snapshots keep only the latest state of each pet: the
+`action` of a save is accepted for compatibility but no history is kept.
+
+Flappy scores use a second kind of record, SCORE_RECORD_SIZE (44) bytes:
+
+    offset  size  field
+    0       4     magic b'MNGS'
+    4       1     format version (FORMAT_VERSION)
+    5       3     reserved, 0
+    8       4     pet id (uint32)
+    12      4     score (uint32)
+    16      8     played_at, POSIX seconds (float64)
+    24      16    session key (session_key() of the session id; zeros if none)
+    40      4     CRC-32 of bytes 0-39
+
+save_scores/load_scores keep a list of them in a file (or localStorage)
+of its own, and append_score adds one record to the end without
+rewriting the others.
+"""
+import base64
+import hashlib
+import math
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime
+
+MAGIC = b'MNGO'
+SCORE_MAGIC = b'MNGS'
+FORMAT_VERSION = 1
+
+STATS = ('hunger', 'happiness', 'cleanliness', 'energy', 'health')
+DEFAULT_PET_ID = 1
+
+_BODY = struct.Struct('<4sBxIBBBBBxIdd')
+_CRC = struct.Struct('<I')
+RECORD_SIZE = _BODY.size + _CRC.size
+_SCORE_BODY = struct.Struct('<4sB3xIId16s')
+SCORE_RECORD_SIZE = _SCORE_BODY.size + _CRC.size
+
+# localStorage keys are this prefix plus the snapshot path
+STORAGE_PREFIX = 'mango-snapshot:'
+
+
+class SnapshotError(ValueError):
+    """Raised for data that is not a valid snapshot record."""
+
+
+def _to_seconds(timestamp):
+    if not timestamp:
+        return math.nan
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _to_iso(seconds):
+    if math.isnan(seconds):
+        return None
+    return datetime.fromtimestamp(seconds).isoformat()
+
+
+def _check(data, offset, body_struct, magic):
+    """Validate the record at `offset` and return its unpacked body."""
+    size = body_struct.size + _CRC.size
+    if len(data) - offset < size:
+        raise SnapshotError("truncated snapshot record")
+    body = data[offset:offset + body_struct.size]
+    (crc,) = _CRC.unpack_from(data, offset + body_struct.size)
+    if zlib.crc32(body) != crc:
+        raise SnapshotError("snapshot checksum mismatch")
+    fields = body_struct.unpack(body)
+    if fields[0] != magic:
+        raise SnapshotError("not a Mango snapshot")
+    if fields[1] != FORMAT_VERSION:
+        raise SnapshotError("unsupported snapshot version %d" % fields[1])
+    return fields
+
+
+def pack_state(mango_state, pet_id=DEFAULT_PET_ID, saved_at=None):
+    """Return the RECORD_SIZE-byte snapshot of one pet's state dict."""
+    try:
+        body = _BODY.pack(
+            MAGIC, FORMAT_VERSION, pet_id,
+            *[int(mango_state[stat]) for stat in STATS],
+            int(mango_state['age']),
+            _to_seconds(mango_state.get('last_updated')),
+            _to_seconds(saved_at),
+        )
+    except struct.error as exc:
+        raise SnapshotError("state out of range for a snapshot: %s" % exc)
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def unpack_state(data, offset=0):
+    """Decode the record at `offset` of `data` into (pet_id, state dict).
+
+    The dict has the stats, 'age', 'last_updated' and 'saved_at' like
+    db.load_state(). Raises SnapshotError for truncated or corrupt data
+    and for records written by an unknown format version.
+    """
+    fields = _check(data, offset, _BODY, MAGIC)
+    state = dict(zip(STATS, fields[3:8]))
+    state['age'] = fields[8]
+    state['last_updated'] = _to_iso(fields[9])
+    state['saved_at'] = _to_iso(fields[10])
+    return fields[2], state
+
+
+def pack_states(states, saved_at=None):
+    """Pack an iterable of (pet_id, state dict) into one bytes object."""
+    return b''.join(pack_state(state, pet_id, saved_at) for pet_id, state in states)
+
+
+def unpack_states(data):
+    """Decode concatenated records into a list of (pet_id, state dict)."""
+    if len(data) % RECORD_SIZE:
+        raise SnapshotError("snapshot data is not a whole number of records")
+    return [unpack_state(data, offset) for offset in range(0, len(data), RECORD_SIZE)]
+
+
+def session_key(session_id):
+    """Fixed-size key of a Flappy session id, as kept in score records."""
+    return hashlib.blake2b(str(session_id).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def pack_score(score, played_at, pet_id=DEFAULT_PET_ID, session=None):
+    """Return the SCORE_RECORD_SIZE-byte record of one score.
+
+    `played_at` is POSIX seconds; `session` a session_key() or None.
+    """
+    session = bytes.fromhex(session) if session else b''
+    try:
+        body = _SCORE_BODY.pack(SCORE_MAGIC, FORMAT_VERSION, pet_id, score, played_at, session)
+    except struct.error as exc:
+        raise SnapshotError("score out of range for a snapshot: %s" % exc)
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def unpack_score(data, offset=0):
+    """Decode a score record into (score, played_at, pet_id, session key or None).
+
+    Raises SnapshotError like unpack_state().
+    """
+    fields = _check(data, offset, _SCORE_BODY, SCORE_MAGIC)
+    session = fields[5].hex() if any(fields[5]) else None
+    return fields[3], fields[4], fields[2], session
+
+
+def save_scores(path, scores):
+    """Replace the scores at path with (score, played_at, pet_id, session key) tuples."""
+    _write(path, b''.join(pack_score(*score) for score in scores))
+
+
+def append_score(path, score, played_at, pet_id=DEFAULT_PET_ID, session=None):
+    """Add one score record to the end of the scores at path."""
+    record = pack_score(score, played_at, pet_id, session)
+    if _local_storage() is not None:
+        # localStorage has no append; the item is rewritten
+        _write(path, _read(path) + record)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'ab') as f:
+        f.write(record)
+
+
+def load_scores(path):
+    """Scores stored at path as save_scores() tuples, in order; [] if none."""
+    data = _read(path)
+    if len(data) % SCORE_RECORD_SIZE:
+        raise SnapshotError("scores %s are not a whole number of records" % path)
+    return [unpack_score(data, offset) for offset in range(0, len(data), SCORE_RECORD_SIZE)]
+
+
+def _local_storage():
+    # pygbag exposes the browser's window through the platform module
+    if sys.platform != 'emscripten':
+        return None
+    try:
+        import platform
+        return platform.window.localStorage
+    except Exception:
+        return None
+
+
+def _read(path):
+    storage = _local_storage()
+    if storage is not None:
+        text = storage.getItem(STORAGE_PREFIX + path)
+        return base64.b64decode(text) if text else b''
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b''
+
+
+def _write(path, data):
+    storage = _local_storage()
+    if storage is not None:
+        storage.setItem(STORAGE_PREFIX + path, base64.b64encode(data).decode('ascii'))
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # write then rename, so a crash never leaves a half-written file
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def set_aside(path):
+    """Move the data at path to path + '.corrupt' and return that path.
+
+    Used for records that fail to load, so they are kept for recovery
+    instead of being overwritten by the next save. An older '.corrupt'
+    copy is replaced.
+    """
+    aside = path + '.corrupt'
+    storage = _local_storage()
+    if storage is not None:
+        text = storage.getItem(STORAGE_PREFIX + path)
+        if text:
+            storage.setItem(STORAGE_PREFIX + aside, text)
+        storage.removeItem(STORAGE_PREFIX + path)
+        return aside
+    try:
+        os.replace(path, aside)
+    except FileNotFoundError:
+        pass
+    return aside
+
+
+def _records(path):
+    """{pet_id: record bytes} currently stored at path."""
+    data = _read(path)
+    if len(data) % RECORD_SIZE:
+        raise SnapshotError("snapshot %s is not a whole number of records" % path)
+    return {struct.unpack_from('<I', data, offset + 6)[0]: data[offset:offset + RECORD_SIZE]
+            for offset in range(0, len(data), RECORD_SIZE)}
+
+
+def save_states(path, changes):
+    """Save many pets at once: `changes` is an iterable of (pet_id, action, state).
+
+    A state's 'saved_at' is kept if it has one, as in db.py. Returns the
+    number of pets written.
+    """
+    records = _records(path)
+    saved_at = datetime.now().isoformat()
+    written = 0
+    for pet_id, _action, state in changes:
+        records[pet_id] = pack_state(state, pet_id, state.get('saved_at') or saved_at)
+        written += 1
+    _write(path, b''.join(records[pet_id] for pet_id in sorted(records)))
+    return written
+
+
+def save_state(path, mango_state, action='save', pet_id=DEFAULT_PET_ID):
+    """Save one pet's state dict into the snapshot at path."""
+    save_states(path, [(pet_id, action, mango_state)])
+
+
+def load_states(path, pet_ids):
+    """Load many pets at once: {pet_id: state dict or None}."""
+    records = _records(path)
+    states = {}
+    for pet_id in pet_ids:
+        record = records.get(pet_id)
+        states[pet_id] = unpack_state(record)[1] if record else None
+    return states
+
+
+def load_state(path, pet_id=DEFAULT_PET_ID):
+    """Load one pet's state from the snapshot at path, return dict or None."""
+    return load_states(path, [pet_id])[pet_id]
+
+
+def default_backend():
+    """Name of the storage backend that suits this platform.
+
+    'snapshot' in the browser build, where sqlite3 and file writes are slow
+    or missing; 'sqlite' everywhere else.
+    """
+    if sys.platform == 'emscripten':
+        return 'snapshot'
+    try:
+        import sqlite3
+    except ImportError:
+        return 'snapshot'
+    return 'sqlite'
+
+
+def select_backend(name=None):
+    """Return the module implementing backend `name` (default: default_backend()).
+
+    Both modules provide save_state/load_state and save_states/load_states
+    with the same signatures.
+    """
+    name = name or default_backend()
+    if name == 'snapshot':
+        return sys.modules[__name__]
+    if name == 'sqlite':
+        import db
+        return db
+    raise ValueError("unknown storage backend %r" % name)
@@ -0,0 +1,289 @@
+"""Storage backends for pet state and Flappy scores.
+
+The game talks to one StateStore, chosen when it is constructed; there
+are three implementations:
+
+- SQLiteStore: the shared WAL connections and event log of db.py.
+- MemoryStore: plain Python containers, nothing touches the disk. Used by
+  tests and benchmarks.
+- SnapshotStore: pet state and scores as binary records (snapshot.py),
+  for builds where sqlite3 is slow or missing.
+
+open_store() builds the backend for a path by name ('sqlite', 'memory' or
+'snapshot'); the default is snapshot.default_backend() for the platform.
+Every store also answers the queries Leaderboard needs, so the leaderboard
+works on any backend.
+"""
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+import snapshot
+
+DEFAULT_PET_ID = snapshot.DEFAULT_PET_ID
+
+
+def _played_at(seconds):
+    """played_at text (UTC, as SQLite's CURRENT_TIMESTAMP) for POSIX seconds."""
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class StateStore(ABC):
+    """Interface of a storage backend.
+
+    States are dicts with the stats, 'age' and 'last_updated'; loaded
+    states also carry 'saved_at'. A saved state may bring its own
+    'saved_at' (the game stamps it from its clock); otherwise the current
+    time is used. `action` names what changed the state and is kept by
+    backends that record history.
+    """
+
+    backend = None
+
+    def __init__(self, path):
+        self.path = path
+
+    def init(self):
+        """Create whatever the backend needs before first use."""
+
+    def save_state(self, mango_state, action='save', pet_id=DEFAULT_PET_ID):
+        self.save_states([(pet_id, action, mango_state)])
+
+    def load_state(self, pet_id=DEFAULT_PET_ID):
+        """Return the pet's latest state dict, or None if it was never saved."""
+        return self.load_states([pet_id])[pet_id]
+
+    @abstractmethod
+    def save_states(self, changes):
+        """Save an iterable of (pet_id, action, state dict) together."""
+
+    @abstractmethod
+    def load_states(self, pet_ids):
+        """Return {pet_id: state dict or None}."""
+
+    @abstractmethod
+    def save_score(self, score, pet_id=DEFAULT_PET_ID):
+        """Store a score played now."""
+
+    @abstractmethod
+    def record_flappy_session(self, session, pet_id=DEFAULT_PET_ID):
+        """Store a FlappySession once; True if it was new."""
+
+    @abstractmethod
+    def get_high_score(self, pet_id=None):
+        """Best score of every pet, or of `pet_id`; 0 if none."""
+
+    @abstractmethod
+    def top_scores(self, limit, pet_id=DEFAULT_PET_ID):
+        """The pet's best `limit` scores as (score, played_at), best first.
+
+        Ties are listed in the order they were stored.
+        """
+
+    @abstractmethod
+    def score_counts(self, pet_id=DEFAULT_PET_ID):
+        """(score, games) for every distinct score of the pet."""
+
+    @abstractmethod
+    def score_rollup(self, period, bucket, pet_id=DEFAULT_PET_ID):
+        """The pet's (best, games, total) for a leaderboard window bucket, or None."""
+
+    def writer(self, pet_id=DEFAULT_PET_ID, interval=0.5):
+        """Return a write-behind writer for the pet, or None to save synchronously."""
+        return None
+
+    def close(self):
+        """Release files and connections."""
+
+
+class SQLiteStore(StateStore):
+    """State and scores in SQLite through db.py's pooled connections.
+
+    db (and with it sqlite3) is imported only when a SQLiteStore is made,
+    so the other backends work on builds without sqlite3.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path):
+        super().__init__(path)
+        import db
+        self._db = db
+
+    def init(self):
+        self._db.init_database(self.path)
+
+    def save_state(self, mango_state, action='save', pet_id=DEFAULT_PET_ID):
+        self._db.save_state(self.path, mango_state, action, pet_id)
+
+    def load_state(self, pet_id=DEFAULT_PET_ID):
+        return self._db.load_state(self.path, pet_id)
+
+    def save_states(self, changes):
+        return self._db.save_states(self.path, changes)
+
+    def load_states(self, pet_ids):
+        return self._db.load_states(self.path, pet_ids)
+
+    def save_score(self, score, pet_id=DEFAULT_PET_ID):
+        self._db.save_score(self.path, score, pet_id)
+
+    def record_flappy_session(self, session, pet_id=DEFAULT_PET_ID):
+        return self._db.record_flappy_session(self.path, session, pet_id)
+
+    def get_high_score(self, pet_id=None):
+        return self._db.get_high_score(self.path, pet_id)
+
+    def top_scores(self, limit, pet_id=DEFAULT_PET_ID):
+        return self._db.top_scores(self.path, limit, pet_id)
+
+    def score_counts(self, pet_id=DEFAULT_PET_ID):
+        return self._db.score_counts(self.path, pet_id)
+
+    def score_rollup(self, period, bucket, pet_id=DEFAULT_PET_ID):
+        return self._db.score_rollup(self.path, period, bucket, pet_id)
+
+    def writer(self, pet_id=DEFAULT_PET_ID, interval=0.5):
+        return self._db.StateWriter(self.path, interval=interval, pet_id=pet_id)
+
+    def close(self):
+        self._db.close_connection(self.path)
+
+
+class MemoryStore(StateStore):
+    """State and scores in memory only; `path` is just a label."""
+
+    backend = 'memory'
+
+    def __init__(self, path=':memory:'):
+        super().__init__(path)
+        self._states = {}
+        # (score, played_at UTC, pet_id) in insertion order
+        self._scores = []
+        self._sessions = set()
+
+    def save_states(self, changes):
+        saved_at = datetime.now().isoformat()
+        written = 0
+        for pet_id, _action, state in changes:
+            self._states[pet_id] = dict(state, saved_at=state.get('saved_at') or saved_at)
+            written += 1
+        return written
+
+    def load_states(self, pet_ids):
+        return {pet_id: dict(self._states[pet_id]) if pet_id in self._states else None
+                for pet_id in pet_ids}
+
+    def save_score(self, score, pet_id=DEFAULT_PET_ID):
+        self._scores.append((score, _played_at(time.time()), pet_id))
+
+    def record_flappy_session(self, session, pet_id=DEFAULT_PET_ID):
+        if session.session_id in self._sessions:
+            return False
+        self._sessions.add(session.session_id)
+        self._scores.append((session.score, _played_at(session.ended_at), pet_id))
+        return True
+
+    def get_high_score(self, pet_id=None):
+        return max((score for score, _, pet in self._scores if pet_id is None or pet == pet_id),
+                   default=0)
+
+    def top_scores(self, limit, pet_id=DEFAULT_PET_ID):
+        # best first, ties in the order they were stored
+        ranked = sorted((item for item in enumerate(self._scores) if item[1][2] == pet_id),
+                        key=lambda item: (-item[1][0], item[0]))
+        return [(score, played_at) for _, (score, played_at, _) in ranked[:limit]]
+
+    def score_counts(self, pet_id=DEFAULT_PET_ID):
+        counts = {}
+        for score, _, pet in self._scores:
+            if pet == pet_id:
+                counts[score] = counts.get(score, 0) + 1
+        return sorted(counts.items())
+
+    def score_rollup(self, period, bucket, pet_id=DEFAULT_PET_ID):
+        from leaderboard import window_buckets
+        scores = [score for score, played_at, pet in self._scores
+                  if pet == pet_id
+                  and window_buckets(datetime.strptime(played_at, '%Y-%m-%d %H:%M:%S'))[period] == bucket]
+        if not scores:
+            return None
+        return max(scores), len(scores), sum(scores)
+
+
+class SnapshotStore(MemoryStore):
+    """Pet state and scores as binary snapshot records.
+
+    States are written to `path` with its extension replaced by '.snap'
+    and scores to '.scores' (in localStorage under those names in the
+    browser build), so a SQLite database at `path` is never overwritten.
+    Scores are loaded by init() and answered from memory like
+    MemoryStore; each new score is appended to the scores file. A scores
+    file that fails to load is moved aside (snapshot.set_aside()) rather
+    than overwritten, and init() then raises the SnapshotError.
+    """
+
+    backend = 'snapshot'
+
+    def __init__(self, path):
+        super().__init__(path)
+        base = os.path.splitext(path)[0]
+        self.snapshot_path = base + '.snap'
+        self.scores_path = base + '.scores'
+
+    def init(self):
+        try:
+            records = snapshot.load_scores(self.scores_path)
+        except snapshot.SnapshotError:
+            # keep the damaged scores for recovery; new ones start a fresh file
+            snapshot.set_aside(self.scores_path)
+            self._scores, self._sessions = [], set()
+            raise
+        self._scores = [(score, _played_at(played_at), pet_id)
+                        for score, played_at, pet_id, _ in records]
+        self._sessions = {key for *_, key in records if key}
+
+    def _add_score(self, score, played_at, pet_id, session=None):
+        snapshot.append_score(self.scores_path, score, played_at, pet_id, session)
+        self._scores.append((score, _played_at(played_at), pet_id))
+
+    def save_score(self, score, pet_id=DEFAULT_PET_ID):
+        self._add_score(score, time.time(), pet_id)
+
+    def record_flappy_session(self, session, pet_id=DEFAULT_PET_ID):
+        key = snapshot.session_key(session.session_id)
+        if key in self._sessions:
+            return False
+        self._sessions.add(key)
+        self._add_score(session.score, session.ended_at, pet_id, key)
+        return True
+
+    def save_state(self, mango_state, action='save', pet_id=DEFAULT_PET_ID):
+        snapshot.save_state(self.snapshot_path, mango_state, action, pet_id)
+
+    def load_state(self, pet_id=DEFAULT_PET_ID):
+        return snapshot.load_state(self.snapshot_path, pet_id)
+
+    def save_states(self, changes):
+        return snapshot.save_states(self.snapshot_path, changes)
+
+    def load_states(self, pet_ids):
+        return snapshot.load_states(self.snapshot_path, pet_ids)
+
+
+BACKENDS = {
+    'sqlite': SQLiteStore,
+    'memory': MemoryStore,
+    'snapshot': SnapshotStore,
+}
+
+
+def open_store(path, backend=None):
+    """Return a StateStore of kind `backend` for path (default: per platform)."""
+    backend = backend or snapshot.default_backend()
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError("unknown storage backend %r" % backend)
+    return cls(path)
@@ -18,6 +18,15 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from project import MangoTamagotchi, GameState
 
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a not yet created database in a fresh directory, closed afterwards."""
+    import db
+    path = str(tmp_path / "mango.db")
+    yield path
+    db.close_connection(path)
+
+
 class TestMangoTamagotchi:
     """Test class for MangoTamagotchi functionality."""
     
@@ -71,8 +80,9 @@ class TestMangoTamagotchi:
              patch('pygame.mouse.get_pos', return_value=(0, 0)), \
              patch('pygame.mouse.get_pressed', return_value=(False, False, False)):
             
-            game = MangoTamagotchi()
-            game.db_path = temp_db
+            game = MangoTamagotchi(db_path=temp_db)
+            # write the initial state before a test touches the database
+            game.flush_state()
             game.screen = MagicMock()
             game.clock = MagicMock()
             game.font = MagicMock()
@@ -348,7 +358,33 @@ class TestMangoTamagotchi:
         """Test getting high score from empty database."""
         high_score = mango_game.get_high_score()
         assert high_score == 0
-    
+
+    def test_flappy_session_recorded_once(self, mango_game):
+        """A Flappy session is stored and rewarded only once."""
+        from flappy_sim import FlappySession
+        mango_game.mango_state['happiness'] = 50
+        session = FlappySession(score=4, duration=12.5, flaps=30, obstacles_passed=4)
+
+        assert mango_game.record_flappy_session(session) is True
+        assert mango_game.record_flappy_session(session) is False
+
+        conn = sqlite3.connect(mango_game.db_path)
+        rows = conn.execute("SELECT score, duration, flaps, obstacles_passed FROM scores").fetchall()
+        conn.close()
+        assert rows == [(4, 12.5, 30, 4)]
+        assert mango_game.mango_state['happiness'] == 58  # 50 + 4 * 2, once
+        assert mango_game.high_score == 4
+        assert mango_game.get_leaderboard().games('all') == 1
+
+    def test_zero_score_flappy_session_not_recorded(self, mango_game):
+        """Runs that scored nothing leave the scores and leaderboard alone."""
+        from flappy_sim import FlappySession
+        session = FlappySession(score=0, duration=1.5, flaps=2, obstacles_passed=0)
+
+        assert mango_game.record_flappy_session(session) is False
+        assert mango_game.get_high_score() == 0
+        assert mango_game.get_leaderboard().games('all') == 0
+
     def test_stat_constraints(self, mango_game):
         """Test that stats are properly constrained between 0 and 100."""
         # Test feeding at max hunger - should return False since can't increase
@@ -399,6 +435,168 @@ class TestMangoTamagotchi:
         # Health should have decreased
         assert mango_game.mango_state['health'] < initial_health
     
+    def test_load_state_catches_up_offline_time(self, mango_game):
+        """Loading applies the decay and aging missed while the game was closed."""
+        mango_game.mango_state.update({'hunger': 50, 'happiness': 50, 'cleanliness': 50,
+                                       'energy': 50, 'health': 100, 'age': 2})
+        mango_game._save_state_now('init')
+        week_ago = (datetime.now() - timedelta(days=7, seconds=20)).isoformat()
+        conn = sqlite3.connect(mango_game.db_path)
+        conn.execute("UPDATE state_events SET created_at = ?, last_updated = ?", (week_ago, week_ago))
+        conn.commit()
+        conn.close()
+
+        loaded = mango_game.load_state()
+
+        assert loaded['hunger'] == 0 and loaded['energy'] == 0
+        assert loaded['health'] == 0
+        assert loaded['age'] == 9
+        assert mango_game.is_sick
+        # the catch-up is saved, so loading again changes nothing
+        assert mango_game.load_state() == loaded
+
+    def test_memory_store_backend(self, mango_game):
+        """The game runs entirely on an in-memory store."""
+        from store import MemoryStore
+        from flappy_sim import FlappySession
+        mango_game.set_store(MemoryStore())
+        mango_game.mango_state['hunger'] = 40
+        mango_game.feed_mango()
+
+        assert mango_game.load_state()['hunger'] == 65
+        session = FlappySession(score=9, duration=12.0, flaps=20, obstacles_passed=9)
+        assert mango_game.record_flappy_session(session)
+        assert not mango_game.record_flappy_session(session)
+        assert mango_game.get_high_score() == 9
+        assert mango_game.get_leaderboard().best('day') == 9
+
+    def test_mango_state_is_a_pet_state(self, mango_game):
+        """Assigned dicts become PetStates, which clamp the action methods' writes."""
+        from pet_state import PetState
+        assert isinstance(mango_game.mango_state, PetState)
+        mango_game.mango_state = {'hunger': 95, 'happiness': 70, 'cleanliness': 60,
+                                  'energy': 90, 'health': 100, 'age': 0}
+        assert isinstance(mango_game.mango_state, PetState)
+        assert mango_game.feed_mango()
+        assert mango_game.mango_state.hunger == 100
+
+    def test_derived_state_recomputes_only_on_change(self, mango_game):
+        """Idle refreshes are no-ops; stat and sickness changes notify subscribers."""
+        from pet_state import PetState
+        mango_game.mango_state = PetState.default()
+        mango_game.is_sick = False
+        derived = mango_game.derived
+        events = []
+        derived.subscribe(lambda d, changed: events.append(changed))
+        derived.refresh()
+        events.clear()
+
+        assert derived.refresh() == frozenset()
+        mango_game.mango_state['hunger'] = mango_game.mango_state['hunger']
+        assert derived.refresh() == frozenset() and events == []
+
+        mango_game.mango_state.cleanliness = 10
+        assert mango_game.get_mango_mood() == 'dirty'
+        assert events == [{'stats', 'mood', 'sprite'}]
+
+        mango_game.is_sick = True
+        assert mango_game.get_mango_mood() == 'sick'
+        assert derived.sprite == 'idle'
+
+        mango_game.mango_state = dict(mango_game.mango_state, health=20)
+        assert 'low_health' in derived.refresh() and derived.low_health
+
+    def test_scheduler_drives_timed_updates(self, mango_game):
+        """Decay runs from a scheduler timer; HUD toasts expire in real time."""
+        mango_game.mango_state['hunger'] = 50
+        mango_game.show_message("Hello", 2.0)
+        assert len(mango_game.hud_messages) == 1
+
+        mango_game.scheduler.tick(time.monotonic() + 1.0)
+        assert mango_game.mango_state['hunger'] == 50
+        mango_game.scheduler.tick(time.monotonic() + 31.0)
+
+        assert mango_game.mango_state['hunger'] == 49
+        # scheduler time does not expire toasts; the HUD's own clock does
+        assert len(mango_game.hud_messages) == 1
+        mango_game.hud_messages.expire(time.monotonic() + 2.5)
+        assert len(mango_game.hud_messages) == 0
+
+    def test_ui_timers_stay_on_real_time(self, mango_game):
+        """Only a WarpClock can be advanced; UI timers never follow it."""
+        with pytest.raises(TypeError):
+            mango_game.advance_time(60)
+        assert mango_game.ui_scheduler.clock is time.monotonic
+        assert mango_game.ui_scheduler is not mango_game.scheduler
+
+    def test_warp_clock_fast_forwards_a_day(self):
+        """A day of decay and aging runs headlessly in simulated time."""
+        from clock import WarpClock
+        from store import MemoryStore
+        with patch('pygame.display.set_mode'), \
+             patch('pygame.display.set_caption'), \
+             patch('pygame.font.Font'):
+            game = MangoTamagotchi(store=MemoryStore(), time_source=WarpClock(factor=10000))
+        game.api_handler.get_weather_mood_effect = lambda: 0
+        game.mango_state.update({'hunger': 100, 'happiness': 100, 'cleanliness': 100,
+                                 'energy': 100, 'health': 100, 'age': 0})
+
+        started = time.monotonic()
+        with patch('random.random', return_value=0.9):  # no random events
+            game.advance_time(24 * 3600 + 60)
+
+        assert time.monotonic() - started < 1
+        assert game.mango_state['hunger'] == 0
+        assert game.mango_state['age'] == 1
+        assert game.mango_state['health'] == 0
+        assert game.is_sick
+
+    def test_warp_clock_jumps_in_closed_form(self):
+        """A warped week is one jump: decay, event rolls and timers line up."""
+        from clock import WarpClock
+        from store import MemoryStore
+        with patch('pygame.display.set_mode'), \
+             patch('pygame.display.set_caption'), \
+             patch('pygame.font.Font'):
+            game = MangoTamagotchi(store=MemoryStore(), time_source=WarpClock())
+        game.mango_state.update({'hunger': 100, 'happiness': 100, 'cleanliness': 100,
+                                 'energy': 100, 'health': 100, 'age': 0})
+        rolls = []
+        game._random_event_tick = lambda: rolls.append(1)
+
+        game.advance_time(45)
+        assert game.mango_state['hunger'] == 99 and not rolls
+        game.advance_time(7 * 24 * 3600)
+
+        assert game.mango_state['age'] == 7
+        assert len(rolls) == (7 * 24 * 3600 + 45) // 120
+        # the next decay tick is due 30 s after the last whole one, not now
+        assert game.scheduler.tick() == 0
+        game.flush_state()
+        saved = game.store.load_state()
+        assert saved['saved_at'] == game.time_source.now().isoformat()
+
+    def test_saves_use_the_pet_clock(self):
+        """saved_at and last_updated come from one clock, so catch-up is consistent."""
+        from clock import WarpClock
+        from store import MemoryStore
+        start = datetime(2030, 1, 1, 12, 0).timestamp()
+        store = MemoryStore()
+        with patch('pygame.display.set_mode'), \
+             patch('pygame.display.set_caption'), \
+             patch('pygame.font.Font'):
+            game = MangoTamagotchi(store=store, time_source=WarpClock(start=start))
+            game.mango_state.update({'hunger': 80, 'happiness': 80, 'cleanliness': 80,
+                                     'energy': 80, 'health': 100})
+            game.save_state('feed')
+            game.flush_state()
+            assert store.load_state()['saved_at'] == '2030-01-01T12:00:00'
+
+            # reopened an hour later on the same clock: exactly 120 ticks
+            game = MangoTamagotchi(store=store, time_source=WarpClock(start=start + 3600))
+        assert game.mango_state['hunger'] == 0
+        assert game.mango_state['age'] == 0
+
     def test_database_constraints(self, mango_game):
         """Test database constraints for stat values."""
         # Test that database rejects invalid stat values
@@ -446,5 +644,1012 @@ class TestMangoTamagotchi:
             mango_game.is_night = mango_game.current_hour < 6 or mango_game.current_hour > 18
             assert mango_game.is_night is False
 
+class TestTextCache:
+    """Tests for the shared LRU text-surface cache."""
+
+    def test_render_is_cached(self):
+        """Rendering the same string twice only calls Font.render once."""
+        from ui_helpers import TextCache
+        cache = TextCache(maxsize=4)
+        font = MagicMock()
+
+        first = cache.render(font, "Mango Stats", True, (255, 255, 255))
+        second = cache.render(font, "Mango Stats", True, (255, 255, 255))
+
+        assert first is second
+        assert font.render.call_count == 1
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted when the cache is full."""
+        from ui_helpers import TextCache
+        cache = TextCache(maxsize=2)
+        font = MagicMock()
+
+        cache.render(font, "a", True, (0, 0, 0))
+        cache.render(font, "b", True, (0, 0, 0))
+        cache.render(font, "a", True, (0, 0, 0))  # refresh "a"
+        cache.render(font, "c", True, (0, 0, 0))  # evicts "b"
+
+        assert len(cache) == 2
+        cache.render(font, "a", True, (0, 0, 0))
+        assert cache.misses == 3
+        cache.render(font, "b", True, (0, 0, 0))
+        assert cache.misses == 4
+
+
+class TestGradientCache:
+    """Tests for the cached day/night background gradients."""
+
+    def test_gradient_built_once_per_size_and_time_of_day(self):
+        """Each (resolution, is_night) gradient is built once; a resize rebuilds."""
+        import pygame
+        import ui_helpers
+        from store import MemoryStore
+        with patch('pygame.display.set_mode'), \
+             patch('pygame.display.set_caption'), \
+             patch('pygame.font.Font'):
+            game = MangoTamagotchi(store=MemoryStore())
+        game.screen = pygame.Surface((200, 150))
+        game.is_night = False
+
+        with patch('ui_helpers.build_gradient_surface',
+                   wraps=ui_helpers.build_gradient_surface) as build:
+            game.draw_gradient_background()
+            day = game._gradient_cache[False]
+            game.draw_gradient_background()
+            assert build.call_count == 1
+
+            game.is_night = True
+            game.draw_gradient_background()
+            game.is_night = False
+            game.draw_gradient_background()
+            assert build.call_count == 2
+            assert game._gradient_cache[False] is day
+
+            game.screen = pygame.Surface((300, 150))
+            game.draw_gradient_background()
+            assert build.call_count == 3
+            assert game._gradient_cache[False].get_size() == (300, 150)
+            assert True not in game._gradient_cache
+
+
+class TestSpriteVariantCache:
+    """Tests for the budgeted cache of scaled sprite variants."""
+
+    def test_lru_eviction_within_budget(self):
+        """Least recently used variants go first once the byte budget is exceeded."""
+        import pygame
+        from assets import SpriteVariantCache
+        source = pygame.Surface((8, 8), pygame.SRCALPHA)
+        # each 10x10 32-bit variant is 400 bytes; room for two
+        cache = SpriteVariantCache(budget_bytes=900)
+
+        a = cache.get('bird', source, (10, 10))
+        cache.get('bird', source, (10, 10), flip=(True, False))
+        assert cache.get('bird', source, (10, 10)) is a  # refresh a
+        cache.get('tree', source, (10, 10))  # evicts the flipped bird
+
+        assert len(cache) == 2 and cache.used_bytes == 800
+        assert cache.get('bird', source, (10, 10)) is a
+        misses = cache.misses
+        cache.get('bird', source, (10, 10), flip=(True, False))
+        assert cache.misses == misses + 1
+
+    def test_stale_source_is_rebuilt(self):
+        """A variant built from a replaced source surface is not served again."""
+        import pygame
+        from assets import SpriteVariantCache
+        cache = SpriteVariantCache()
+        old = pygame.Surface((8, 8))
+        variant = cache.get('bird', old, (16, 16))
+
+        new = pygame.Surface((8, 8))
+        rebuilt = cache.get('bird', new, (16, 16))
+        assert rebuilt is not variant
+        assert len(cache) == 1 and cache.used_bytes == 16 * 16 * rebuilt.get_bytesize()
+        assert cache.get('bird', new, (16, 16)) is rebuilt
+
+
+class TestPresentScaling:
+    """Tests for the preallocated scale target used by present()."""
+
+    def test_target_reused_until_window_size_changes(self):
+        """One target per display size; integer multiples use a plain scale."""
+        import pygame
+        from store import MemoryStore
+        with patch('pygame.display.set_mode'), \
+             patch('pygame.display.set_caption'), \
+             patch('pygame.font.Font'):
+            game = MangoTamagotchi(store=MemoryStore())
+        game.screen = pygame.Surface((100, 80))
+        game.screen.fill((10, 20, 30))
+        game.screen.set_at((0, 0), (200, 0, 0))
+
+        assert game._scaled_logical_frame((100, 80)) is game.screen
+        with patch('pygame.transform.scale', wraps=pygame.transform.scale) as scale, \
+             patch('pygame.transform.smoothscale', wraps=pygame.transform.smoothscale) as smooth:
+            doubled = game._scaled_logical_frame((200, 160))
+            assert game._scaled_logical_frame((200, 160)) is doubled
+            assert scale.call_count == 2 and smooth.call_count == 0
+            # nearest-neighbour: the corner pixel covers a whole 2x2 block
+            assert doubled.get_at((1, 1))[:3] == (200, 0, 0)
+
+            resized = game._scaled_logical_frame((250, 200))
+            assert resized is not doubled and resized.get_size() == (250, 200)
+            assert smooth.call_count == 1
+            assert game._scaled_logical_frame((250, 200)) is resized
+
+
+class TestHubStaticLayer:
+    """Tests for the cached static layer of the hub screen."""
+
+    def test_layer_rebuilt_only_when_inputs_change(self):
+        """Day/night, size and a replaced background rebuild; idle frames blit."""
+        import pygame
+        import hub_ui
+        game = MagicMock()
+        game.screen = pygame.Surface((200, 150))
+        game.hub_background = pygame.Surface((200, 150))
+        game.is_night = False
+        game._hub_static_layer = None
+        game._hub_static_layer_key = None
+
+        def draw():
+            hub_ui._blit_hub_static_layer(game, None, 0, 0, 100, 100, 200)
+
+        with patch('hub_ui._draw_hub_static_layer') as build:
+            draw()
+            draw()
+            assert build.call_count == 1
+            # the key keeps the background itself, so its id cannot be reused
+            assert game._hub_static_layer_key[0] is game.hub_background
+
+            game.is_night = True
+            draw()
+            assert build.call_count == 2
+
+            game.screen = pygame.Surface((300, 150))
+            draw()
+            assert build.call_count == 3
+
+            game.hub_background = pygame.Surface((200, 150))
+            draw()
+            draw()
+            assert build.call_count == 4
+
+
+class TestFlappySim:
+    """Tests for the headless Flappy Mango engine."""
+
+    def test_falls_to_floor_without_flapping(self):
+        """With no input the bird drops and crashes before any obstacle arrives."""
+        from flappy_sim import FlappySim
+        sim = FlappySim(seed=1)
+
+        while not sim.game_over:
+            sim.step()
+
+        assert sim.bird_y >= sim.height - 60
+        assert sim.score == 0
+        assert sim.steps < sim.spawn_interval
+
+    def test_same_seed_same_run(self):
+        """Identical seeds and inputs produce identical runs."""
+        from flappy_sim import FlappySim
+
+        def run(seed):
+            sim = FlappySim(seed=seed)
+            while not sim.game_over and sim.steps < 5000:
+                sim.step(flap=sim.bird_y > 380 and sim.velocity > 0)
+            return sim.steps, sim.score, sim.flaps
+
+        assert run(7) == run(7)
+
+    def test_collision_with_column(self):
+        """A bird inside a column's box collides; one inside the gap does not."""
+        from flappy_sim import FlappySim
+        sim = FlappySim(seed=1)
+        sim.add_obstacle(140, 350)
+
+        sim.bird_y = 350
+        assert not sim.collides()
+        sim.bird_y = 200
+        assert sim.collides()
+        sim.bird_y = 500
+        assert sim.collides()
+
+
+class TestBatchFlappySim:
+    """Tests for the vectorised batch simulator."""
+
+    def test_matches_scalar_sim(self):
+        """Each batch run follows exactly the same rules as FlappySim."""
+        np = pytest.importorskip("numpy")
+        from flappy_batch import BatchFlappySim
+        from flappy_sim import FlappySim
+
+        class FixedGaps:
+            def integers(self, low, high, size):
+                return np.full(size, 300)
+
+            def randint(self, low, high):
+                return 300
+
+        offsets = np.array([-80, -20, 0, 30, 90])
+        batch = BatchFlappySim(len(offsets), rng=FixedGaps())
+        batch.run(lambda s: (s.bird_y > 300 + offsets) & (s.velocity > 0), max_steps=2000)
+
+        for i, offset in enumerate(offsets):
+            sim = FlappySim(rng=FixedGaps())
+            while not sim.game_over and sim.steps < 2000:
+                sim.step(flap=sim.bird_y > 300 + offset and sim.velocity > 0)
+            assert sim.score == batch.score[i]
+            assert sim.steps == batch.steps_alive[i]
+            assert sim.game_over == (not batch.alive[i])
+
+    def test_per_run_gravity(self):
+        """Heavier gravity makes a run hit the floor sooner."""
+        np = pytest.importorskip("numpy")
+        from flappy_batch import BatchFlappySim
+
+        batch = BatchFlappySim(2, seed=1, gravity=np.array([0.75, 1.5]))
+        batch.run()
+
+        assert not batch.alive.any()
+        assert batch.steps_alive[1] < batch.steps_alive[0]
+
+
+
+class TestDatabase:
+    """Tests for the shared-connection helpers in db.py."""
+
+    def test_missing_directory_is_created(self, tmp_path):
+        """Opening a database in a directory that does not exist creates it."""
+        import db
+        path = str(tmp_path / "nested" / "mango.db")
+        db.init_database(path)
+        try:
+            assert os.path.exists(path)
+        finally:
+            db.close_connection(path)
+
+    def test_connection_is_shared_and_wal(self, db_path):
+        """One WAL-mode connection is reused for every call on a path."""
+        import db
+        db.init_database(db_path)
+
+        conn = db.get_connection(db_path)
+        assert db.get_connection(db_path) is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+
+    def test_action_history_uses_pet_action_index(self, db_path):
+        """state_history(action=...) is served by the (pet_id, action, id) index."""
+        import db
+        db.init_database(db_path)
+        conn = db.get_connection(db_path)
+        plan = ' '.join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN " + db._SQL_STATE_HISTORY_FOR_ACTION, (1, 'feed', 10)))
+        assert 'idx_state_events_pet_action' in plan
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_state_events_action' not in indexes
+
+    def test_scores_round_trip(self, db_path):
+        """Scores saved through db.py are visible to get_high_score."""
+        import db
+        db.init_database(db_path)
+        assert db.get_high_score(db_path) == 0
+
+        db.save_score(db_path, 7)
+        db.save_score(db_path, 3)
+        assert db.get_high_score(db_path) == 7
+
+        db.close_connection(db_path)
+        assert db.get_high_score(db_path) == 7
+
+    def test_state_writer_coalesces(self, db_path):
+        """A burst of submits is written once, with the newest values."""
+        import db
+        db.init_database(db_path)
+        writer = db.StateWriter(db_path, interval=60)
+        state = {'hunger': 10, 'happiness': 20, 'cleanliness': 30,
+                 'energy': 40, 'health': 50, 'age': 1}
+
+        for hunger in range(10, 60):
+            state['hunger'] = hunger
+            writer.submit(state)
+        assert writer.dirty
+        writer.flush()
+
+        assert writer.submitted == 50
+        assert writer.written == 1
+        assert db.load_state(db_path)['hunger'] == 59
+        writer.close()
+
+    def test_state_writer_flush_is_reentrant(self, db_path, monkeypatch):
+        """A flush from a signal handler during a write neither deadlocks nor loses state."""
+        import threading
+        import db
+        db.init_database(db_path)
+        writer = db.StateWriter(db_path, interval=60)
+        write = db.append_state_events
+
+        def interrupted(*args):
+            # what the SIGTERM handler does: flush, then exit
+            monkeypatch.setattr(db, 'append_state_events', write)
+            writer.flush()
+            raise SystemExit(143)
+
+        monkeypatch.setattr(db, 'append_state_events', interrupted)
+        writer.submit({'hunger': 33, 'happiness': 20, 'cleanliness': 30,
+                       'energy': 40, 'health': 50, 'age': 1})
+        outcome = []
+
+        def flush():
+            try:
+                writer.flush()
+            except SystemExit as exc:
+                outcome.append(exc.code)
+
+        thread = threading.Thread(target=flush, daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        if thread.is_alive():
+            # deadlocked: keep the exit-time flush from hanging too
+            db._writers.discard(writer)
+            pytest.fail("flush() deadlocked when re-entered")
+        assert outcome == [143]
+
+        # the interrupted changes were requeued
+        assert writer.dirty
+        writer.close()
+        assert db.load_state(db_path)['hunger'] == 33
+
+    def test_state_writer_background_write(self, db_path):
+        """Queued state reaches the database without an explicit flush."""
+        import db
+        db.init_database(db_path)
+        writer = db.StateWriter(db_path, interval=0.01)
+        writer.submit({'hunger': 11, 'happiness': 22, 'cleanliness': 33,
+                       'energy': 44, 'health': 55, 'age': 2})
+
+        deadline = time.time() + 5
+        while writer.written == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert writer.written == 1
+        assert db.load_state(db_path)['health'] == 55
+        writer.close()
+
+    def test_state_history_and_snapshots(self, db_path, monkeypatch):
+        """Saves append events; loads replay them over the latest snapshot."""
+        import db
+        monkeypatch.setattr(db, 'SNAPSHOT_EVERY', 3)
+        db.init_database(db_path)
+        state = {'hunger': 50, 'happiness': 50, 'cleanliness': 50,
+                 'energy': 50, 'health': 100, 'age': 0}
+        db.save_state(db_path, state, 'init')
+        for action, stat, value in (('feed', 'hunger', 75), ('decay', 'hunger', 74),
+                                    ('bathe', 'cleanliness', 80), ('play', 'energy', 35)):
+            state[stat] = value
+            db.save_state(db_path, state, action)
+        db.save_state(db_path, state, 'noop')  # nothing changed: no event
+
+        loaded = db.load_state(db_path)
+        assert {k: loaded[k] for k in state} == state
+
+        history = db.state_history(db_path)
+        assert [e['action'] for e in history] == ['play', 'bathe', 'decay', 'feed', 'init']
+        assert history[0]['energy'] == -15
+        assert [e['hunger'] for e in db.state_history(db_path, action='feed')] == [25]
+
+        conn = sqlite3.connect(db_path)
+        snapshots = conn.execute("SELECT hunger, event_id FROM mango_state").fetchall()
+        conn.close()
+        assert snapshots == [(74, 3)]  # one compacted snapshot after event 3
+
+    def test_pets_are_isolated(self, db_path):
+        """Each pet keeps its own state; batches load and save by id."""
+        import db
+        db.init_database(db_path)
+        second = db.create_pet(db_path, "Kiwi")
+        assert [name for _, name in db.list_pets(db_path)] == ["Mango", "Kiwi"]
+
+        base = {'hunger': 50, 'happiness': 50, 'cleanliness': 50,
+                'energy': 50, 'health': 100, 'age': 0}
+        db.save_states(db_path, [
+            (1, 'init', dict(base, hunger=10)),
+            (second, 'init', dict(base, hunger=90)),
+        ])
+        db.save_state(db_path, dict(base, hunger=95), 'feed', pet_id=second)
+
+        states = db.load_states(db_path, [1, second, 999])
+        assert states[1]['hunger'] == 10
+        assert states[second]['hunger'] == 95
+        assert states[999] is None
+        assert db.load_state(db_path)['hunger'] == 10
+        assert [e['action'] for e in db.state_history(db_path, pet_id=second)] == ['feed', 'init']
+
+
+class TestLeaderboard:
+    """Tests for the leaderboard rollups and in-memory view."""
+
+    def test_rank_best_and_top(self, db_path):
+        """Ranks, window bests and top-N follow recorded scores."""
+        import db
+        from leaderboard import Leaderboard
+        db.init_database(db_path)
+        for score in (5, 12, 7, 12):
+            db.save_score(db_path, score)
+
+        board = Leaderboard(db_path, top_n=3)
+        assert board.best('all') == 12
+        assert board.best('day') == 12
+        assert board.games('week') == 4
+        assert board.rank(12) == 1
+        assert board.rank(7) == 3
+        assert board.rank(100) == 1
+        assert [s for s, _ in board.top()] == [12, 12, 7]
+
+        db.save_score(db_path, 30)
+        board.record(30)
+        assert board.best('all') == 30
+        assert board.rank(12) == 2
+        assert [s for s, _ in board.top()] == [30, 12, 12]
+        # the in-memory view matches what the triggers stored
+        assert [s for s, _ in Leaderboard(db_path, top_n=3).top()] == [30, 12, 12]
+
+    def test_rollups_backfilled_for_old_database(self, db_path):
+        """A database from before the rollups gets them filled on open."""
+        import db
+        from leaderboard import Leaderboard
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "score INTEGER NOT NULL, played_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+        conn.executemany("INSERT INTO scores (score) VALUES (?)", [(3,), (9,), (4,)])
+        conn.commit()
+        conn.close()
+
+        board = Leaderboard(db_path)
+        assert board.best('all') == 9
+        assert board.games('all') == 3
+        assert board.rank(4) == 2
+
+    def test_pets_have_their_own_leaderboard(self, db_path):
+        """One pet's scores never show up in another pet's bests or ranks."""
+        import db
+        from leaderboard import Leaderboard
+        db.init_database(db_path)
+        second = db.create_pet(db_path, "Kiwi")
+        for score in (5, 8):
+            db.save_score(db_path, score)
+        db.save_score(db_path, 40, pet_id=second)
+
+        mango = Leaderboard(db_path)
+        kiwi = Leaderboard(db_path, pet_id=second)
+        assert mango.best('all') == 8 and mango.best('day') == 8
+        assert mango.games('week') == 2 and mango.rank(8) == 1
+        assert kiwi.best('all') == 40 and kiwi.games('all') == 1
+        assert [s for s, _ in kiwi.top()] == [40]
+
+    def test_ties_keep_stored_order(self):
+        """Equal scores are listed in the order they were stored, not by timestamp text."""
+        from leaderboard import Leaderboard
+        from store import MemoryStore
+        board = Leaderboard(MemoryStore(), top_n=3)
+        board.record(12, played_at='2026-01-02 00:00:00')
+        board.record(12, played_at='2026-01-01 00:00:00')
+        board.record(15, played_at='2026-01-03 00:00:00')
+        assert board.top() == [(15, '2026-01-03 00:00:00'),
+                               (12, '2026-01-02 00:00:00'),
+                               (12, '2026-01-01 00:00:00')]
+
+
+class TestDecay:
+    """Tests for the closed-form decay rules in decay.py."""
+
+    @staticmethod
+    def baseline_tick(state):
+        """One tick of the original update_stats(), without weather or events."""
+        state = dict(state)
+        state['hunger'] = max(0, state['hunger'] - 1)
+        state['happiness'] = max(0, state['happiness'] - 1)
+        state['cleanliness'] = max(0, state['cleanliness'] - 1)
+        state['energy'] = max(0, state['energy'] - 1)
+        if (state['hunger'] <= 10 or
+                state['cleanliness'] <= 10 or
+                state['energy'] <= 10):
+            state['health'] = max(0, state['health'] - 3)
+        return state
+
+    def test_matches_tick_by_tick(self):
+        """apply_decay(state, n) equals n ticks of the original update_stats loop."""
+        import random
+        from decay import apply_decay
+        rng = random.Random(3)
+        for _ in range(200):
+            state = {stat: rng.randint(0, 100) for stat in
+                     ('hunger', 'happiness', 'cleanliness', 'energy', 'health')}
+            state['age'] = 0
+            ticks = rng.randint(0, 150)
+            stepped = state
+            for _ in range(ticks):
+                stepped = self.baseline_tick(stepped)
+            assert apply_decay(state, ticks) == stepped
+
+    def test_catch_up_after_months(self):
+        """A long gap is applied at once, keeping partial ticks and days."""
+        from decay import catch_up
+        now = datetime(2026, 6, 1, 12, 0, 0)
+        saved = now - timedelta(days=90, seconds=45)
+        state = {'hunger': 80, 'happiness': 70, 'cleanliness': 60, 'energy': 90,
+                 'health': 100, 'age': 4, 'last_updated': (saved - timedelta(hours=20)).isoformat()}
+
+        caught_up, sick, leftover = catch_up(state, saved.isoformat(), now)
+
+        assert caught_up['hunger'] == caught_up['energy'] == caught_up['health'] == 0
+        assert caught_up['age'] == 94
+        assert caught_up['last_updated'] == (saved + timedelta(days=89, hours=4)).isoformat()
+        assert sick and leftover == 15
+        fresh = dict(state, last_updated=now.isoformat())
+        assert catch_up(fresh, now.isoformat(), now) == (fresh, False, 0.0)
+
+
+class TestFleet:
+    """Tests for the batch pet ticks in fleet.py."""
+
+    def test_matches_single_pet_rules(self, db_path, monkeypatch):
+        """Every pet ends where decay.apply_decay would take it, across chunks."""
+        pytest.importorskip("numpy")
+        import random
+        import db
+        import fleet
+        from decay import apply_decay
+        monkeypatch.setattr(db, 'SNAPSHOT_EVERY', 2)
+        db.init_database(db_path)
+        rng = random.Random(5)
+        pets = [1] + [db.create_pet(db_path, "pet%d" % i) for i in range(40)]
+        db.save_states(db_path, [
+            (pet, 'init', dict({stat: rng.randint(0, 100) for stat in db.STATE_FIELDS},
+                               last_updated='2026-01-01T00:00:00'))
+            for pet in pets
+        ])
+        before = db.load_states(db_path, pets)
+
+        report = fleet.tick_fleet(db_path, ticks=12, chunk_size=7, random_events=False)
+        after = db.load_states(db_path, pets)
+
+        assert report['pets'] == len(pets) and report['pets_per_second'] > 0
+        for pet in pets:
+            expected = apply_decay(before[pet], 12)
+            assert {k: after[pet][k] for k in db.STATE_FIELDS} == \
+                {k: expected[k] for k in db.STATE_FIELDS}
+            assert after[pet]['last_updated'] == '2026-01-01T00:00:00'
+        assert db.state_history(db_path, pet_id=pets[-1])[0]['action'] == 'fleet_tick'
+
+    def test_catch_up_after_fleet_tick(self, db_path):
+        """A fleet tick covers only its own ticks; catch_up adds the rest of the gap."""
+        pytest.importorskip("numpy")
+        import db
+        import fleet
+        from decay import DECAY_INTERVAL, catch_up
+        db.init_database(db_path)
+        week_ago = datetime.now() - timedelta(days=7)
+        state = {'hunger': 90, 'happiness': 90, 'cleanliness': 90, 'energy': 90,
+                 'health': 100, 'age': 0, 'last_updated': week_ago.isoformat()}
+        db.save_state(db_path, state, 'init')
+        with db.transaction(db_path) as conn:
+            conn.execute("UPDATE state_events SET created_at = ?", (week_ago.isoformat(),))
+
+        fleet.tick_fleet(db_path, ticks=1, random_events=False)
+        ticked = db.load_state(db_path)
+        assert ticked['saved_at'] == (week_ago + timedelta(seconds=DECAY_INTERVAL)).isoformat()
+
+        now = datetime.now()
+        expected, _, _ = catch_up(dict(state), week_ago.isoformat(), now)
+        caught_up, sick, _ = catch_up(ticked, ticked.pop('saved_at'), now)
+        assert caught_up == expected
+        assert caught_up['hunger'] == 0 and sick
+
+    def test_fleet_tick_never_stamps_the_future(self, db_path):
+        """A pet saved just now is stamped at the tick time, not ticks ahead of it."""
+        pytest.importorskip("numpy")
+        import db
+        import fleet
+        db.init_database(db_path)
+        state = {'hunger': 90, 'happiness': 90, 'cleanliness': 90, 'energy': 90,
+                 'health': 100, 'age': 0, 'last_updated': datetime.now().isoformat()}
+        db.save_state(db_path, state, 'init')
+
+        fleet.tick_fleet(db_path, ticks=10, random_events=False)
+        ticked = db.load_state(db_path)
+        assert ticked['hunger'] == 80
+        assert datetime.fromisoformat(ticked['saved_at']) <= datetime.now()
+
+    def test_random_events_only_lower_stats(self):
+        """Random sick/misbehaviour events never raise a stat or go below 0."""
+        np = pytest.importorskip("numpy")
+        import fleet
+        values = np.random.default_rng(0).integers(0, 101, size=(500, 6))
+        new, fell_sick = fleet.tick_values(values, ticks=40, rng=np.random.default_rng(1))
+
+        assert (new <= values).all() and (new >= 0).all()
+        assert fell_sick.any()
+
+
+class TestSnapshot:
+    """Tests for the binary snapshot format in snapshot.py."""
+
+    STATE = {'hunger': 80, 'happiness': 70, 'cleanliness': 60, 'energy': 90,
+             'health': 100, 'age': 3, 'last_updated': '2026-03-01T10:00:00.250000'}
+
+    def test_round_trip(self):
+        """A record is RECORD_SIZE bytes and decodes to the same state."""
+        import snapshot
+        data = snapshot.pack_state(self.STATE, pet_id=7)
+        assert len(data) == snapshot.RECORD_SIZE == 40
+
+        pet_id, state = snapshot.unpack_state(data)
+        assert pet_id == 7
+        assert {k: state[k] for k in self.STATE} == self.STATE
+
+        many = snapshot.unpack_states(snapshot.pack_states((i, self.STATE) for i in range(100)))
+        assert [pet_id for pet_id, _ in many] == list(range(100))
+
+    def test_corruption_is_detected(self):
+        """Flipped bits, truncation and unknown versions are rejected."""
+        import zlib
+        import snapshot
+        data = bytearray(snapshot.pack_state(self.STATE))
+        data[12] ^= 0x01
+        with pytest.raises(snapshot.SnapshotError):
+            snapshot.unpack_state(bytes(data))
+        with pytest.raises(snapshot.SnapshotError):
+            snapshot.unpack_state(snapshot.pack_state(self.STATE)[:-1])
+        # a well-formed record from a future format version
+        body = bytearray(snapshot.pack_state(self.STATE)[:-4])
+        body[4] = snapshot.FORMAT_VERSION + 1
+        future = bytes(body) + zlib.crc32(bytes(body)).to_bytes(4, 'little')
+        with pytest.raises(snapshot.SnapshotError, match="version"):
+            snapshot.unpack_state(future)
+        with pytest.raises(snapshot.SnapshotError):
+            snapshot.pack_state(dict(self.STATE, hunger=300))
+
+    def test_file_backend_is_drop_in(self, tmp_path):
+        """save_state/load_state keep one record per pet, like db.py."""
+        import snapshot
+        path = str(tmp_path / "mango.snap")
+        backend = snapshot.select_backend('snapshot')
+        assert backend.load_state(path) is None
+
+        backend.save_state(path, self.STATE, 'feed')
+        backend.save_state(path, dict(self.STATE, hunger=5), 'feed', pet_id=2)
+        backend.save_state(path, dict(self.STATE, hunger=10), 'decay', pet_id=2)
+
+        assert os.path.getsize(path) == 2 * snapshot.RECORD_SIZE
+        assert backend.load_state(path)['hunger'] == 80
+        assert backend.load_states(path, [2, 3]) == {2: backend.load_state(path, 2), 3: None}
+        assert backend.load_state(path, 2)['hunger'] == 10
+
+
+class TestStore:
+    """The same contract holds for every storage backend in store.py."""
+
+    @pytest.fixture(params=['memory', 'sqlite', 'snapshot'])
+    def store(self, request, tmp_path):
+        from store import open_store
+        store = open_store(str(tmp_path / "mango.db"), request.param)
+        store.init()
+        yield store
+        store.close()
+
+    def test_states_round_trip(self, store):
+        """Saved states load back with their aging clock and save time."""
+        state = {'hunger': 10, 'happiness': 20, 'cleanliness': 30, 'energy': 40,
+                 'health': 50, 'age': 6, 'last_updated': '2026-02-03T04:05:06'}
+        assert store.load_state() is None
+
+        store.save_state(state, 'init')
+        store.save_states([(1, 'feed', dict(state, hunger=35)), (1, 'age', dict(state, hunger=35, age=7))])
+
+        loaded = store.load_states([1, 3])
+        assert loaded[1]['hunger'] == 35 and loaded[1]['age'] == 7 and loaded[3] is None
+        assert loaded[1]['last_updated'] == '2026-02-03T04:05:06'
+        assert loaded[1]['saved_at']
+
+    def test_scores_and_leaderboard(self, store):
+        """Scores and sessions answer the leaderboard queries on every backend."""
+        from flappy_sim import FlappySession
+        from leaderboard import Leaderboard
+        for score in (4, 11, 7):
+            store.save_score(score)
+        session = FlappySession(score=9, duration=5.0, flaps=8, obstacles_passed=9)
+        assert store.record_flappy_session(session, pet_id=1)
+        assert not store.record_flappy_session(session, pet_id=1)
+
+        assert store.get_high_score() == 11
+        board = Leaderboard(store, top_n=2)
+        assert [score for score, _ in board.top()] == [11, 9]
+        assert board.games('day') == 4 and board.rank(7) == 3
+
+    @pytest.mark.parametrize('backend', ['sqlite', 'snapshot'])
+    def test_scores_survive_reopen(self, backend, tmp_path):
+        """Persistent backends keep scores and session ids across restarts."""
+        from flappy_sim import FlappySession
+        from store import open_store
+        path = str(tmp_path / "mango.db")
+        session = FlappySession(score=12, duration=9.0, flaps=15, obstacles_passed=12)
+        store = open_store(path, backend)
+        store.init()
+        store.save_score(5)
+        assert store.record_flappy_session(session)
+        store.close()
+
+        store = open_store(path, backend)
+        store.init()
+        try:
+            assert store.get_high_score() == 12
+            assert [score for score, _ in store.top_scores(5)] == [12, 5]
+            assert not store.record_flappy_session(session)
+        finally:
+            store.close()
+
+    def test_interface_is_abstract(self):
+        """A backend must implement every storage method."""
+        from store import StateStore
+
+        class Partial(StateStore):
+            def save_states(self, changes):
+                return 0
+
+        with pytest.raises(TypeError):
+            Partial(':memory:')
+
+    def test_default_backend_without_sqlite3(self, monkeypatch, tmp_path):
+        """Without sqlite3 the store module still imports and picks snapshots."""
+        import importlib
+        monkeypatch.setitem(sys.modules, 'sqlite3', None)
+        monkeypatch.delitem(sys.modules, 'db', raising=False)
+        monkeypatch.delitem(sys.modules, 'store', raising=False)
+        store = importlib.import_module('store')
+
+        opened = store.open_store(str(tmp_path / "mango.db"))
+        assert isinstance(opened, store.SnapshotStore)
+        assert 'db' not in sys.modules
+
+    def test_corrupt_scores_are_set_aside(self, tmp_path):
+        """A damaged scores file is kept aside, not overwritten by new scores."""
+        from snapshot import SnapshotError
+        from store import open_store
+        path = str(tmp_path / "mango.db")
+        store = open_store(path, 'snapshot')
+        store.init()
+        store.save_score(5)
+        store.save_score(9)
+        with open(store.scores_path, 'rb') as f:
+            saved = f.read()
+        assert len(saved) == 2 * 44
+
+        damaged = saved[:-1] + bytes([saved[-1] ^ 0xFF])
+        with open(store.scores_path, 'wb') as f:
+            f.write(damaged)
+        store = open_store(path, 'snapshot')
+        with pytest.raises(SnapshotError):
+            store.init()
+        store.save_score(3)
+
+        with open(store.scores_path + '.corrupt', 'rb') as f:
+            assert f.read() == damaged
+        assert store.get_high_score() == 3
+
+
+class TestScheduler:
+    """Tests for the heap-based timers in scheduler.py."""
+
+    def make(self):
+        from scheduler import Scheduler
+        now = [0.0]
+        return Scheduler(clock=lambda: now[0]), now
+
+    def test_one_shot_and_recurring(self):
+        """Timers fire in due order; recurring ones re-arm without bursts."""
+        sched, now = self.make()
+        fired = []
+        sched.call_later(5, fired.append, 'once')
+        sched.call_every(2, fired.append, 'every')
+        sched.call_later(1, fired.append, 'first')
+
+        now[0] = 2
+        assert sched.tick() == 2
+        assert fired == ['first', 'every']
+        now[0] = 5
+        sched.tick()
+        assert fired[2:] == ['every', 'once']
+
+        # far behind: one call, next one a full interval later
+        del fired[:]
+        sched.tick(100)
+        assert fired == ['every']
+        assert sched.next_due() == 102
+
+    def test_cancel(self):
+        """Cancelled timers never fire and do not count as pending."""
+        sched, now = self.make()
+        fired = []
+        timers = [sched.call_later(i, fired.append, i) for i in range(200)]
+        for timer in timers[:150]:
+            sched.cancel(timer)
+        sched.cancel(timers[0])
+        assert len(sched) == 50
+
+        sched.tick(1000)
+        assert fired == list(range(150, 200))
+        assert len(sched) == 0 and sched.next_due() is None
+
+
+class TestPetState:
+    """Tests for the PetState value type in pet_state.py."""
+
+    STATE = {'hunger': 80, 'happiness': 70, 'cleanliness': 60, 'energy': 90,
+             'health': 100, 'age': 3, 'last_updated': '2026-03-01T10:00:00'}
+
+    def test_clamped_attributes_and_dict_view(self):
+        """Stats are clamped on write and the state still reads like a dict."""
+        from pet_state import PetState
+        state = PetState.from_dict(dict(self.STATE, saved_at='ignored'))
+        assert state == self.STATE
+        assert dict(state) == self.STATE
+
+        state.hunger += 50
+        state['energy'] = -5
+        state.age = -1
+        assert (state.hunger, state['energy'], state.get('age')) == (100, 0, 0)
+        with pytest.raises(KeyError):
+            state['saved_at'] = 'x'
+        with pytest.raises(AttributeError):
+            state.mood = 'happy'
+
+        copy = state.copy()
+        copy.health = 1
+        assert state.health == 100
+
+    def test_bulk_conversions(self):
+        """Rows, arrays and snapshot records round-trip."""
+        import pet_state
+        states = [pet_state.PetState.from_dict(dict(self.STATE, hunger=i)) for i in range(50)]
+
+        rows = pet_state.to_rows(states)
+        assert rows[7] == (7, 70, 60, 90, 100, 3)
+        assert pet_state.from_rows(rows, self.STATE['last_updated']) == states
+
+        pairs = pet_state.from_snapshots(pet_state.to_snapshots(enumerate(states)))
+        assert [pet_id for pet_id, _ in pairs] == list(range(50))
+        assert [state for _, state in pairs] == states
+
+        if pet_state.np is not None:
+            values = pet_state.to_array(states)
+            assert values.shape == (50, 6)
+            values[:, 0] += 90
+            assert [state.hunger for state in pet_state.from_array(values)] == [
+                min(100, i + 90) for i in range(50)]
+
+
+class TestHUD:
+    """Tests for the HUD toast queue in hud.py."""
+
+    def make(self):
+        from hud import HUD
+        now = [100.0]
+        return HUD(maxlen=3, clock=lambda: now[0]), now
+
+    def test_bounded_and_expiring(self):
+        """Only the newest maxlen toasts are kept, and each expires on time."""
+        hud, now = self.make()
+        for i in range(1000):
+            hud.post("msg %d" % i, seconds=1.0 + i)
+        assert [toast.text for toast in hud] == ["msg 997", "msg 998", "msg 999"]
+
+        hud.append("legacy")
+        hud.append(("legacy tuple", time.time() + 60))
+        assert len(hud) == 3
+
+        now[0] += 1.0
+        assert hud.expire() == 0
+        now[0] += 1000.0
+        assert hud.expire() == 3
+        assert len(hud) == 0
+
+    def test_draw_caches_toast_surfaces(self):
+        """Toasts render once; the flash fades out."""
+        import pygame
+        pygame.font.init()
+        hud, now = self.make()
+        screen = pygame.Surface((400, 300))
+        font = pygame.font.Font(None, 20)
+        toast = hud.post("Medicine used!")
+        hud.flash(0.25)
+
+        hud.draw(screen, font)
+        rendered = toast.surface
+        assert rendered is not None and screen.get_at((0, 0))[:3] != (0, 0, 0)
+        now[0] += 0.5
+        screen.fill((0, 0, 0))
+        hud.draw(screen, font)
+        assert toast.surface is rendered and not hud.flashing()
+        assert screen.get_at((0, 0))[:3] == (0, 0, 0)
+
+
+class TestObstacleRenderer:
+    """Tests for the pre-rendered Flappy obstacles in flappy.py."""
+
+    def test_columns_are_reused_and_rebuilt_on_resize(self):
+        """Same-bucket heights reuse a column; a taller screen renders new ones."""
+        import pygame
+        from flappy import ObstacleRenderer
+        renderer = ObstacleRenderer()
+        screen = pygame.Surface((400, 600))
+
+        renderer.draw(screen, 100, gap_y=290, gap=150, screen_height=600)
+        columns = dict(renderer._columns)
+        assert len(columns) == 2
+        # a gap a few pixels lower stays in the same height buckets
+        renderer.draw(screen, 160, gap_y=292, gap=150, screen_height=600)
+        assert renderer._columns == columns
+        assert all(renderer._columns[key] is surf for key, surf in columns.items())
+
+        # a resize drops the old buckets and renders the ones it needs
+        tall = pygame.Surface((400, 900))
+        renderer.draw(tall, 100, gap_y=290, gap=150, screen_height=900)
+        assert set(renderer._columns) == {(224, False), (544, True)}
+        assert renderer._columns[(224, False)] is not columns[(224, False)]
+
+    def test_textured_columns_live_in_the_variant_cache(self):
+        """Tree columns are not pinned by the renderer, so eviction frees them."""
+        import pygame
+        from assets import sprite_cache
+        from flappy import ObstacleRenderer
+        renderer = ObstacleRenderer(tree_texture=pygame.Surface((60, 300)))
+        screen = pygame.Surface((400, 600))
+        sprite_cache.clear()
+
+        renderer.draw(screen, 100, gap_y=290, gap=150, screen_height=600)
+        column = renderer._column(215, False)
+        assert renderer._columns == {}
+        assert renderer._column(220, False) is column
+
+        sprite_cache.clear()
+        assert renderer._column(215, False) is not column
+
+
+class TestFixedTimestep:
+    """Tests for the frame-rate independent stepping in flappy.py."""
+
+    def simulate(self, fps, seconds):
+        from flappy import fixed_steps
+        accumulator, total = 0.0, 0
+        for _ in range(int(fps * seconds)):
+            steps, accumulator = fixed_steps(accumulator, 1.0 / fps)
+            total += steps
+        return total
+
+    def test_slow_frames_keep_real_time(self):
+        """A slow frame runs every step it covers, so 5 FPS is not slow motion."""
+        from flappy import fixed_steps
+        steps, accumulator = fixed_steps(0.0, 0.21)
+        assert steps == 12
+        assert 0 <= accumulator < 1.0 / 60
+        for fps in (60, 30, 12, 5):
+            assert abs(self.simulate(fps, 2) - 120) <= 1
+
+    def test_stalls_are_capped(self):
+        """Time beyond MAX_FRAME_TIME is dropped instead of replayed."""
+        from flappy import MAX_STEPS_PER_FRAME, fixed_steps
+        assert MAX_STEPS_PER_FRAME >= 15
+        steps, accumulator = fixed_steps(0.0, 3.0)
+        assert steps == MAX_STEPS_PER_FRAME
+        assert accumulator <= 1.0 / 60
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
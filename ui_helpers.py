@@ -1,8 +1,11 @@
 """UI helper functions extracted from project.py.
 
 These are small, stateless drawing utilities that operate on a game
-instance (providing screen, fonts, etc.).
+instance (providing screen, fonts, etc.), plus the shared text-surface
+cache that all text drawing goes through.
 """
+from collections import OrderedDict
+
 try:
     import pygame
 except Exception:
@@ -15,6 +18,76 @@ except Exception:
 PYGAME_AVAILABLE = pygame is not None
 
 
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces.
+
+    Entries are keyed by (font, text, antialias, colour, background) so a
+    string is rendered once and re-blitted afterwards. The least recently
+    used entry is evicted once `maxsize` surfaces are held. `hits` and
+    `misses` count lookups for profiling.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def render(self, font, text, antialias, color, background=None):
+        """Return the surface for `text`, rendering it only on a cache miss.
+
+        Returned surfaces are shared; callers must blit them, not draw on them.
+        """
+        key = (font, text, bool(antialias), tuple(color),
+               tuple(background) if background is not None else None)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        if background is None:
+            surf = font.render(text, antialias, color)
+        else:
+            surf = font.render(text, antialias, color, background)
+        self._surfaces[key] = surf
+        if len(self._surfaces) > self.maxsize:
+            self._surfaces.popitem(last=False)
+        return surf
+
+    def clear(self):
+        """Drop all cached surfaces and reset the counters."""
+        self._surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Return a dict with size, hits, misses and hit rate."""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._surfaces),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / float(total)) if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
+# Shared cache used by every draw helper and screen module
+text_cache = TextCache()
+
+
+def render_text(font, text, antialias, color, background=None):
+    """Render `text` through the shared LRU text cache.
+
+    Drop-in replacement for ``font.render(text, antialias, color)``.
+    """
+    return text_cache.render(font, text, antialias, color, background)
+
+
 def draw_modern_button(game, rect, text, color, hover_color, text_color=(255,255,255), hover=False):
     """Draw a modern button using the provided game instance for surface/fonts.
 
@@ -45,24 +118,54 @@ def draw_modern_button(game, rect, text, color, hover_color, text_color=(255,255
     pygame.draw.rect(game.screen, border_color, rect, 2, border_radius=8)
 
     # Button text
-    text_surface = game.small_font.render(text, True, text_color)
+    text_surface = render_text(game.small_font, text, True, text_color)
     text_rect = text_surface.get_rect(center=rect.center)
     game.screen.blit(text_surface, text_rect)
 
     return rect
 
 
-def draw_modern_progress_bar(game, x, y, width, height, value, max_value, color, bg_color=None):
+def build_gradient_surface(size, start_color, end_color):
+    """Build a vertical gradient surface of `size` from start to end colour.
+
+    The gradient is computed once into a 1px-wide column and stretched
+    horizontally, so building it costs one pass over the rows instead of a
+    full-width line per scanline. Callers are expected to cache the result.
+    """
+    if not PYGAME_AVAILABLE:
+        return None
+    width, height = int(size[0]), int(size[1])
+    column = pygame.Surface((1, max(1, height)))
+    for y in range(height):
+        ratio = y / float(height)
+        r = int(start_color[0] + (end_color[0] - start_color[0]) * ratio)
+        g = int(start_color[1] + (end_color[1] - start_color[1]) * ratio)
+        b = int(start_color[2] + (end_color[2] - start_color[2]) * ratio)
+        column.set_at((0, y), (r, g, b))
+    surf = pygame.transform.scale(column, (max(1, width), max(1, height)))
+    try:
+        surf = surf.convert()
+    except Exception:
+        # no display mode set yet (headless tools); keep the plain surface
+        pass
+    return surf
+
+
+def draw_modern_progress_bar(game, x, y, width, height, value, max_value, color, bg_color=None,
+                             surface=None):
     """Draw a modern progress bar using the provided game instance.
 
-    Keeps the same visual contract as the original method.
+    Keeps the same visual contract as the original method. The bar is
+    drawn on `surface` when given, otherwise on game.screen.
     """
     if bg_color is None:
         bg_color = getattr(game, 'DARK_GRAY', (48,48,48))
+    if surface is None:
+        surface = game.screen
 
     # Background
     bg_rect = pygame.Rect(x, y, width, height)
-    pygame.draw.rect(game.screen, bg_color, bg_rect, border_radius=max(1, height//2))
+    pygame.draw.rect(surface, bg_color, bg_rect, border_radius=max(1, height//2))
 
     # Progress
     progress_width = 0
@@ -73,7 +176,7 @@ def draw_modern_progress_bar(game, x, y, width, height, value, max_value, color,
 
     if progress_width > 0:
         progress_rect = pygame.Rect(x, y, progress_width, height)
-        pygame.draw.rect(game.screen, color, progress_rect, border_radius=max(1, height//2))
+        pygame.draw.rect(surface, color, progress_rect, border_radius=max(1, height//2))
 
     # Border
-    pygame.draw.rect(game.screen, (255,255,255), bg_rect, 2, border_radius=max(1, height//2))
+    pygame.draw.rect(surface, (255,255,255), bg_rect, 2, border_radius=max(1, height//2))